@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Armazém persistente de resultados, compartilhado entre workers
+---------------------------------------------------------------
+Com vários workers pré-forkados, o cache em memória (cache_respostas) fica
+dividido entre os processos e se perde a cada reinício ou deploy. Este
+armazém guarda os corpos de resposta em um arquivo SQLite no disco local
+(modo WAL: vários leitores simultâneos e um escritor), então:
+
+- todos os workers da máquina enxergam os mesmos resultados;
+- um worker recém-iniciado já começa com o cache quente.
+
+A chave é o hash canônico da entrada (o mesmo da ETag) e o valor é o JSON
+da resposta já comprimido com gzip. Para clientes que aceitam gzip, o blob
+lido do SQLite é devolvido como está, sem desserializar nem recomprimir.
+
+O tamanho total é limitado: ao passar do limite, as entradas acessadas há
+mais tempo são removidas. Falhas do SQLite (disco cheio, arquivo travado)
+nunca derrubam a requisição; o armazém apenas deixa de responder.
+
+Desativado por padrão: o armazém só é usado com ARMAZEM_RESULTADOS_CAMINHO
+definido. A chave inclui a versão do motor (cache_respostas.VERSAO_MOTOR),
+então corpos gravados por uma versão anterior do cálculo nunca são servidos
+e acabam removidos pelo limite de tamanho.
+
+A chave também inclui a data do cálculo, porque as datas do cronograma
+partem do dia corrente: um resultado só é reaproveitado no mesmo dia. Por
+isso as entradas sem acesso há mais de VALIDADE_S são removidas a cada
+gravação, sem esperar o limite de tamanho.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Intervalo mínimo entre atualizações do último acesso de uma entrada
+# (evita uma escrita por leitura nas entradas mais populares)
+INTERVALO_ACESSO_S = 60
+
+# Entradas sem acesso há mais que isso já são de outro dia (a chave inclui a data)
+VALIDADE_S = 24 * 3600
+
+# Ao remover, libera um pouco além do excesso para não remover a cada escrita
+FOLGA_REMOCAO = 0.1
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS resultados (
+    hash TEXT PRIMARY KEY,
+    corpo_gzip BLOB NOT NULL,
+    tamanho INTEGER NOT NULL,
+    ultimo_acesso REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS resultados_ultimo_acesso ON resultados (ultimo_acesso);
+"""
+
+
+class ArmazemResultados:
+    """Corpos de resposta (gzip) por hash da entrada, em SQLite compartilhado entre processos"""
+
+    def __init__(self, caminho: Optional[str], max_bytes: int = 512 * 1024 * 1024):
+        """
+        Args:
+            caminho: Arquivo SQLite; vazio ou None desativa o armazém
+            max_bytes: Limite do total de bytes dos corpos guardados
+        """
+        self.caminho = caminho or None
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    @property
+    def ativo(self) -> bool:
+        return self.caminho is not None
+
+    def _conexao(self) -> sqlite3.Connection:
+        """Conexão da thread atual (recriada após fork: conexões SQLite não atravessam processos)"""
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None or self._local.pid != os.getpid():
+            conexao = sqlite3.connect(self.caminho, timeout=1.0, isolation_level=None)
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('PRAGMA synchronous=NORMAL')
+            conexao.executescript(ESQUEMA)
+            self._local.conexao = conexao
+            self._local.pid = os.getpid()
+        return conexao
+
+    def obter(self, hash_entrada: str) -> Optional[bytes]:
+        """Corpo gzip guardado para a entrada, ou None"""
+        if not self.ativo:
+            return None
+        try:
+            conexao = self._conexao()
+            linha = conexao.execute('SELECT corpo_gzip, ultimo_acesso FROM resultados WHERE hash = ?',
+                                    (hash_entrada,)).fetchone()
+            if linha is None:
+                with self._lock:
+                    self.falhas += 1
+                return None
+            agora = time.time()
+            if agora - linha[1] > INTERVALO_ACESSO_S:
+                conexao.execute('UPDATE resultados SET ultimo_acesso = ? WHERE hash = ?', (agora, hash_entrada))
+        except sqlite3.Error as e:
+            logger.warning(f"Armazém de resultados indisponível: {e}")
+            return None
+        with self._lock:
+            self.acertos += 1
+        return linha[0]
+
+    def guardar(self, hash_entrada: str, corpo_gzip: bytes) -> None:
+        """Guarda o corpo gzip da entrada e remove as entradas mais antigas se passar do limite"""
+        if not self.ativo or len(corpo_gzip) > self.max_bytes:
+            return
+        try:
+            conexao = self._conexao()
+            conexao.execute('INSERT OR REPLACE INTO resultados (hash, corpo_gzip, tamanho, ultimo_acesso) VALUES (?, ?, ?, ?)',
+                            (hash_entrada, sqlite3.Binary(corpo_gzip), len(corpo_gzip), time.time()))
+            conexao.execute('DELETE FROM resultados WHERE ultimo_acesso < ?', (time.time() - VALIDADE_S,))
+            self._remover_excesso(conexao)
+        except sqlite3.Error as e:
+            logger.warning(f"Armazém de resultados indisponível: {e}")
+
+    def _remover_excesso(self, conexao: sqlite3.Connection) -> None:
+        """Remove as entradas acessadas há mais tempo até o total caber no limite (com folga)"""
+        total = conexao.execute('SELECT COALESCE(SUM(tamanho), 0) FROM resultados').fetchone()[0]
+        excesso = total - self.max_bytes
+        if excesso <= 0:
+            return
+        excesso += int(self.max_bytes * FOLGA_REMOCAO)
+
+        # Remove, a partir do acesso mais antigo, enquanto o que já foi liberado não cobre o excesso
+        conexao.execute("""
+            DELETE FROM resultados WHERE hash IN (
+                SELECT hash FROM (
+                    SELECT hash, SUM(tamanho) OVER (ORDER BY ultimo_acesso ROWS UNBOUNDED PRECEDING) - tamanho AS liberado
+                    FROM resultados
+                ) WHERE liberado < ?
+            )
+        """, (excesso,))
+
+    def estatisticas(self) -> Dict[str, int]:
+        """Contadores deste processo e ocupação do armazém compartilhado"""
+        with self._lock:
+            estatisticas = {"acertos": self.acertos, "falhas": self.falhas, "entradas": 0, "bytes": 0}
+        if self.ativo:
+            try:
+                entradas, total = self._conexao().execute(
+                    'SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM resultados').fetchone()
+                estatisticas.update({"entradas": entradas, "bytes": total})
+            except sqlite3.Error as e:
+                logger.warning(f"Armazém de resultados indisponível: {e}")
+        return estatisticas
+
+
+armazem_resultados = ArmazemResultados(
+    os.environ.get('ARMAZEM_RESULTADOS_CAMINHO'),
+    int(os.environ.get('ARMAZEM_RESULTADOS_MAX_BYTES', 512 * 1024 * 1024)),
+)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cache de bases normalizadas do parcelamento automático
+-------------------------------------------------------
+Para um mesmo perfil de taxas, prazos e padrão de pagamentos (reforço/chaves
+ou regrasPagamento), todas as colunas monetárias do cronograma automático
+são lineares em:
+
+    valorImovel, entrada efetiva, desconto e o valor de cada regra de pagamento
+
+O cache guarda, para cada combinação de parâmetros não monetários, as
+colunas obtidas com cada um desses valores igual a 1 (a "base normalizada").
+Uma requisição é respondida pela soma ponderada dessas colunas, sem refazer
+o laço mês a mês. Como o tráfego varia quase só os preços, a taxa de acerto
+é alta mesmo quando a entrada exata nunca se repete.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Tuple, Union
+
+import numpy as np
+
+from financiamento_planta_corrigido import FinanciamentoPlantaInput, calcular_financiamento_planta
+from cronograma_vetorizado import (
+    TIPOS_PAGAMENTO,
+    evoluir_saldos,
+    taxas_mensais,
+    valor_entrada_efetivo,
+)
+from financiamento_bancario import aplicar_financiamento_bancario
+from janela_cronograma import calcular_janela, recortar_janela
+from regras_pagamento import compilar_pagamentos, estrutura_pagamentos, valores_regras
+from resultado_compacto import ResultadoCompacto, montar_resultado_compacto
+from sensibilidades_financiamento import calcular_sensibilidades
+
+
+# Ordem dos coeficientes da combinação linear, seguidos do valor de cada regra de pagamento
+COEFICIENTES = ('valorImovel', 'valorEntrada', 'desconto')
+
+# Ordem das colunas monetárias guardadas em cada base
+COLUNAS = ('valorBase', 'valorCorrigido', 'saldoDevedor', 'saldoLiquido')
+
+
+class BaseNormalizada(NamedTuple):
+    """Colunas normalizadas de um padrão de cronograma automático"""
+    meses: np.ndarray
+    taxas: np.ndarray
+    correcao_acumulada: np.ndarray
+    codigos_tipo: np.ndarray
+    # shape (len(COEFICIENTES) + n_regras, len(COLUNAS), prazo_pagamento)
+    colunas: np.ndarray
+
+
+def chave_base(input_data: FinanciamentoPlantaInput) -> Tuple:
+    """Parâmetros não monetários que determinam a base normalizada"""
+    return (
+        input_data.prazoEntrega,
+        input_data.prazoPagamento,
+        float(input_data.correcaoMensalAteChaves),
+        float(input_data.correcaoMensalAposChaves),
+        estrutura_pagamentos(input_data),
+    )
+
+
+def construir_base(chave: Tuple) -> BaseNormalizada:
+    """Calcula a base normalizada de um padrão de cronograma automático"""
+    prazo_entrega, prazo_pagamento, ate_chaves, apos_chaves, estrutura = chave
+
+    padrao = compilar_pagamentos(prazo_entrega, prazo_pagamento, estrutura)
+    indicadores = np.array(padrao.indicadores, dtype=float).reshape(-1, prazo_pagamento)
+    contagens = np.array(padrao.contagens, dtype=float)
+    n_regulares = padrao.n_regulares
+    regular = np.array(padrao.regulares, dtype=float) / n_regulares if n_regulares else np.zeros(prazo_pagamento)
+
+    # Parcela mensal = (imóvel - entrada - soma contagem_r * valor_r) / n_regulares
+    valores_base = np.concatenate([
+        np.stack([
+            regular,                                          # valorImovel
+            -regular,                                         # entrada
+            np.zeros(prazo_pagamento),                        # desconto
+        ]),
+        indicadores - contagens[:, None] * regular,           # valor de cada regra
+    ])
+    n_regras = len(contagens)
+    saldo_inicial = np.concatenate([[1.0, -1.0, 0.0], np.zeros(n_regras)])
+    saldo_liquido_inicial = np.concatenate([[1.0, -1.0, -1.0], np.zeros(n_regras)])
+
+    taxas = taxas_mensais(prazo_entrega, prazo_pagamento, ate_chaves, apos_chaves)
+    correcao_acumulada, valor_corrigido, saldo_devedor, saldo_liquido = evoluir_saldos(
+        valores_base, taxas, saldo_inicial, saldo_liquido_inicial)
+
+    codigos_tipo = np.array([TIPOS_PAGAMENTO.index(tipo) for tipo in padrao.tipos], dtype=np.int8)
+
+    return BaseNormalizada(
+        meses=np.arange(1, prazo_pagamento + 1),
+        taxas=taxas,
+        correcao_acumulada=correcao_acumulada[0],
+        codigos_tipo=codigos_tipo,
+        colunas=np.stack([valores_base, valor_corrigido, saldo_devedor, saldo_liquido], axis=1),
+    )
+
+
+class CacheBaseNormalizada:
+    """Cache LRU, seguro para threads, de bases normalizadas"""
+
+    def __init__(self, max_entradas: int = 256):
+        self.max_entradas = max_entradas
+        self._bases: "OrderedDict[Tuple, BaseNormalizada]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, chave: Tuple) -> BaseNormalizada:
+        """Retorna a base da chave, construindo-a se necessário"""
+        with self._lock:
+            base = self._bases.get(chave)
+            if base is not None:
+                self._bases.move_to_end(chave)
+                self.acertos += 1
+                return base
+            self.falhas += 1
+
+        # Construção fora do lock; em caso de corrida, a última base gravada prevalece
+        base = construir_base(chave)
+        with self._lock:
+            self._bases[chave] = base
+            self._bases.move_to_end(chave)
+            while len(self._bases) > self.max_entradas:
+                self._bases.popitem(last=False)
+        return base
+
+    def estatisticas(self) -> Dict[str, int]:
+        """Contadores de uso do cache"""
+        with self._lock:
+            return {"entradas": len(self._bases), "acertos": self.acertos, "falhas": self.falhas}
+
+
+cache_bases = CacheBaseNormalizada(int(os.environ.get('CACHE_BASES_MAX_ENTRADAS', 256)))
+
+
+def coeficientes(input_data: FinanciamentoPlantaInput, entrada: float) -> np.ndarray:
+    """Pesos da combinação linear, na ordem de COEFICIENTES seguida das regras de pagamento"""
+    return np.array([
+        input_data.valorImovel,
+        entrada,
+        input_data.desconto or 0,
+        *valores_regras(input_data),
+    ], dtype=float)
+
+
+def calcular_automatico_por_base(input_data: FinanciamentoPlantaInput) -> ResultadoCompacto:
+    """Calcula o parcelamento automático como soma ponderada da base em cache"""
+    entrada = valor_entrada_efetivo(input_data)
+    base = cache_bases.obter(chave_base(input_data))
+
+    valores_base, valor_corrigido, saldo_devedor, saldo_liquido = np.tensordot(
+        coeficientes(input_data, entrada), base.colunas, axes=1)
+
+    return montar_resultado_compacto(input_data, entrada, base.meses, base.codigos_tipo, valores_base, base.taxas,
+                                     base.correcao_acumulada, valor_corrigido, saldo_devedor, saldo_liquido)
+
+
+def calcular_financiamento_planta_compacto(input_data: Union[Dict[str, Any], FinanciamentoPlantaInput]) -> ResultadoCompacto:
+    """Calcula o financiamento e devolve o resultado na forma compacta (para jobs de lote)"""
+    if isinstance(input_data, dict):
+        input_data = FinanciamentoPlantaInput(**input_data)
+
+    if input_data.tipoParcelamento == 'automatico':
+        return calcular_automatico_por_base(input_data)
+
+    return ResultadoCompacto.de_dict(calcular_financiamento_planta(input_data))
+
+
+def calcular_cronograma_completo(input_data: Union[Dict[str, Any], FinanciamentoPlantaInput]) -> ResultadoCompacto:
+    """Cronograma completo na forma compacta, com a fase bancária se houver (mesInicio/mesFim são ignorados)"""
+    if isinstance(input_data, dict):
+        input_data = FinanciamentoPlantaInput(**input_data)
+
+    if input_data.financiamentoBancario:
+        return ResultadoCompacto.de_dict(calcular_financiamento_planta_rapido(input_data.model_copy(
+            update={"mesInicio": None, "mesFim": None, "calcularSensibilidades": False})))
+    return calcular_financiamento_planta_compacto(input_data)
+
+
+def calcular_financiamento_planta_rapido(input_data: Union[Dict[str, Any], FinanciamentoPlantaInput]) -> Dict[str, Any]:
+    """
+    Mesmo contrato de calcular_financiamento_planta, usando o cache de bases
+    no parcelamento automático. O parcelamento personalizado segue pelo
+    cálculo original. Com financiamentoBancario, as parcelas após as chaves
+    dão lugar à fase bancária (SAC/Price). Com calcularSensibilidades, o
+    resultado inclui as derivadas de primeira ordem em "sensibilidades".
+    Com mesInicio/mesFim, `parcelas` traz só os meses da janela e o resumo
+    continua sendo o do cronograma completo.
+    """
+    if isinstance(input_data, dict):
+        input_data = FinanciamentoPlantaInput(**input_data)
+
+    janela = input_data.mesInicio is not None or input_data.mesFim is not None
+
+    if (janela and input_data.tipoParcelamento == 'automatico' and not input_data.financiamentoBancario
+            and not input_data.regrasPagamento):
+        # Taxas constantes por trecho e reforço/chaves clássicos: salta direto para o início da janela
+        resultado = calcular_janela(input_data).para_dict()
+    else:
+        if input_data.tipoParcelamento == 'automatico':
+            resultado = calcular_automatico_por_base(input_data).para_dict()
+        else:
+            resultado = calcular_financiamento_planta(input_data)
+
+        if input_data.financiamentoBancario:
+            resultado = aplicar_financiamento_bancario(resultado, input_data)
+
+        if janela:
+            resultado = recortar_janela(resultado, input_data)
+
+    if input_data.calcularSensibilidades:
+        resultado["sensibilidades"] = calcular_sensibilidades(input_data)
+
+    return resultado
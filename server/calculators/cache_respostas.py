@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Compressão e revalidação das respostas de cálculo
+--------------------------------------------------
+- ETag forte derivada do hash canônico da entrada validada (mais a data base,
+  porque as datas do cronograma dependem do dia do cálculo, e a versão do
+  motor, para que um deploy que muda o cálculo não revalide corpos antigos).
+- Negociação de Content-Encoding (br, se o módulo brotli estiver instalado,
+  ou gzip) conforme o Accept-Encoding do cliente.
+- Cache LRU, limitado em bytes, dos corpos já serializados e comprimidos,
+  guardados lado a lado por hash da entrada e codificação.
+"""
+
+import ast
+import datetime
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional; sem ele, apenas gzip
+    brotli = None
+
+
+# Versão do formato das respostas; alterar invalida as ETags já emitidas
+VERSAO_RESPOSTA = '1'
+
+# Os módulos do motor ficam no mesmo diretório deste arquivo
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+# Módulo de entrada do cálculo servido pela API; a versão cobre os que ele importa
+MODULO_MOTOR = 'cache_base_normalizada'
+
+CODIFICACOES_SUPORTADAS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def modulos_motor(modulo: str = MODULO_MOTOR, diretorio: str = DIRETORIO) -> List[str]:
+    """
+    Módulos locais de que o cálculo depende: o módulo de entrada e, pelas
+    instruções import de cada um, todos os módulos do diretório que ele
+    alcança. Testes, carga e replay não são importados pelo motor e ficam de fora.
+    """
+    encontrados, pendentes = set(), [modulo]
+    while pendentes:
+        nome = pendentes.pop()
+        caminho = os.path.join(diretorio, nome + '.py')
+        if nome in encontrados or not os.path.isfile(caminho):
+            continue
+        encontrados.add(nome)
+        with open(caminho, 'rb') as f:
+            arvore = ast.parse(f.read(), filename=caminho)
+        for no in ast.walk(arvore):
+            if isinstance(no, ast.Import):
+                pendentes.extend(alias.name.split('.')[0] for alias in no.names)
+            elif isinstance(no, ast.ImportFrom) and no.module and not no.level:
+                pendentes.append(no.module.split('.')[0])
+    return sorted(encontrados)
+
+
+def versao_motor(diretorio: str = DIRETORIO) -> str:
+    """
+    Versão do motor: hash do formato das respostas e do código-fonte dos
+    módulos do cálculo (modulos_motor). Qualquer alteração no cálculo muda a
+    versão, sem depender de alguém lembrar de alterar VERSAO_RESPOSTA.
+    """
+    resumo = hashlib.sha256(VERSAO_RESPOSTA.encode('utf-8'))
+    for nome in modulos_motor(diretorio=diretorio):
+        with open(os.path.join(diretorio, nome + '.py'), 'rb') as f:
+            resumo.update(nome.encode('utf-8') + b'\0' + f.read() + b'\0')
+    return resumo.hexdigest()[:16]
+
+
+VERSAO_MOTOR = versao_motor()
+
+
+def hash_canonico(modelo: BaseModel, data_base: Optional[datetime.date] = None) -> str:
+    """Hash SHA-256 da entrada validada, independente da ordem e formatação do JSON recebido"""
+    conteudo = '|'.join([
+        VERSAO_MOTOR,
+        type(modelo).__name__,
+        (data_base or datetime.date.today()).isoformat(),
+        modelo.model_dump_json(),
+    ])
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+def etag_forte(hash_entrada: str, codificacao: str = 'identity') -> str:
+    """
+    ETag forte: a mesma entrada produz byte a byte o mesmo corpo. Cada
+    codificação é uma representação distinta e recebe o seu sufixo.
+    """
+    if codificacao == 'identity':
+        return f'"{hash_entrada}"'
+    return f'"{hash_entrada}-{codificacao}"'
+
+
+def etag_corresponde(if_none_match: Optional[str], etag: str) -> bool:
+    """Verifica o cabeçalho If-None-Match (lista de ETags ou '*')"""
+    if not if_none_match:
+        return False
+    candidatos = [c.strip() for c in if_none_match.split(',')]
+    return '*' in candidatos or etag in candidatos
+
+
+def negociar_codificacao(accept_encoding: Optional[str]) -> str:
+    """Escolhe a melhor codificação aceita pelo cliente ('identity' se nenhuma)"""
+    aceitas: Dict[str, float] = {}
+    for item in (accept_encoding or '').split(','):
+        partes = [p.strip() for p in item.split(';')]
+        if not partes[0]:
+            continue
+        qualidade = 1.0
+        for parametro in partes[1:]:
+            if parametro.startswith('q='):
+                try:
+                    qualidade = float(parametro[2:])
+                except ValueError:
+                    qualidade = 0.0
+        aceitas[partes[0].lower()] = qualidade
+
+    melhor, melhor_q = 'identity', 0.0
+    for codificacao in CODIFICACOES_SUPORTADAS:
+        qualidade = aceitas.get(codificacao, aceitas.get('*', 0.0))
+        if qualidade > melhor_q:
+            melhor, melhor_q = codificacao, qualidade
+    return melhor
+
+
+def comprimir(corpo: bytes, codificacao: str) -> bytes:
+    """Comprime o corpo (mtime fixo no gzip, para que a saída seja determinística)"""
+    if codificacao == 'br':
+        return brotli.compress(corpo, quality=5)
+    if codificacao == 'gzip':
+        return gzip.compress(corpo, compresslevel=6, mtime=0)
+    return corpo
+
+
+class CacheRespostas:
+    """Cache LRU, seguro para threads, de corpos de resposta por hash da entrada e codificação"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._corpos: "OrderedDict[str, Dict[str, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def obter(self, hash_entrada: str, codificacao: str) -> Optional[bytes]:
+        """Corpo guardado para a entrada na codificação pedida, ou None"""
+        with self._lock:
+            corpos = self._corpos.get(hash_entrada)
+            if corpos is None:
+                return None
+            self._corpos.move_to_end(hash_entrada)
+            if codificacao in corpos:
+                return corpos[codificacao]
+            identidade = corpos.get('identity')
+            corpo_gzip = corpos.get('gzip')
+
+        if identidade is None and corpo_gzip is None:
+            return None
+        # Mesma resposta em outra codificação: converte sem recalcular
+        return self.guardar(hash_entrada, codificacao, identidade, corpo_gzip)
+
+    def guardar(self, hash_entrada: str, codificacao: str, corpo: Optional[bytes],
+                corpo_gzip: Optional[bytes] = None) -> bytes:
+        """
+        Guarda o corpo na codificação pedida (e sem compressão, se conhecido).
+
+        Args:
+            corpo: Corpo sem compressão; None quando só há corpo_gzip
+            corpo_gzip: O mesmo corpo já comprimido com gzip, se disponível
+                (por exemplo, lido do armazém persistente); evita recomprimir
+                e, para clientes gzip, também descomprimir
+
+        Returns:
+            O corpo na codificação pedida
+        """
+        if codificacao == 'gzip' and corpo_gzip is not None:
+            codificado = corpo_gzip
+        else:
+            if corpo is None:
+                corpo = gzip.decompress(corpo_gzip)
+            codificado = corpo if codificacao == 'identity' else comprimir(corpo, codificacao)
+        with self._lock:
+            corpos = self._corpos.setdefault(hash_entrada, {})
+            representacoes = [('identity', corpo), (codificacao, codificado), ('gzip', corpo_gzip)]
+            for chave, valor in representacoes:
+                if valor is not None and chave not in corpos:
+                    corpos[chave] = valor
+                    self._bytes += len(valor)
+            self._corpos.move_to_end(hash_entrada)
+            while self._bytes > self.max_bytes and len(self._corpos) > 1:
+                _, removidos = self._corpos.popitem(last=False)
+                self._bytes -= sum(len(v) for v in removidos.values())
+        return codificado
+
+
+cache_respostas = CacheRespostas(int(os.environ.get('CACHE_RESPOSTAS_MAX_BYTES', 64 * 1024 * 1024)))
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Calibração das taxas de correção a partir de séries históricas de índices
+--------------------------------------------------------------------------
+correcaoMensalAteChaves e correcaoMensalAposChaves costumam ser digitadas
+"no olho". Este módulo sugere as taxas a partir das variações mensais (%)
+do INCC, do IPCA e do CUB-SC, as mesmas séries coletadas por inccService,
+bcbService e cubScService_new no Node. Os coletores enviam para cá os meses
+que acabaram de gravar no Postgres; o histórico já gravado é enviado na
+inicialização do servidor Node (seriesIndicesPython.ts).
+
+Os pontos ficam em um arquivo SQLite local (compartilhado entre workers,
+como o armazém de resultados). Para cada série e cada tamanho de janela em
+JANELAS, as estatísticas das últimas N variações mensais são mantidas
+incrementalmente a cada ponto acrescentado:
+
+- a janela guarda os valores na ordem de chegada e também ordenados
+  (inserção e remoção por bisseção), além das somas de v e de ln(1 + v/100);
+- ao entrar um ponto, o resumo da janela (média, mediana, média aparada,
+  percentis e taxa mensal equivalente composta) é recalculado uma vez e
+  guardado.
+
+Uma consulta de calibração é só a leitura desse resumo. Pontos novos (mês
+posterior ao último da série) seguem o caminho incremental; revisões de um
+mês já existente ou meses anteriores reconstroem a série. Cada worker
+acompanha as gravações dos demais pela coluna `versao`.
+
+As janelas contam pontos, não meses de calendário: meses ausentes na série
+simplesmente não entram.
+
+Desativado por padrão, como o armazém de resultados: as séries só são
+gravadas com SERIES_INDICES_CAMINHO definido. Sem ele, os pontos recebidos
+são descartados e a calibração responde que não há série.
+"""
+
+import bisect
+import logging
+import math
+import os
+import sqlite3
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+logger = logging.getLogger(__name__)
+
+# Séries aceitas (variação mensal em %)
+INDICES = ('incc', 'ipca', 'cub')
+
+# Tamanhos das janelas móveis, em pontos (meses)
+JANELAS = (6, 12, 24, 36, 60)
+
+# Percentis guardados em cada resumo
+PERCENTIS = (10, 25, 75, 90)
+
+# Fração descartada em cada ponta na média aparada
+FRACAO_APARADA = 0.1
+
+ESTATISTICAS = ('media', 'mediana', 'mediaAparada', 'taxaEquivalente') + tuple(f'p{p}' for p in PERCENTIS)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS pontos_indices (
+    indice TEXT NOT NULL,
+    mes TEXT NOT NULL,
+    valor REAL NOT NULL,
+    versao INTEGER NOT NULL,
+    PRIMARY KEY (indice, mes)
+);
+CREATE INDEX IF NOT EXISTS pontos_indices_versao ON pontos_indices (versao);
+"""
+
+
+class PontoIndice(BaseModel):
+    """Variação mensal (%) de um índice, como nas tabelas do Node"""
+    month: str = Field(..., pattern=r'^\d{4}-(0[1-9]|1[0-2])$')
+    value: float = Field(..., gt=-100)
+
+
+class PontosIndiceInput(BaseModel):
+    """Modelo de entrada para o envio de pontos de uma série"""
+    pontos: List[PontoIndice] = Field(..., min_length=1)
+
+
+class CalibracaoTaxasInput(BaseModel):
+    """Modelo de entrada para a calibração das taxas de correção"""
+    indiceAteChaves: Literal['incc', 'ipca', 'cub'] = 'incc'
+    indiceAposChaves: Optional[Literal['incc', 'ipca', 'cub']] = 'ipca'
+    janela: int = 12
+    estatistica: Literal['media', 'mediana', 'mediaAparada', 'taxaEquivalente', 'p10', 'p25', 'p75', 'p90'] = 'mediana'
+
+    def validar_janela(self):
+        """A janela precisa ser uma das janelas pré-calculadas"""
+        if self.janela not in JANELAS:
+            raise ValueError(f"janela deve ser uma de {list(JANELAS)}")
+
+
+class IndiceNaoEncontrado(Exception):
+    """Índice desconhecido ou sem pontos armazenados"""
+
+
+def _percentil(ordenados: List[float], p: float) -> float:
+    """Percentil com interpolação linear entre os vizinhos (como numpy.percentile)"""
+    posicao = (len(ordenados) - 1) * p / 100
+    inferior = math.floor(posicao)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicao - inferior)
+
+
+class JanelaMovel:
+    """Últimos `tamanho` pontos de uma série, com o resumo atualizado a cada ponto"""
+
+    __slots__ = ('tamanho', 'valores', 'ordenados', 'soma', 'soma_log', 'resumo')
+
+    def __init__(self, tamanho: int):
+        self.tamanho = tamanho
+        self.valores: Deque[float] = deque()
+        self.ordenados: List[float] = []
+        self.soma = 0.0
+        self.soma_log = 0.0
+        self.resumo: Optional[Dict[str, float]] = None
+
+    def adicionar(self, valor: float) -> None:
+        """Entra um ponto (e sai o mais antigo, com a janela cheia)"""
+        self.valores.append(valor)
+        bisect.insort(self.ordenados, valor)
+        self.soma += valor
+        self.soma_log += math.log1p(valor / 100)
+        if len(self.valores) > self.tamanho:
+            antigo = self.valores.popleft()
+            del self.ordenados[bisect.bisect_left(self.ordenados, antigo)]
+            self.soma -= antigo
+            self.soma_log -= math.log1p(antigo / 100)
+        self.resumo = self._resumir()
+
+    def _resumir(self) -> Dict[str, float]:
+        ordenados = self.ordenados
+        n = len(ordenados)
+        aparar = int(n * FRACAO_APARADA)
+        resumo = {
+            "media": self.soma / n,
+            "mediana": _percentil(ordenados, 50),
+            "mediaAparada": math.fsum(ordenados[aparar:n - aparar]) / (n - 2 * aparar),
+            # Taxa mensal constante que reproduz a variação acumulada da janela
+            "taxaEquivalente": math.expm1(self.soma_log / n) * 100,
+        }
+        for p in PERCENTIS:
+            resumo[f"p{p}"] = _percentil(ordenados, p)
+        return resumo
+
+
+class SerieIndice:
+    """Série de um índice com as janelas móveis de JANELAS"""
+
+    def __init__(self):
+        self.meses: List[str] = []
+        self.valores: List[float] = []
+        self.janelas = {tamanho: JanelaMovel(tamanho) for tamanho in JANELAS}
+
+    def adicionar(self, mes: str, valor: float) -> None:
+        """Acrescenta um ponto posterior ao último da série"""
+        self.meses.append(mes)
+        self.valores.append(valor)
+        for janela in self.janelas.values():
+            janela.adicionar(valor)
+
+    def resumo(self, tamanho: int) -> Optional[Dict[str, Any]]:
+        """Resumo já calculado da janela, ou None se a série estiver vazia"""
+        janela = self.janelas[tamanho]
+        if janela.resumo is None:
+            return None
+        pontos = len(janela.valores)
+        return {
+            **janela.resumo,
+            "pontos": pontos,
+            "completa": pontos == tamanho,
+            "mesInicial": self.meses[-pontos],
+            "mesFinal": self.meses[-1],
+        }
+
+
+class CalibracaoIndices:
+    """Séries de índices em SQLite e resumos por janela em memória"""
+
+    def __init__(self, caminho: Optional[str]):
+        """
+        Args:
+            caminho: Arquivo SQLite das séries; vazio ou None desativa a calibração
+        """
+        self.caminho = caminho or None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._series: Dict[str, SerieIndice] = {}
+        self._versao = 0
+
+    @property
+    def ativo(self) -> bool:
+        return self.caminho is not None
+
+    def _conexao(self) -> sqlite3.Connection:
+        """Conexão da thread atual (recriada após fork: conexões SQLite não atravessam processos)"""
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None or self._local.pid != os.getpid():
+            conexao = sqlite3.connect(self.caminho, timeout=5.0, isolation_level=None)
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('PRAGMA synchronous=NORMAL')
+            conexao.executescript(ESQUEMA)
+            self._local.conexao = conexao
+            self._local.pid = os.getpid()
+        return conexao
+
+    def adicionar_pontos(self, indice: str, dados: Any) -> Dict[str, Any]:
+        """
+        Grava os pontos de uma série (meses existentes são atualizados) e
+        atualiza as janelas.
+
+        Returns:
+            Quantidade de pontos novos ou alterados e o último mês da série
+        """
+        if indice not in INDICES:
+            raise IndiceNaoEncontrado(indice)
+        if isinstance(dados, dict):
+            dados = PontosIndiceInput(**dados)
+        if not self.ativo:
+            return {"indice": indice, "alterados": 0, "mesFinal": None}
+
+        conexao = self._conexao()
+        conexao.execute('BEGIN IMMEDIATE')
+        try:
+            versao = conexao.execute('SELECT COALESCE(MAX(versao), 0) + 1 FROM pontos_indices').fetchone()[0]
+            alterados = 0
+            for ponto in sorted(dados.pontos, key=lambda p: p.month):
+                cursor = conexao.execute("""
+                    INSERT INTO pontos_indices (indice, mes, valor, versao) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (indice, mes) DO UPDATE SET valor = excluded.valor, versao = excluded.versao
+                    WHERE valor != excluded.valor
+                """, (indice, ponto.month, ponto.value, versao))
+                alterados += cursor.rowcount
+            conexao.execute('COMMIT')
+        except BaseException:
+            conexao.execute('ROLLBACK')
+            raise
+
+        with self._lock:
+            self._sincronizar(conexao)
+            serie = self._series.get(indice)
+            return {"indice": indice, "alterados": alterados, "mesFinal": serie.meses[-1] if serie else None}
+
+    def _sincronizar(self, conexao: sqlite3.Connection) -> None:
+        """Aplica as gravações feitas (por qualquer worker) desde a última versão vista"""
+        linhas = conexao.execute(
+            'SELECT indice, mes, valor, versao FROM pontos_indices WHERE versao > ? ORDER BY versao, indice, mes',
+            (self._versao,)).fetchall()
+        reconstruir = set()
+        for indice, mes, valor, versao in linhas:
+            self._versao = max(self._versao, versao)
+            if indice in reconstruir:
+                continue
+            serie = self._series.setdefault(indice, SerieIndice())
+            if serie.meses and mes <= serie.meses[-1]:
+                # Revisão ou mês anterior: a janela móvel não volta no tempo
+                reconstruir.add(indice)
+            else:
+                serie.adicionar(mes, valor)
+
+        for indice in reconstruir:
+            serie = SerieIndice()
+            for mes, valor in conexao.execute(
+                    'SELECT mes, valor FROM pontos_indices WHERE indice = ? ORDER BY mes', (indice,)):
+                serie.adicionar(mes, valor)
+            self._series[indice] = serie
+
+    def resumo(self, indice: str, janela: int) -> Dict[str, Any]:
+        """Resumo pré-calculado da janela mais recente da série"""
+        if not self.ativo:
+            raise IndiceNaoEncontrado(indice)
+        try:
+            conexao = self._conexao()
+            with self._lock:
+                self._sincronizar(conexao)
+        except sqlite3.Error as e:
+            logger.warning(f"Séries de índices indisponíveis: {e}")
+        with self._lock:
+            serie = self._series.get(indice)
+            resumo = serie.resumo(janela) if serie else None
+        if resumo is None:
+            raise IndiceNaoEncontrado(indice)
+        return resumo
+
+    def series(self) -> Dict[str, Dict[str, Any]]:
+        """Pontos e último mês de cada série carregada"""
+        with self._lock:
+            return {indice: {"pontos": len(serie.meses), "mesFinal": serie.meses[-1]}
+                    for indice, serie in self._series.items() if serie.meses}
+
+    def calibrar(self, input_data: Any) -> Dict[str, Any]:
+        """
+        Sugere as taxas de correção com a estatística e a janela pedidas.
+
+        Args:
+            input_data: CalibracaoTaxasInput ou dicionário equivalente
+
+        Returns:
+            Taxas sugeridas (% ao mês, nunca negativas) e o resumo de cada índice usado
+        """
+        if isinstance(input_data, dict):
+            input_data = CalibracaoTaxasInput(**input_data)
+        input_data.validar_janela()
+
+        campos = {"correcaoMensalAteChaves": input_data.indiceAteChaves}
+        if input_data.indiceAposChaves:
+            campos["correcaoMensalAposChaves"] = input_data.indiceAposChaves
+
+        resumos = {indice: self.resumo(indice, input_data.janela) for indice in set(campos.values())}
+        return {
+            "janela": input_data.janela,
+            "estatistica": input_data.estatistica,
+            # A correção do contrato não é negativa (FinanciamentoPlantaInput exige ge=0)
+            "sugestao": {campo: max(resumos[indice][input_data.estatistica], 0.0) for campo, indice in campos.items()},
+            "indices": resumos,
+        }
+
+
+calibracao_indices = CalibracaoIndices(os.environ.get('SERIES_INDICES_CAMINHO'))
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Captura amostrada e anonimizada das requisições do serviço de cálculo
+----------------------------------------------------------------------
+Desativada por padrão. Com CAPTURA_REQUISICOES_ARQUIVO definido, uma fração
+(CAPTURA_REQUISICOES_AMOSTRA) das requisições POST com corpo JSON é gravada
+nesse arquivo, uma por linha (JSONL), com a rota, o status e a duração
+observada no serviço. O arquivo alimenta o replay_requisicoes.py, que
+reproduz a mesma carga, na mesma ordem, contra qualquer versão do motor.
+
+Anonimização (o corpo gravado continua válido para o cálculo):
+
+- textos viram um hash curto com sal aleatório do processo, exceto os campos
+  enumerados (tipo de parcelamento, periodicidade, índices...) e os textos
+  numéricos, que o cálculo lê como número;
+- valores a partir de R$ 1.000 (preço, entrada, reforços, parcelas) são
+  arredondados para 3 algarismos significativos. O arredondamento é
+  monótono, então entrada <= valor do imóvel continua valendo; prazos,
+  meses e taxas ficam como estão.
+
+Com vários workers, cada processo acrescenta linhas ao mesmo arquivo (uma
+escrita por linha, em modo append). Ao passar de CAPTURA_REQUISICOES_MAX_BYTES
+a captura para.
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import threading
+from typing import Any, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Campos de texto enumerados, gravados como estão
+CAMPOS_ENUMERADOS = frozenset({
+    'tipoParcelamento', 'periodicidadeReforco', 'tipo', 'tipoPagamento', 'sistema', 'referencia',
+    'indiceAteChaves', 'indiceAposChaves', 'estatistica', 'month',
+})
+
+# Valores a partir deste módulo são tratados como monetários e arredondados
+VALOR_MONETARIO_MINIMO = 1000
+
+ALGARISMOS_SIGNIFICATIVOS = 3
+
+# Cabeçalhos que mudam o trabalho do serviço e são reproduzidos no replay
+CABECALHOS_CAPTURADOS = ('Accept-Encoding',)
+
+
+def arredondar_significativos(valor: float, algarismos: int = ALGARISMOS_SIGNIFICATIVOS) -> float:
+    """Arredonda para `algarismos` algarismos significativos"""
+    if not valor or not math.isfinite(valor):
+        return valor
+    return round(valor, algarismos - 1 - math.floor(math.log10(abs(valor))))
+
+
+def _numero_texto(texto: str) -> Optional[float]:
+    """Texto numérico (como o parseFloat do JavaScript leria um campo) ou None"""
+    try:
+        valor = float(texto)
+    except ValueError:
+        return None
+    return valor if math.isfinite(valor) else None
+
+
+class CapturaRequisicoes:
+    """Grava uma amostra anonimizada das requisições em um arquivo JSONL"""
+
+    def __init__(self, arquivo: Optional[str], amostra: float = 0.01, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            arquivo: Arquivo JSONL de saída; vazio ou None desativa a captura
+            amostra: Fração das requisições gravadas (0 a 1)
+            max_bytes: Tamanho do arquivo a partir do qual a captura para
+        """
+        self.arquivo = arquivo or None
+        self.amostra = amostra
+        self.max_bytes = max_bytes
+        self._sal = os.urandom(16)
+        self._aleatorio = random.Random()
+        self._lock = threading.Lock()
+        self.gravadas = 0
+
+    @property
+    def ativa(self) -> bool:
+        return self.arquivo is not None and self.amostra > 0
+
+    def sortear(self, metodo: str, json_corpo: bool) -> bool:
+        """Decide se a requisição entra na amostra"""
+        if not self.ativa or metodo != 'POST' or not json_corpo:
+            return False
+        with self._lock:
+            return self._aleatorio.random() < self.amostra
+
+    def _hash(self, texto: str) -> str:
+        return hashlib.sha256(self._sal + texto.encode('utf-8')).hexdigest()[:12]
+
+    def anonimizar(self, valor: Any, chave: Optional[str] = None) -> Any:
+        """Cópia do corpo sem textos livres e com os valores monetários arredondados"""
+        if isinstance(valor, dict):
+            return {k: self.anonimizar(v, k) for k, v in valor.items()}
+        if isinstance(valor, list):
+            return [self.anonimizar(v, chave) for v in valor]
+        if isinstance(valor, bool) or valor is None:
+            return valor
+        if isinstance(valor, (int, float)):
+            if abs(valor) >= VALOR_MONETARIO_MINIMO:
+                arredondado = arredondar_significativos(float(valor))
+                return int(arredondado) if isinstance(valor, int) else arredondado
+            return valor
+        if isinstance(valor, str):
+            if chave in CAMPOS_ENUMERADOS:
+                return valor
+            numero = _numero_texto(valor)
+            if numero is None:
+                return self._hash(valor)
+            return str(arredondar_significativos(numero)) if abs(numero) >= VALOR_MONETARIO_MINIMO else valor
+        return valor
+
+    def registrar(self, rota: str, corpo: Any, status: int, duracao_ms: float,
+                  cabecalhos: Optional[Dict[str, str]] = None) -> None:
+        """Anonimiza e acrescenta uma requisição ao arquivo (falhas de disco só geram aviso)"""
+        if not self.ativa or corpo is None:
+            return
+        linha = json.dumps({
+            "t": datetime.datetime.now().isoformat(timespec='milliseconds'),
+            "rota": rota,
+            "status": status,
+            "duracaoMs": round(duracao_ms, 3),
+            "cabecalhos": cabecalhos or {},
+            "corpo": self.anonimizar(corpo),
+        }, ensure_ascii=False) + '\n'
+
+        with self._lock:
+            if self.arquivo is None:
+                return
+            try:
+                if os.path.exists(self.arquivo) and os.path.getsize(self.arquivo) >= self.max_bytes:
+                    logger.warning(f"Captura de requisições encerrada: {self.arquivo} atingiu o limite de tamanho")
+                    self.arquivo = None
+                    return
+                with open(self.arquivo, 'a', encoding='utf-8') as f:
+                    f.write(linha)
+                self.gravadas += 1
+            except OSError as e:
+                logger.warning(f"Falha ao gravar a captura de requisições: {e}")
+
+
+captura_requisicoes = CapturaRequisicoes(
+    os.environ.get('CAPTURA_REQUISICOES_ARQUIVO'),
+    float(os.environ.get('CAPTURA_REQUISICOES_AMOSTRA', 0.01)),
+    int(os.environ.get('CAPTURA_REQUISICOES_MAX_BYTES', 256 * 1024 * 1024)),
+)
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste de carga sintético do serviço de cálculo
+-----------------------------------------------
+Gera planos aleatórios (mistura configurável de parcelamento automático e
+personalizado, prazos e reforços) e os envia em laço fechado às rotas do
+serviço Python, para cada combinação de número de workers e de concorrência.
+
+Para cada combinação são medidos throughput, latências p50/p95/p99 e taxa de
+erros. O resultado é gravado em JSON para comparação entre versões.
+
+Exemplos:
+    # Sobe o serviço localmente (gunicorn, se instalado) com 1 e 4 workers
+    python3 carga_financiamento.py --workers 1,4 --concorrencia 1,8,32 --duracao 15
+
+    # Usa um serviço já em execução e compara com uma execução anterior
+    python3 carga_financiamento.py --url http://localhost:5002 --comparar carga_anterior.json
+"""
+
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+ROTA_FINANCIAMENTO = '/api/calcular-financiamento'
+ROTA_CARTEIRA = '/api/carteira/recebimentos'
+
+
+# ---------------------------------------------------------------------------
+# Geração de planos
+# ---------------------------------------------------------------------------
+
+class GeradorPlanos:
+    """Gera planos aleatórios reprodutíveis a partir de uma semente"""
+
+    def __init__(self, semente: int, fracao_personalizado: float, prazos: List[int],
+                 fracao_reforco: float, periodicidades: List[str]):
+        self.aleatorio = random.Random(semente)
+        self.fracao_personalizado = fracao_personalizado
+        self.prazos = prazos
+        self.fracao_reforco = fracao_reforco
+        self.periodicidades = periodicidades
+        self._lock = threading.Lock()
+
+    def plano(self) -> Dict[str, Any]:
+        with self._lock:
+            a = self.aleatorio
+            prazo_entrega = a.choice(self.prazos)
+            prazo_pagamento = prazo_entrega + a.choice([0, 0, 12, 60, 120])
+            valor_imovel = round(a.uniform(250_000, 2_500_000), 2)
+            plano = {
+                "valorImovel": valor_imovel,
+                "valorEntrada": round(valor_imovel * a.uniform(0.05, 0.3), 2),
+                "desconto": a.choice([0, 0, round(valor_imovel * 0.02, 2)]),
+                "prazoEntrega": prazo_entrega,
+                "prazoPagamento": prazo_pagamento,
+                "correcaoMensalAteChaves": round(a.uniform(0.2, 1.2), 3),
+                "correcaoMensalAposChaves": round(a.uniform(0.2, 1.2), 3),
+                "tipoParcelamento": "automatico",
+            }
+            if a.random() < self.fracao_reforco:
+                plano.update({
+                    "incluirReforco": True,
+                    "periodicidadeReforco": a.choice(self.periodicidades),
+                    "valorReforco": round(valor_imovel * 0.02, 2),
+                })
+            if a.random() < 0.5:
+                plano["valorChaves"] = round(valor_imovel * 0.1, 2)
+            if a.random() < self.fracao_personalizado:
+                plano["tipoParcelamento"] = "personalizado"
+                plano["parcelasPersonalizadas"] = [
+                    {"mes": mes, "valor": round(valor_imovel * 0.01, 2),
+                     "tipo": "Reforço" if mes % 6 == 0 else "Parcela"}
+                    for mes in range(1, prazo_pagamento + 1)
+                    if a.random() < 0.8
+                ] or [{"mes": 1, "valor": 1000.0, "tipo": "Parcela"}]
+            return plano
+
+    def carteira(self, unidades: int = 20) -> Dict[str, Any]:
+        planos = [self.plano() for _ in range(unidades)]
+        with self._lock:
+            inicios = [self.aleatorio.randint(0, 24) for _ in planos]
+        return {"unidades": [{"mesInicio": i, "plano": p} for i, p in zip(inicios, planos)]}
+
+
+def payloads_por_rota(gerador: GeradorPlanos) -> Dict[str, Callable[[], Dict[str, Any]]]:
+    """Rotas conhecidas e o gerador de corpo de cada uma"""
+    return {
+        ROTA_FINANCIAMENTO: gerador.plano,
+        ROTA_CARTEIRA: gerador.carteira,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Serviço local
+# ---------------------------------------------------------------------------
+
+def porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def aguardar_porta(porta: int, limite_s: float = 30) -> None:
+    fim = time.monotonic() + limite_s
+    while time.monotonic() < fim:
+        try:
+            with socket.create_connection(('127.0.0.1', porta), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Serviço não respondeu na porta {porta}")
+
+
+def iniciar_servico(workers: int, porta: int) -> subprocess.Popen:
+    """Sobe o serviço com gunicorn (N workers) ou com o servidor do Flask (1 processo)"""
+    if shutil.which('gunicorn'):
+        comando = ['gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{porta}', '--log-level', 'warning',
+                   'financiamento_api:app']
+    else:
+        if workers > 1:
+            print("AVISO: gunicorn não encontrado; usando o servidor do Flask com 1 processo")
+        comando = [sys.executable, '-c',
+                   f"from financiamento_api import app; app.run(host='127.0.0.1', port={porta}, threaded=True)"]
+    processo = subprocess.Popen(comando, cwd=DIRETORIO, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    aguardar_porta(porta)
+    return processo
+
+
+# ---------------------------------------------------------------------------
+# Execução e métricas
+# ---------------------------------------------------------------------------
+
+def percentil(valores_ordenados: List[float], p: float) -> Optional[float]:
+    """Percentil pelo método do posto mais próximo"""
+    if not valores_ordenados:
+        return None
+    posto = max(1, math.ceil(p / 100 * len(valores_ordenados)))
+    return valores_ordenados[min(posto, len(valores_ordenados)) - 1]
+
+
+def executar_nivel(url_base: str, rotas: Dict[str, float], geradores: Dict[str, Callable[[], Dict[str, Any]]],
+                   concorrencia: int, duracao_s: float, timeout_s: float, semente: int) -> Dict[str, Any]:
+    """Executa um nível de concorrência em laço fechado e agrega as métricas por rota"""
+    nomes = list(rotas)
+    pesos = [rotas[n] for n in nomes]
+    registros: List[tuple] = []
+    lock = threading.Lock()
+    fim = time.monotonic() + duracao_s
+
+    def cliente(indice: int) -> None:
+        aleatorio = random.Random(semente + indice)
+        locais = []
+        while time.monotonic() < fim:
+            rota = aleatorio.choices(nomes, pesos)[0]
+            corpo = json.dumps(geradores[rota]()).encode('utf-8')
+            requisicao = urllib.request.Request(url_base + rota, data=corpo, method='POST', headers={
+                'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'})
+            inicio = time.perf_counter()
+            try:
+                with urllib.request.urlopen(requisicao, timeout=timeout_s) as resposta:
+                    resposta.read()
+                    status = resposta.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+            except Exception:
+                status = 0
+            locais.append((rota, status, (time.perf_counter() - inicio) * 1000))
+        with lock:
+            registros.extend(locais)
+
+    inicio = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        list(executor.map(cliente, range(concorrencia)))
+    decorrido = time.monotonic() - inicio
+
+    por_rota = {}
+    for rota in nomes + ['*']:
+        selecionados = [r for r in registros if rota == '*' or r[0] == rota]
+        latencias = sorted(r[2] for r in selecionados if r[1] == 200)
+        erros = sum(1 for r in selecionados if r[1] != 200)
+        por_rota[rota] = {
+            "requisicoes": len(selecionados),
+            "erros": erros,
+            "taxaErros": erros / len(selecionados) if selecionados else 0.0,
+            "throughput": len(latencias) / decorrido if decorrido else 0.0,
+            "p50Ms": percentil(latencias, 50),
+            "p95Ms": percentil(latencias, 95),
+            "p99Ms": percentil(latencias, 99),
+        }
+    return {"concorrencia": concorrencia, "duracaoS": decorrido, "rotas": por_rota}
+
+
+def _ms(valor: Optional[float]) -> str:
+    return f"{valor:9.1f}" if valor is not None else f"{'-':>9}"
+
+
+def imprimir_tabela(resultados: List[Dict[str, Any]]) -> None:
+    print(f"{'workers':>7} {'conc.':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'erros':>7}")
+    for r in resultados:
+        total = r["rotas"]["*"]
+        print(f"{r['workers']:>7} {r['concorrencia']:>5} {total['throughput']:9.1f} {_ms(total['p50Ms'])} "
+              f"{_ms(total['p95Ms'])} {_ms(total['p99Ms'])} {total['taxaErros']:7.2%}")
+
+
+def comparar(resultados: List[Dict[str, Any]], arquivo_anterior: str) -> None:
+    """Mostra a variação de throughput e p95 em relação a uma execução anterior"""
+    with open(arquivo_anterior, encoding='utf-8') as f:
+        anteriores = {(r['workers'], r['concorrencia']): r for r in json.load(f)['resultados']}
+    print(f"\nComparação com {arquivo_anterior}:")
+    for r in resultados:
+        anterior = anteriores.get((r['workers'], r['concorrencia']))
+        if not anterior:
+            continue
+        atual, antes = r['rotas']['*'], anterior['rotas']['*']
+        delta_tp = (atual['throughput'] / antes['throughput'] - 1) if antes['throughput'] else 0.0
+        delta_p95 = (atual['p95Ms'] / antes['p95Ms'] - 1) if atual['p95Ms'] and antes['p95Ms'] else 0.0
+        print(f"  workers={r['workers']} conc={r['concorrencia']}: throughput {delta_tp:+.1%}, p95 {delta_p95:+.1%}")
+
+
+def lista_inteiros(texto: str) -> List[int]:
+    return [int(v) for v in texto.split(',') if v]
+
+
+def mix_rotas(texto: str) -> Dict[str, float]:
+    """'/rota=peso,/outra=peso' -> {rota: peso}"""
+    rotas = {}
+    for item in texto.split(','):
+        rota, _, peso = item.partition('=')
+        rotas[rota.strip()] = float(peso or 1)
+    return rotas
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Teste de carga do serviço de cálculo de financiamento")
+    parser.add_argument('--url', help="URL de um serviço já em execução (não sobe o serviço local)")
+    parser.add_argument('--workers', type=lista_inteiros, default=[1], help="Números de workers, ex.: 1,2,4")
+    parser.add_argument('--concorrencia', type=lista_inteiros, default=[1, 8, 32], help="Clientes simultâneos")
+    parser.add_argument('--duracao', type=float, default=10, help="Duração de cada nível, em segundos")
+    parser.add_argument('--timeout', type=float, default=30, help="Timeout por requisição, em segundos")
+    parser.add_argument('--rotas', type=mix_rotas, default={ROTA_FINANCIAMENTO: 1.0},
+                        help=f"Mistura de rotas, ex.: {ROTA_FINANCIAMENTO}=9,{ROTA_CARTEIRA}=1")
+    parser.add_argument('--personalizado', type=float, default=0.2, help="Fração de planos personalizados")
+    parser.add_argument('--prazos', type=lista_inteiros, default=[24, 36, 48, 60], help="Prazos de entrega")
+    parser.add_argument('--reforco', type=float, default=0.5, help="Fração de planos com reforço")
+    parser.add_argument('--periodicidades', default='trimestral,semestral,anual')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', default=f"carga_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    parser.add_argument('--comparar', help="Arquivo JSON de uma execução anterior")
+    args = parser.parse_args()
+
+    gerador = GeradorPlanos(args.semente, args.personalizado, args.prazos, args.reforco,
+                            args.periodicidades.split(','))
+    geradores = payloads_por_rota(gerador)
+    desconhecidas = [r for r in args.rotas if r not in geradores]
+    if desconhecidas:
+        parser.error(f"Rotas sem gerador de carga: {', '.join(desconhecidas)}")
+
+    resultados = []
+    for workers in ([0] if args.url else args.workers):
+        processo = None
+        url_base = args.url
+        if not url_base:
+            porta = porta_livre()
+            processo = iniciar_servico(workers, porta)
+            url_base = f"http://127.0.0.1:{porta}"
+        try:
+            for concorrencia in args.concorrencia:
+                print(f"Executando workers={workers or 'externo'} concorrencia={concorrencia}...")
+                nivel = executar_nivel(url_base.rstrip('/'), args.rotas, geradores, concorrencia,
+                                       args.duracao, args.timeout, args.semente)
+                nivel["workers"] = workers
+                resultados.append(nivel)
+        finally:
+            if processo:
+                processo.terminate()
+                processo.wait()
+
+    imprimir_tabela(resultados)
+
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump({
+            "executadoEm": datetime.datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "parametros": {k: v for k, v in vars(args).items() if k not in ('saida', 'comparar')},
+            "resultados": resultados,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados gravados em {args.saida}")
+
+    if args.comparar:
+        comparar(resultados, args.comparar)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
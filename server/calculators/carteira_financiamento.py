@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Agregação de carteira - recebíveis de um empreendimento inteiro
+----------------------------------------------------------------
+Cada unidade vendida tem o seu próprio FinanciamentoPlantaInput e um mês de
+início (mês da venda) no calendário comum da carteira. O resultado é a linha
+do tempo mensal agregada de recebimentos por tipo de pagamento
+(Entrada/Parcela/Reforço/Chaves) e do saldo devedor em aberto. A fase de
+financiamento bancário não entra na carteira: ela é recebível do banco, não
+do incorporador. Unidades com financiamentoBancario têm o cronograma cortado
+no mês das chaves (como em aplicar_financiamento_bancario) e, depois dele,
+não deixam saldo em aberto com o incorporador.
+
+A agregação nunca materializa as parcelas de cada unidade:
+
+- Unidades no parcelamento automático são agrupadas por base normalizada e
+  mês de início; como o cronograma é linear nos valores monetários, basta
+  somar os coeficientes do grupo e combinar a base uma única vez.
+- Unidades no parcelamento personalizado são processadas em lotes de
+  `tamanhoLote` linhas com o núcleo vetorizado.
+"""
+
+import datetime
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from financiamento_planta_corrigido import FinanciamentoPlantaInput, formatar_data
+from cache_base_normalizada import cache_bases, chave_base, coeficientes
+from cronograma_vetorizado import (
+    TIPOS_PAGAMENTO,
+    colunas_personalizadas,
+    evoluir_saldos,
+    valor_entrada_efetivo,
+)
+
+
+# Tipos de pagamento recebidos pelo incorporador
+TIPOS_CARTEIRA = TIPOS_PAGAMENTO[:TIPOS_PAGAMENTO.index('Financiamento')]
+
+
+class UnidadeCarteira(BaseModel):
+    """Unidade vendida e o mês da venda no calendário da carteira"""
+    identificador: Optional[str] = None
+    mesInicio: int = Field(0, ge=0)
+    plano: FinanciamentoPlantaInput
+
+
+class CarteiraInput(BaseModel):
+    """Modelo de entrada para a agregação da carteira"""
+    unidades: List[UnidadeCarteira] = Field(..., min_length=1)
+    tamanhoLote: int = Field(256, gt=0)
+
+
+class _Acumulador:
+    """Linha do tempo agregada da carteira"""
+
+    def __init__(self, horizonte: int):
+        self.recebimentos = np.zeros((len(TIPOS_CARTEIRA), horizonte + 1))
+        self.saldo_devedor = np.zeros(horizonte + 1)
+        # Saldo final de cada unidade, propagado após o último mês por soma acumulada
+        self.saldo_residual = np.zeros(horizonte + 2)
+
+    def adicionar(self, inicio: int, entrada: float, saldo_inicial: float,
+                  codigos_tipo: np.ndarray, valor_corrigido: np.ndarray, saldo_devedor: np.ndarray,
+                  quitado: bool = False) -> None:
+        """
+        Soma um cronograma (ou a soma de vários com o mesmo calendário) a partir do mês `inicio`.
+        Com `quitado`, o saldo final não é propagado após o último mês (quitado pelo banco).
+        """
+        prazo = valor_corrigido.shape[-1]
+        fim = inicio + prazo
+
+        self.recebimentos[0, inicio] += entrada
+        for codigo in range(1, len(TIPOS_CARTEIRA)):
+            self.recebimentos[codigo, inicio + 1:fim + 1] += np.where(codigos_tipo == codigo, valor_corrigido, 0)
+
+        self.saldo_devedor[inicio] += saldo_inicial
+        self.saldo_devedor[inicio + 1:fim + 1] += saldo_devedor
+        if not quitado:
+            self.saldo_residual[fim + 1] += saldo_devedor[-1] if prazo else saldo_inicial
+
+    def linha_do_tempo(self) -> Dict[str, np.ndarray]:
+        saldo = self.saldo_devedor + np.cumsum(self.saldo_residual)[:-1]
+        # Saldo que permanece em aberto após o horizonte (as unidades quitadas pelo banco não entram)
+        return {"recebimentos": self.recebimentos, "saldoDevedor": saldo,
+                "saldoResidual": float(self.saldo_residual.sum())}
+
+
+def prazo_carteira(plano: FinanciamentoPlantaInput) -> int:
+    """Último mês do cronograma recebido pelo incorporador (o mês das chaves, com financiamento bancário)"""
+    if plano.financiamentoBancario:
+        return min(plano.prazoEntrega, plano.prazoPagamento)
+    return plano.prazoPagamento
+
+
+def _agregar_automaticas(unidades: List[UnidadeCarteira], acumulador: _Acumulador, tamanho_lote: int) -> None:
+    """Combina as bases normalizadas com a soma dos coeficientes de cada grupo"""
+    grupos: Dict[tuple, Dict[int, np.ndarray]] = defaultdict(dict)
+    for unidade in unidades:
+        plano = unidade.plano
+        coef = coeficientes(plano, valor_entrada_efetivo(plano))
+        # Unidades com fase bancária são cortadas nas chaves: grupo à parte
+        corte = prazo_carteira(plano) if plano.financiamentoBancario else None
+        por_inicio = grupos[(chave_base(plano), corte)]
+        if unidade.mesInicio in por_inicio:
+            por_inicio[unidade.mesInicio] += coef
+        else:
+            por_inicio[unidade.mesInicio] = coef
+
+    for (chave, corte), por_inicio in grupos.items():
+        base = cache_bases.obter(chave)
+        codigos_tipo = base.codigos_tipo[:corte]
+        inicios = list(por_inicio)
+
+        for i in range(0, len(inicios), tamanho_lote):
+            lote = inicios[i:i + tamanho_lote]
+            coefs = np.stack([por_inicio[inicio] for inicio in lote])
+            # (lote, k) x (k, 4, prazo) -> (lote, 4, prazo)
+            colunas = np.tensordot(coefs, base.colunas, axes=1)
+            for inicio, coef, (_, valor_corrigido, saldo_devedor, _) in zip(lote, coefs, colunas):
+                # coef = [imóvel, entrada, ...]: saldo do mês 0 = imóvel - entrada
+                acumulador.adicionar(inicio, coef[1], coef[0] - coef[1], codigos_tipo, valor_corrigido[:corte],
+                                     saldo_devedor[:corte], quitado=corte is not None)
+
+
+def _agregar_personalizadas(unidades: List[UnidadeCarteira], acumulador: _Acumulador, tamanho_lote: int) -> None:
+    """Processa as unidades personalizadas em lotes com o núcleo vetorizado"""
+    for i in range(0, len(unidades), tamanho_lote):
+        lote = unidades[i:i + tamanho_lote]
+        prazo_max = max(u.plano.prazoPagamento for u in lote)
+
+        valores_base = np.zeros((len(lote), prazo_max))
+        taxas = np.zeros((len(lote), prazo_max))
+        codigos_tipo = np.zeros((len(lote), prazo_max), dtype=np.int8)
+        entradas = np.zeros(len(lote))
+        for linha, unidade in enumerate(lote):
+            plano = unidade.plano
+            prazo = plano.prazoPagamento
+            vb, tx, cod = colunas_personalizadas(plano)
+            valores_base[linha, :prazo] = vb
+            taxas[linha, :prazo] = tx
+            codigos_tipo[linha, :prazo] = cod
+            entradas[linha] = valor_entrada_efetivo(plano)
+
+        saldos_iniciais = np.array([u.plano.valorImovel for u in lote]) - entradas
+        _, valor_corrigido, saldo_devedor, _ = evoluir_saldos(valores_base, taxas, saldos_iniciais, saldos_iniciais)
+
+        for linha, unidade in enumerate(lote):
+            prazo = prazo_carteira(unidade.plano)
+            acumulador.adicionar(unidade.mesInicio, entradas[linha], saldos_iniciais[linha], codigos_tipo[linha, :prazo],
+                                 valor_corrigido[linha, :prazo], saldo_devedor[linha, :prazo],
+                                 quitado=unidade.plano.financiamentoBancario is not None)
+
+
+def agregar_carteira(input_data: Any, data_base: Optional[datetime.date] = None) -> Dict[str, Any]:
+    """
+    Agrega os recebíveis mensais de uma carteira de unidades.
+
+    Args:
+        input_data: CarteiraInput ou dicionário equivalente
+        data_base: Data do mês 0 da carteira (padrão: hoje)
+
+    Returns:
+        Linha do tempo agregada por tipo de pagamento e saldo devedor em aberto;
+        saldoResidual é o saldo que continua em aberto após o horizonte
+    """
+    if isinstance(input_data, dict):
+        input_data = CarteiraInput(**input_data)
+
+    unidades = input_data.unidades
+    horizonte = max(u.mesInicio + prazo_carteira(u.plano) for u in unidades)
+    acumulador = _Acumulador(horizonte)
+
+    automaticas = [u for u in unidades if u.plano.tipoParcelamento == 'automatico']
+    personalizadas = [u for u in unidades if u.plano.tipoParcelamento == 'personalizado']
+    _agregar_automaticas(automaticas, acumulador, input_data.tamanhoLote)
+    _agregar_personalizadas(personalizadas, acumulador, input_data.tamanhoLote)
+
+    linha_do_tempo = acumulador.linha_do_tempo()
+    recebimentos = linha_do_tempo["recebimentos"]
+    data_base = data_base or datetime.date.today()
+
+    return {
+        "meses": list(range(horizonte + 1)),
+        "datas": [formatar_data(data_base, mes) for mes in range(horizonte + 1)],
+        "recebimentos": {tipo: recebimentos[codigo].tolist() for codigo, tipo in enumerate(TIPOS_CARTEIRA)},
+        "recebimentoTotal": recebimentos.sum(axis=0).tolist(),
+        "saldoDevedor": linha_do_tempo["saldoDevedor"].tolist(),
+        "saldoResidual": linha_do_tempo["saldoResidual"],
+        "resumo": {
+            "totalUnidades": len(unidades),
+            "unidadesAutomaticas": len(automaticas),
+            "unidadesPersonalizadas": len(personalizadas),
+            "horizonte": horizonte,
+            "totalPorTipo": {tipo: float(recebimentos[codigo].sum()) for codigo, tipo in enumerate(TIPOS_CARTEIRA)},
+            "totalRecebido": float(recebimentos.sum()),
+        }
+    }
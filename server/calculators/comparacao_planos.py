@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Comparação de planos de pagamento por valor presente
+-----------------------------------------------------
+O corretor compara várias alternativas para a mesma unidade (mais entrada,
+reforços trimestrais ou anuais, chaves maiores, outros prazos). Cada
+variante é o plano base com alguns campos substituídos. Todas as variantes
+são avaliadas em uma única passada do núcleo vetorizado, sobre a matriz
+(variantes x meses) de valores base e taxas:
+
+- valorPresente: entrada + soma dos pagamentos descontados à taxa informada
+  (vp = soma vc(m) / (1 + d)^m);
+- custoTotalCorrigido: entrada + soma dos valores corrigidos;
+- picoSaldoDevedor: maior saldo devedor do cronograma (inclui o mês 0).
+
+O resultado vem ordenado pelo valor presente, do menor (mais barato para o
+comprador) para o maior. Variantes com financiamento bancário passam pelo
+cálculo completo, porque a fase bancária muda o cronograma após as chaves.
+As métricas usam sempre o cronograma inteiro: mesInicio/mesFim do plano base
+não restringem a comparação.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from financiamento_planta_corrigido import FinanciamentoPlantaInput
+from cache_base_normalizada import (
+    cache_bases,
+    calcular_cronograma_completo,
+    chave_base,
+    coeficientes,
+)
+from cronograma_vetorizado import colunas_personalizadas, evoluir_saldos, valor_entrada_efetivo
+
+
+class VariantePlano(BaseModel):
+    """Variante do plano base: nome e campos de FinanciamentoPlantaInput a substituir"""
+    nome: Optional[str] = None
+    alteracoes: Dict[str, Any] = Field(default_factory=dict)
+
+
+class ComparacaoPlanosInput(BaseModel):
+    """Modelo de entrada para a comparação de planos"""
+    plano: FinanciamentoPlantaInput
+    variantes: List[VariantePlano] = Field(..., min_length=1)
+    # Taxa de desconto em % ao mês
+    taxaDescontoMensal: float = Field(..., ge=0)
+
+
+def planos_variantes(input_data: ComparacaoPlanosInput) -> List[FinanciamentoPlantaInput]:
+    """Aplica as alterações de cada variante ao plano base e valida o resultado"""
+    base = input_data.plano.model_dump()
+    planos = []
+    for variante in input_data.variantes:
+        plano = FinanciamentoPlantaInput(**{**base, **variante.alteracoes})
+        plano.validar_tipo_parcelamento()
+        planos.append(plano)
+    return planos
+
+
+def _colunas_variante(plano: FinanciamentoPlantaInput):
+    """Valores base e taxas dos meses 1..prazoPagamento de uma variante"""
+    if plano.tipoParcelamento == 'automatico':
+        base = cache_bases.obter(chave_base(plano))
+        valores_base = coeficientes(plano, valor_entrada_efetivo(plano)) @ base.colunas[:, 0]
+        return valores_base, base.taxas
+    valores_base, taxas, _ = colunas_personalizadas(plano)
+    return valores_base, taxas
+
+
+def comparar_planos(input_data: Any) -> Dict[str, Any]:
+    """
+    Avalia as variantes e as ordena pelo valor presente.
+
+    Args:
+        input_data: ComparacaoPlanosInput ou dicionário equivalente
+
+    Returns:
+        Dicionário com "planos" (ordenados pelo valor presente) e a taxa usada
+    """
+    if isinstance(input_data, dict):
+        input_data = ComparacaoPlanosInput(**input_data)
+
+    planos = planos_variantes(input_data)
+    n_planos = len(planos)
+    vetorizados = [i for i, plano in enumerate(planos) if not plano.financiamentoBancario]
+    entradas = np.array([valor_entrada_efetivo(plano) for plano in planos])
+    saldos_iniciais = np.array([plano.valorImovel for plano in planos]) - entradas
+
+    # Colunas preenchidas com zeros após o prazo: saldo constante, sem pagamentos
+    prazo_max = max(plano.prazoPagamento for plano in planos)
+    valores_base = np.zeros((n_planos, prazo_max))
+    taxas = np.zeros((n_planos, prazo_max))
+    for i in vetorizados:
+        vb, tx = _colunas_variante(planos[i])
+        valores_base[i, :len(vb)] = vb
+        taxas[i, :len(tx)] = tx
+
+    _, valor_corrigido, saldo_devedor, _ = evoluir_saldos(valores_base, taxas, saldos_iniciais, saldos_iniciais)
+
+    # Fase bancária: o cronograma muda de comprimento após as chaves (sempre o
+    # cronograma completo, mesmo que o plano base traga mesInicio/mesFim)
+    pagamentos = {}
+    for i, plano in enumerate(planos):
+        if plano.financiamentoBancario:
+            cronograma = calcular_cronograma_completo(plano)
+            apos_entrada = cronograma.meses > 0
+            pagamentos[i] = (cronograma.meses[apos_entrada],
+                             cronograma.coluna('valorCorrigido')[apos_entrada],
+                             cronograma.coluna('saldoDevedor')[apos_entrada])
+
+    meses = np.arange(1, prazo_max + 1)
+    fator_desconto = (1 + input_data.taxaDescontoMensal / 100) ** -meses
+    valor_presente = entradas + valor_corrigido @ fator_desconto
+    custo_total = entradas + valor_corrigido.sum(axis=1)
+    pico_saldo = np.maximum(saldos_iniciais, saldo_devedor.max(axis=1))
+
+    for i, (meses_i, vc, saldo) in pagamentos.items():
+        valor_presente[i] = entradas[i] + vc @ (1 + input_data.taxaDescontoMensal / 100) ** -meses_i
+        custo_total[i] = entradas[i] + vc.sum()
+        pico_saldo[i] = max(saldos_iniciais[i], saldo.max(initial=-np.inf))
+
+    resultado = []
+    for posicao, i in enumerate(np.argsort(valor_presente, kind='stable').tolist()):
+        plano = planos[i]
+        resultado.append({
+            "posicao": posicao + 1,
+            "indice": i,
+            "nome": input_data.variantes[i].nome,
+            "valorEntrada": float(entradas[i]),
+            "prazoPagamento": plano.prazoPagamento,
+            "valorPresente": float(valor_presente[i]),
+            "custoTotalCorrigido": float(custo_total[i]),
+            "picoSaldoDevedor": float(pico_saldo[i]),
+        })
+
+    return {
+        "taxaDescontoMensal": input_data.taxaDescontoMensal,
+        "planos": resultado,
+    }
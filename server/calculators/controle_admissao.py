@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Controle de admissão e fila limitada do serviço de cálculo
+-----------------------------------------------------------
+Cada requisição recebe um custo estimado a partir de prazoPagamento e do
+número de parcelas personalizadas. O trabalho vai para um pool fixo de
+workers, e a soma dos custos em execução ou na fila é limitada:
+
+- se a nova requisição não cabe na fila, ela é recusada na hora
+  (FilaSaturada -> HTTP 429 com Retry-After), em vez de fazer a latência
+  de todos crescer sem limite;
+- cada requisição tem um prazo; se ele vence ainda na fila, o cálculo nem
+  começa, e quem chamou recebe PrazoExcedido (HTTP 503).
+
+O Retry-After é estimado pelo excesso de custo na fila e pelo tempo médio
+observado por unidade de custo.
+"""
+
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import Any, Callable, Dict, Optional
+
+
+# Custo do parcelamento automático por mês (atendido pelo cache de bases)
+CUSTO_MES_AUTOMATICO = 1 / 60
+# O parcelamento personalizado percorre as parcelas a cada mês (custo quadrático)
+CUSTO_MES_PERSONALIZADO = 1 / 7200
+# Projeções anuais por cenário (vetorizadas; o custo é quase só montar o JSON)
+CUSTO_PROJECAO = 1 / 20
+
+
+class FilaSaturada(Exception):
+    """A fila de cálculo não comporta a requisição"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Fila de cálculo saturada; tente novamente em {retry_after}s")
+        self.retry_after = retry_after
+
+
+class PrazoExcedido(Exception):
+    """A requisição não foi concluída dentro do prazo"""
+
+
+def estimar_custo_plano(plano: Dict[str, Any]) -> float:
+    """Custo relativo de um plano (1 unidade ~ um plano automático curto)"""
+    prazo = int(plano.get('prazoPagamento') or 0)
+    if plano.get('tipoParcelamento') == 'personalizado':
+        n_parcelas = len(plano.get('parcelasPersonalizadas') or [])
+        return 1 + prazo * (prazo + n_parcelas) * CUSTO_MES_PERSONALIZADO
+    return 1 + prazo * CUSTO_MES_AUTOMATICO
+
+
+def estimar_custo(dados: Dict[str, Any]) -> float:
+    """Custo de uma requisição de cálculo, de carteira, de projeções, do investidor, de diferença ou de comparação de planos"""
+    if 'unidades' in dados:
+        return sum(estimar_custo_plano(u.get('plano') or {}) for u in dados.get('unidades') or [])
+    if 'projecoes' in dados:
+        return 1 + len(dados.get('projecoes') or []) * len(dados.get('prazos') or [5, 10, 15]) * CUSTO_PROJECAO
+    if 'cenarios' in dados:
+        return estimar_custo_plano(dados.get('plano') or {}) + len(dados.get('cenarios') or {}) * CUSTO_PROJECAO
+    if 'planoNovo' in dados:
+        return estimar_custo_plano(dados.get('planoAnterior') or {}) + estimar_custo_plano(dados.get('planoNovo') or {})
+    if 'variantes' in dados:
+        base = dados.get('plano') or {}
+        return sum(estimar_custo_plano({**base, **(v.get('alteracoes') or {})}) for v in dados.get('variantes') or [])
+    return estimar_custo_plano(dados)
+
+
+class ControleAdmissao:
+    """Pool de workers com fila limitada por custo e prazo por requisição"""
+
+    def __init__(self, workers: int, capacidade: float, prazo_padrao_s: float):
+        self.workers = workers
+        self.capacidade = capacidade
+        self.prazo_padrao_s = prazo_padrao_s
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='calculo')
+        self._lock = threading.Lock()
+        self._custo_pendente = 0.0
+        # Média móvel (EWMA) dos segundos gastos por unidade de custo
+        self._segundos_por_unidade = 0.005
+
+    def estatisticas(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "capacidade": self.capacidade,
+                "custoPendente": self._custo_pendente,
+                "segundosPorUnidade": self._segundos_por_unidade,
+            }
+
+    def _retry_after(self, custo: float) -> int:
+        excesso = self._custo_pendente + custo - self.capacidade
+        return max(1, math.ceil(excesso * self._segundos_por_unidade / self.workers))
+
+    def executar(self, funcao: Callable[[], Any], custo: float, prazo_s: Optional[float] = None) -> Any:
+        """
+        Executa `funcao` no pool, respeitando a capacidade da fila e o prazo.
+
+        Raises:
+            FilaSaturada: a fila não comporta o custo da requisição
+            PrazoExcedido: o prazo venceu na fila ou durante o cálculo
+        """
+        prazo_s = prazo_s or self.prazo_padrao_s
+        limite = time.monotonic() + prazo_s
+
+        with self._lock:
+            # Uma requisição maior que a capacidade ainda é aceita com a fila vazia
+            if self._custo_pendente > 0 and self._custo_pendente + custo > self.capacidade:
+                raise FilaSaturada(self._retry_after(custo))
+            self._custo_pendente += custo
+
+        def tarefa():
+            if time.monotonic() >= limite:
+                raise PrazoExcedido("Prazo vencido antes do início do cálculo")
+            inicio = time.monotonic()
+            try:
+                return funcao()
+            finally:
+                decorrido = time.monotonic() - inicio
+                with self._lock:
+                    self._segundos_por_unidade = 0.9 * self._segundos_por_unidade + 0.1 * decorrido / max(custo, 1e-9)
+
+        futuro = self._executor.submit(tarefa)
+
+        def liberar(_):
+            with self._lock:
+                self._custo_pendente -= custo
+
+        futuro.add_done_callback(liberar)
+
+        try:
+            return futuro.result(timeout=max(0.0, limite - time.monotonic()))
+        except FuturesTimeoutError:
+            # Se ainda estiver na fila, sai sem executar; se já começou, termina em segundo plano
+            futuro.cancel()
+            raise PrazoExcedido(f"Cálculo não concluído em {prazo_s:.1f}s")
+
+
+controle_admissao = ControleAdmissao(
+    workers=int(os.environ.get('CALCULO_WORKERS', os.cpu_count() or 2)),
+    capacidade=float(os.environ.get('CALCULO_CAPACIDADE_FILA', 200)),
+    prazo_padrao_s=float(os.environ.get('CALCULO_PRAZO_S', 10)),
+)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Núcleo vetorizado do cronograma de financiamento na planta
+-----------------------------------------------------------
+Reproduz, com operações do NumPy, a mesma recorrência mês a mês usada em
+financiamento_planta_corrigido.calcular_financiamento_planta:
+
+- correcaoAcumulada(m) = correcaoAcumulada(m-1) + taxa(m)
+- valorCorrigido(m)    = valorBase(m) * (1 + correcaoAcumulada(m) / 100)
+- saldoDevedor(m)      = saldoDevedor(m-1) * (1 + taxa(m) / 100) - valorCorrigido(m)
+- saldoLiquido(1)      = valorImovel - entrada - desconto
+- saldoLiquido(m)      = saldoLiquido(m-1) - valorCorrigido(m-1)
+
+Todas as funções operam sobre o último eixo, de modo que uma matriz
+(n_planos, n_meses) é processada em uma única chamada.
+"""
+
+import datetime
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from financiamento_planta_corrigido import FinanciamentoPlantaInput, formatar_data
+
+# Tipos de pagamento; a posição é o código usado nas colunas vetorizadas
+TIPOS_PAGAMENTO = ('Entrada', 'Parcela', 'Reforço', 'Chaves', 'Financiamento')
+
+# Código dos meses sem pagamento no parcelamento personalizado
+SEM_PAGAMENTO = -1
+
+
+def taxas_mensais(prazo_entrega: int, prazo_pagamento: int,
+                  correcao_ate_chaves: float, correcao_apos_chaves: float) -> np.ndarray:
+    """Retorna as taxas de correção (em %) dos meses 1..prazo_pagamento"""
+    meses = np.arange(1, prazo_pagamento + 1)
+    return np.where(meses <= prazo_entrega, correcao_ate_chaves, correcao_apos_chaves).astype(float)
+
+
+def colunas_personalizadas(input_data: FinanciamentoPlantaInput) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Colunas densas (meses 1..prazo_pagamento) do parcelamento personalizado.
+
+    Como no cálculo original, meses sem parcela não geram linha nem correção:
+    a taxa desses meses é zerada, de modo que correcaoAcumulada e saldoDevedor
+    evoluem apenas nos meses com pagamento. Havendo mais de uma parcela no
+    mesmo mês, vale a primeira informada.
+
+    Returns:
+        Tupla (valores_base, taxas, codigos_tipo); codigos_tipo usa SEM_PAGAMENTO
+        nos meses sem parcela
+    """
+    prazo_pagamento = input_data.prazoPagamento
+    taxas_plano = taxas_mensais(input_data.prazoEntrega, prazo_pagamento,
+                                input_data.correcaoMensalAteChaves, input_data.correcaoMensalAposChaves)
+
+    valores_base = np.zeros(prazo_pagamento)
+    codigos_tipo = np.full(prazo_pagamento, SEM_PAGAMENTO, dtype=np.int8)
+    for parcela in reversed(sorted(input_data.parcelasPersonalizadas or [], key=lambda p: p.mes)):
+        if 1 <= parcela.mes <= prazo_pagamento:
+            valores_base[parcela.mes - 1] = parcela.valor
+            codigos_tipo[parcela.mes - 1] = TIPOS_PAGAMENTO.index(parcela.tipo)
+
+    taxas = np.where(codigos_tipo != SEM_PAGAMENTO, taxas_plano, 0.0)
+    return valores_base, taxas, codigos_tipo
+
+
+def evoluir_saldos(valores_base: np.ndarray, taxas: np.ndarray,
+                   saldo_inicial, saldo_liquido_inicial,
+                   correcao_inicial=0.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Aplica a recorrência do cronograma sobre o último eixo.
+
+    Args:
+        valores_base: Valores base dos meses 1..n (shape (..., n))
+        taxas: Taxas de correção em % dos meses 1..n (shape (..., n))
+        saldo_inicial: Saldo devedor no mês 0 (escalar ou shape (...))
+        saldo_liquido_inicial: Saldo líquido no mês 1 (escalar ou shape (...))
+        correcao_inicial: Correção acumulada no mês 0 (para continuar um cronograma a partir do meio)
+
+    Returns:
+        Tupla (correcaoAcumulada, valorCorrigido, saldoDevedor, saldoLiquido)
+    """
+    valores_base = np.asarray(valores_base, dtype=float)
+    taxas = np.broadcast_to(np.asarray(taxas, dtype=float), valores_base.shape)
+    saldo_inicial = np.asarray(saldo_inicial, dtype=float)[..., None]
+    saldo_liquido_inicial = np.asarray(saldo_liquido_inicial, dtype=float)[..., None]
+
+    correcao_acumulada = np.asarray(correcao_inicial, dtype=float)[..., None] + np.cumsum(taxas, axis=-1)
+    valor_corrigido = valores_base * (1 + correcao_acumulada / 100)
+
+    # Solução fechada da recorrência linear: S(m) = G(m) * (S(0) - soma_{j<=m} vc(j) / G(j)),
+    # com G(m) o fator de correção composto até o mês m (taxas >= 0, logo G >= 1)
+    fator = np.cumprod(1 + taxas / 100, axis=-1)
+    saldo_devedor = fator * (saldo_inicial - np.cumsum(valor_corrigido / fator, axis=-1))
+
+    pago_antes = np.cumsum(valor_corrigido, axis=-1) - valor_corrigido
+    saldo_liquido = saldo_liquido_inicial - pago_antes
+
+    return correcao_acumulada, valor_corrigido, saldo_devedor, saldo_liquido
+
+
+@lru_cache(maxsize=64)
+def datas_cronograma(data_base: datetime.date, prazo_pagamento: int) -> Tuple[str, ...]:
+    """Datas formatadas dos meses 0..prazo_pagamento a partir da data base"""
+    return tuple(formatar_data(data_base, mes) for mes in range(prazo_pagamento + 1))
+
+
+def valor_entrada_efetivo(input_data: FinanciamentoPlantaInput) -> float:
+    """Entrada efetiva - usa o valor direto ou calcula com base no percentual"""
+    if input_data.percentualEntrada:
+        return round(input_data.valorImovel * (input_data.percentualEntrada / 100), 2)
+    return input_data.valorEntrada
+
+
+def calcular_resumo(input_data: FinanciamentoPlantaInput, entrada: float, valores_base: np.ndarray,
+                    valor_corrigido: np.ndarray, total_parcelas: int) -> Dict[str, Any]:
+    """
+    Resumo com as mesmas regras do cálculo original, a partir das colunas dos
+    meses com pagamento (o mês 0 nunca tem correção).
+    """
+    valor_imovel = input_data.valorImovel
+    diferenca = valor_corrigido - valores_base
+    total_correcao = float(diferenca[diferenca > 0].sum())
+    valor_total = entrada + float(valor_corrigido.sum())
+    percentual_correcao = (total_correcao / (valor_total - total_correcao) * 100) if total_correcao > 0 and (valor_total - total_correcao) > 0 else 0
+
+    return {
+        "valorImovel": valor_imovel,
+        "valorEntrada": entrada,
+        "valorFinanciado": valor_imovel - entrada,
+        "prazoEntrega": input_data.prazoEntrega,
+        "prazoPagamento": input_data.prazoPagamento,
+        "totalParcelas": total_parcelas,
+        "totalCorrecao": total_correcao,
+        "percentualCorrecao": percentual_correcao,
+        "valorTotal": valor_total
+    }
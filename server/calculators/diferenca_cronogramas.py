@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Diferença mês a mês entre dois cronogramas (simulações "e se")
+---------------------------------------------------------------
+Quando o corretor altera um parâmetro, a interface mostra o que mudou em
+relação ao plano anterior. Em vez de baixar os dois cronogramas completos e
+compará-los no navegador, os dois planos são calculados aqui na forma
+compacta, alinhados por mês e comparados com operações do NumPy.
+
+Alinhamento (a união dos meses dos dois cronogramas):
+
+- valorCorrigido: mês sem linha em um dos planos conta como pagamento zero;
+- saldoDevedor e saldoLiquido: mês sem linha repete o último saldo do plano
+  (no parcelamento personalizado o saldo não evolui nos meses sem parcela, e
+  após o fim do prazo o saldo fica parado).
+
+Só voltam os meses em que alguma diferença passa da tolerância (em R$) ou
+em que o tipo de pagamento muda, o que mantém a resposta pequena quando a
+alteração é local (um reforço a mais, outra data de chaves). O resumo traz
+a diferença de todos os totais numéricos.
+"""
+
+from typing import Any, Dict
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from financiamento_planta_corrigido import FinanciamentoPlantaInput
+from cache_base_normalizada import calcular_cronograma_completo
+from cronograma_vetorizado import TIPOS_PAGAMENTO
+from resultado_compacto import ResultadoCompacto
+
+
+# Colunas comparadas, na ordem das diferenças na resposta
+COLUNAS_DIFERENCA = ('valorCorrigido', 'saldoDevedor', 'saldoLiquido')
+
+# Código de tipo dos meses sem linha no plano
+SEM_LINHA = -1
+
+
+class DiferencaCronogramasInput(BaseModel):
+    """Modelo de entrada para a diferença entre dois planos"""
+    planoAnterior: FinanciamentoPlantaInput
+    planoNovo: FinanciamentoPlantaInput
+    # Diferença mínima (em R$) para o mês constar da resposta
+    tolerancia: float = Field(0.01, ge=0)
+
+
+def alinhar(resultado: ResultadoCompacto, meses: np.ndarray) -> Dict[str, np.ndarray]:
+    """Colunas do cronograma nos meses dados (ordenados, contendo todos os meses do cronograma)"""
+    posicoes = np.searchsorted(meses, resultado.meses)
+    presente = np.zeros(len(meses), dtype=bool)
+    presente[posicoes] = True
+
+    codigos = np.full(len(meses), SEM_LINHA, dtype=np.int8)
+    codigos[posicoes] = resultado.codigos_tipo
+
+    valor_corrigido = np.zeros(len(meses))
+    valor_corrigido[posicoes] = resultado.coluna('valorCorrigido')
+
+    # Índice da última linha do plano até cada mês (o mês 0 sempre existe)
+    ultima_linha = np.maximum.accumulate(np.where(presente, np.arange(len(meses)), 0))
+    colunas = {"codigos_tipo": codigos, "valorCorrigido": valor_corrigido}
+    for nome in ('saldoDevedor', 'saldoLiquido'):
+        coluna = np.full(len(meses), np.nan)
+        coluna[posicoes] = resultado.coluna(nome)
+        colunas[nome] = coluna[ultima_linha]
+    return colunas
+
+
+def _numero(valor: Any) -> Any:
+    """NaN -> None, para o JSON"""
+    return None if valor != valor else valor
+
+
+def diferenca_resumos(anterior: Dict[str, Any], novo: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """Valores e diferença de cada total numérico presente nos dois resumos"""
+    diferencas = {}
+    for chave, valor_anterior in anterior.items():
+        valor_novo = novo.get(chave)
+        if isinstance(valor_anterior, (int, float)) and isinstance(valor_novo, (int, float)):
+            diferencas[chave] = {"anterior": valor_anterior, "novo": valor_novo, "diferenca": valor_novo - valor_anterior}
+    return diferencas
+
+
+def calcular_diferenca_cronogramas(input_data: Any) -> Dict[str, Any]:
+    """
+    Diferenças mês a mês (acima da tolerância) e dos totais entre dois planos.
+
+    Args:
+        input_data: DiferencaCronogramasInput ou dicionário equivalente
+
+    Returns:
+        Dicionário com "meses" (só os meses alterados), "resumo" e contagens
+    """
+    if isinstance(input_data, dict):
+        input_data = DiferencaCronogramasInput(**input_data)
+
+    anterior = calcular_cronograma_completo(input_data.planoAnterior)
+    novo = calcular_cronograma_completo(input_data.planoNovo)
+
+    meses = np.union1d(anterior.meses, novo.meses)
+    colunas_anterior = alinhar(anterior, meses)
+    colunas_novo = alinhar(novo, meses)
+
+    diferencas = np.stack([colunas_novo[nome] - colunas_anterior[nome] for nome in COLUNAS_DIFERENCA])
+    # Saldo líquido nulo nos dois planos (mês 0) não é diferença; nulo em só um deles é
+    nulo_alterado = np.isnan(colunas_anterior["saldoLiquido"]) != np.isnan(colunas_novo["saldoLiquido"])
+    tipo_alterado = colunas_anterior["codigos_tipo"] != colunas_novo["codigos_tipo"]
+    acima_tolerancia = (np.abs(np.nan_to_num(diferencas)) > input_data.tolerancia).any(axis=0)
+    alterados = np.flatnonzero(acima_tolerancia | nulo_alterado | tipo_alterado)
+
+    tipos = TIPOS_PAGAMENTO + (None,)  # SEM_LINHA = -1 -> None
+    linhas = []
+    for i in alterados.tolist():
+        linha = {
+            "mes": int(meses[i]),
+            "tipoAnterior": tipos[colunas_anterior["codigos_tipo"][i]],
+            "tipoNovo": tipos[colunas_novo["codigos_tipo"][i]],
+        }
+        for nome, diferenca in zip(COLUNAS_DIFERENCA, diferencas[:, i].tolist()):
+            linha[nome] = {
+                "anterior": _numero(float(colunas_anterior[nome][i])),
+                "novo": _numero(float(colunas_novo[nome][i])),
+                "diferenca": _numero(diferenca),
+            }
+        linhas.append(linha)
+
+    return {
+        "tolerancia": input_data.tolerancia,
+        "totalMeses": len(meses),
+        "mesesAlterados": len(linhas),
+        "meses": linhas,
+        "resumo": diferenca_resumos(anterior.resumo, novo.resumo),
+    }
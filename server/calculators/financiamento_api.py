@@ -11,11 +11,50 @@ implementando corretamente o cálculo do saldo líquido.
 import os
 import sys
 import json
-from flask import Flask, request, jsonify
-from financiamento_planta_corrigido import calcular_financiamento_planta
+import time
+from flask import Flask, Response, g, request, jsonify, send_file
+from financiamento_planta_corrigido import FinanciamentoPlantaInput
+from cache_base_normalizada import calcular_financiamento_planta_rapido
+from cache_respostas import cache_respostas, comprimir, etag_corresponde, etag_forte, hash_canonico, negociar_codificacao
+from armazem_resultados import armazem_resultados
+from carteira_financiamento import agregar_carteira
+from comparacao_planos import comparar_planos
+from projecoes_cenarios import calcular_projecoes_cenarios
+from pipeline_investidor import calcular_pipeline_investidor
+from diferenca_cronogramas import calcular_diferenca_cronogramas
+from controle_admissao import FilaSaturada, PrazoExcedido, controle_admissao, estimar_custo
+from tarefas_calculo import TarefaNaoEncontrada, gerenciador_tarefas
+from calibracao_indices import IndiceNaoEncontrado, calibracao_indices
+from captura_requisicoes import CABECALHOS_CAPTURADOS, captura_requisicoes
 
 app = Flask(__name__)
 
+
+def prazo_requisicao():
+    """Prazo da requisição em segundos (cabeçalho X-Prazo-Ms, se informado)"""
+    prazo_ms = request.headers.get('X-Prazo-Ms')
+    try:
+        return float(prazo_ms) / 1000 if prazo_ms else None
+    except ValueError:
+        return None
+
+
+@app.errorhandler(FilaSaturada)
+def fila_saturada(e):
+    """Fila cheia: recusa imediata com Retry-After"""
+    resposta = jsonify({"error": str(e)})
+    resposta.headers['Retry-After'] = str(e.retry_after)
+    return resposta, 429
+
+
+@app.errorhandler(PrazoExcedido)
+def prazo_excedido(e):
+    """Prazo da requisição vencido na fila ou no cálculo"""
+    resposta = jsonify({"error": str(e)})
+    resposta.headers['Retry-After'] = '1'
+    return resposta, 503
+
+
 @app.route('/api/calcular-financiamento', methods=['POST'])
 def api_calcular_financiamento():
     """Endpoint para calcular financiamento na planta"""
@@ -26,24 +65,262 @@ def api_calcular_financiamento():
         if not dados:
             return jsonify({"error": "Dados de entrada não fornecidos"}), 400
         
-        # Processar o cálculo
-        resultado = calcular_financiamento_planta(dados)
+        entrada = FinanciamentoPlantaInput(**dados)
+        hash_entrada = hash_canonico(entrada)
+        codificacao = negociar_codificacao(request.headers.get('Accept-Encoding'))
+        etag = etag_forte(hash_entrada, codificacao)
+        cabecalhos = {'ETag': etag, 'Vary': 'Accept-Encoding', 'Cache-Control': 'no-cache'}
+        
+        # Plano inalterado: 304 sem recalcular e sem corpo
+        if etag_corresponde(request.headers.get('If-None-Match'), etag):
+            return Response(status=304, headers=cabecalhos)
+        
+        corpo = cache_respostas.obter(hash_entrada, codificacao)
+        if corpo is None:
+            # Armazém compartilhado entre workers (gzip): serve o blob como está para clientes
+            # gzip e só descomprime para as outras codificações
+            corpo_gzip = armazem_resultados.obter(hash_entrada)
+            if corpo_gzip is not None:
+                corpo = cache_respostas.guardar(hash_entrada, codificacao, None, corpo_gzip)
+        if corpo is None:
+            # Processar o cálculo (parcelamento automático via cache de bases normalizadas)
+            # no pool com fila limitada; recusa com 429 se a fila estiver saturada
+            def calcular():
+                resultado = calcular_financiamento_planta_rapido(entrada)
+                corpo_json = json.dumps(resultado, ensure_ascii=False).encode('utf-8')
+                corpo_gzip = comprimir(corpo_json, 'gzip')
+                armazem_resultados.guardar(hash_entrada, corpo_gzip)
+                return cache_respostas.guardar(hash_entrada, codificacao, corpo_json, corpo_gzip)
+            
+            corpo = controle_admissao.executar(calcular, estimar_custo(dados), prazo_requisicao())
+        
+        if codificacao != 'identity':
+            cabecalhos['Content-Encoding'] = codificacao
         
         # Retornar resultado como JSON
-        return jsonify(resultado)
+        return Response(corpo, status=200, mimetype='application/json', headers=cabecalhos)
     
+    except (FilaSaturada, PrazoExcedido):
+        raise
     except Exception as e:
         app.logger.error(f"Erro no cálculo: {str(e)}")
         return jsonify({"error": f"Erro no cálculo: {str(e)}"}), 500
 
 
+@app.route('/api/carteira/recebimentos', methods=['POST'])
+def api_carteira_recebimentos():
+    """Endpoint para agregar os recebíveis mensais de uma carteira de unidades"""
+    try:
+        dados = request.get_json()
+        
+        if not dados:
+            return jsonify({"error": "Dados de entrada não fornecidos"}), 400
+        
+        resultado = controle_admissao.executar(lambda: agregar_carteira(dados), estimar_custo(dados), prazo_requisicao())
+        return jsonify(resultado)
+    
+    except (FilaSaturada, PrazoExcedido):
+        raise
+    except Exception as e:
+        app.logger.error(f"Erro na agregação da carteira: {str(e)}")
+        return jsonify({"error": f"Erro na agregação da carteira: {str(e)}"}), 500
+
+
+@app.route('/api/comparar-planos', methods=['POST'])
+def api_comparar_planos():
+    """Endpoint para comparar variantes de plano da mesma unidade pelo valor presente"""
+    try:
+        dados = request.get_json()
+        
+        if not dados:
+            return jsonify({"error": "Dados de entrada não fornecidos"}), 400
+        
+        resultado = controle_admissao.executar(lambda: comparar_planos(dados), estimar_custo(dados), prazo_requisicao())
+        return jsonify(resultado)
+    
+    except (FilaSaturada, PrazoExcedido):
+        raise
+    except Exception as e:
+        app.logger.error(f"Erro na comparação de planos: {str(e)}")
+        return jsonify({"error": f"Erro na comparação de planos: {str(e)}"}), 500
+
+
+@app.route('/api/projecoes/cenarios', methods=['POST'])
+def api_projecoes_cenarios():
+    """Dados anuais de aluguel e valorização e totais de pagamento de várias projeções, nos três cenários"""
+    try:
+        dados = request.get_json()
+        
+        if not dados:
+            return jsonify({"error": "Dados de entrada não fornecidos"}), 400
+        
+        resultado = controle_admissao.executar(lambda: calcular_projecoes_cenarios(dados), estimar_custo(dados), prazo_requisicao())
+        return jsonify(resultado)
+    
+    except (FilaSaturada, PrazoExcedido):
+        raise
+    except Exception as e:
+        app.logger.error(f"Erro nas projeções por cenário: {str(e)}")
+        return jsonify({"error": f"Erro nas projeções por cenário: {str(e)}"}), 500
+
+
+@app.route('/api/investidor/venda-futura', methods=['POST'])
+def api_investidor_venda_futura():
+    """Cronograma, fluxo de caixa da venda futura e TIR por cenário em uma única chamada"""
+    try:
+        dados = request.get_json()
+        
+        if not dados:
+            return jsonify({"error": "Dados de entrada não fornecidos"}), 400
+        
+        resultado = controle_admissao.executar(lambda: calcular_pipeline_investidor(dados), estimar_custo(dados), prazo_requisicao())
+        return jsonify(resultado)
+    
+    except (FilaSaturada, PrazoExcedido):
+        raise
+    except Exception as e:
+        app.logger.error(f"Erro no pipeline do investidor: {str(e)}")
+        return jsonify({"error": f"Erro no pipeline do investidor: {str(e)}"}), 500
+
+
+@app.route('/api/diferenca-cronogramas', methods=['POST'])
+def api_diferenca_cronogramas():
+    """Diferenças mês a mês (acima da tolerância) e dos totais entre o plano anterior e o novo"""
+    try:
+        dados = request.get_json()
+        
+        if not dados:
+            return jsonify({"error": "Dados de entrada não fornecidos"}), 400
+        
+        resultado = controle_admissao.executar(lambda: calcular_diferenca_cronogramas(dados), estimar_custo(dados), prazo_requisicao())
+        return jsonify(resultado)
+    
+    except (FilaSaturada, PrazoExcedido):
+        raise
+    except Exception as e:
+        app.logger.error(f"Erro na diferença entre cronogramas: {str(e)}")
+        return jsonify({"error": f"Erro na diferença entre cronogramas: {str(e)}"}), 500
+
+
+@app.errorhandler(TarefaNaoEncontrada)
+def tarefa_nao_encontrada(e):
+    """Identificador de tarefa inexistente (ou já removida)"""
+    return jsonify({"error": f"Tarefa não encontrada: {e}"}), 404
+
+
+@app.route('/api/tarefas', methods=['POST'])
+def api_submeter_tarefa():
+    """Submete uma varredura de planos ou uma carteira para execução assíncrona"""
+    try:
+        dados = request.get_json()
+        
+        if not dados:
+            return jsonify({"error": "Dados de entrada não fornecidos"}), 400
+        
+        estado = gerenciador_tarefas.submeter(dados)
+        resposta = jsonify(estado)
+        resposta.headers['Location'] = f"/api/tarefas/{estado['id']}"
+        return resposta, 202
+    
+    except FilaSaturada:
+        raise
+    except Exception as e:
+        app.logger.error(f"Erro na submissão da tarefa: {str(e)}")
+        return jsonify({"error": f"Erro na submissão da tarefa: {str(e)}"}), 500
+
+
+@app.route('/api/tarefas/<id_tarefa>', methods=['GET'])
+def api_consultar_tarefa(id_tarefa):
+    """Estado e progresso (por lote de planos) da tarefa"""
+    return jsonify(gerenciador_tarefas.consultar(id_tarefa))
+
+
+@app.route('/api/tarefas/<id_tarefa>', methods=['DELETE'])
+def api_cancelar_tarefa(id_tarefa):
+    """Cancela a tarefa; se já estiver em execução, ela para antes do próximo lote"""
+    return jsonify(gerenciador_tarefas.cancelar(id_tarefa)), 202
+
+
+@app.route('/api/tarefas/<id_tarefa>/resultado', methods=['GET'])
+def api_resultado_tarefa(id_tarefa):
+    """Transmite o arquivo .npz do resultado (409 enquanto a tarefa não estiver concluída)"""
+    caminho = gerenciador_tarefas.caminho_resultado(id_tarefa)
+    if caminho is None:
+        return jsonify({"error": "Tarefa ainda não concluída", "tarefa": gerenciador_tarefas.consultar(id_tarefa)}), 409
+    return send_file(caminho, mimetype='application/octet-stream', as_attachment=True,
+                     download_name=f"{id_tarefa}.npz", conditional=True)
+
+
+@app.errorhandler(IndiceNaoEncontrado)
+def indice_nao_encontrado(e):
+    """Índice desconhecido ou ainda sem pontos armazenados"""
+    return jsonify({"error": f"Série de índice não encontrada: {e}"}), 404
+
+
+@app.route('/api/indices/<indice>/pontos', methods=['POST'])
+def api_adicionar_pontos_indice(indice):
+    """Recebe variações mensais de um índice (INCC, IPCA ou CUB) e atualiza as janelas móveis"""
+    try:
+        dados = request.get_json()
+        
+        if not dados:
+            return jsonify({"error": "Dados de entrada não fornecidos"}), 400
+        
+        return jsonify(calibracao_indices.adicionar_pontos(indice, dados))
+    
+    except IndiceNaoEncontrado:
+        raise
+    except Exception as e:
+        app.logger.error(f"Erro ao gravar pontos do índice: {str(e)}")
+        return jsonify({"error": f"Erro ao gravar pontos do índice: {str(e)}"}), 500
+
+
+@app.route('/api/calibracao-taxas', methods=['POST'])
+def api_calibracao_taxas():
+    """Sugere as taxas de correção a partir das estatísticas pré-calculadas das séries"""
+    try:
+        dados = request.get_json()
+        
+        if not dados:
+            return jsonify({"error": "Dados de entrada não fornecidos"}), 400
+        
+        return jsonify(calibracao_indices.calibrar(dados))
+    
+    except IndiceNaoEncontrado:
+        raise
+    except Exception as e:
+        app.logger.error(f"Erro na calibração das taxas: {str(e)}")
+        return jsonify({"error": f"Erro na calibração das taxas: {str(e)}"}), 500
+
+
+# Captura amostrada das requisições para o replay (desativada por padrão)
+@app.before_request
+def iniciar_captura():
+    """Sorteia a requisição para a captura e marca o início"""
+    if captura_requisicoes.sortear(request.method, request.is_json):
+        g.inicio_captura = time.perf_counter()
+
+
+@app.after_request
+def registrar_captura(response):
+    """Grava a requisição sorteada, anonimizada, com o status e a duração"""
+    inicio = g.pop('inicio_captura', None)
+    if inicio is not None:
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        cabecalhos = {nome: request.headers[nome] for nome in CABECALHOS_CAPTURADOS if nome in request.headers}
+        captura_requisicoes.registrar(request.path, request.get_json(silent=True), response.status_code,
+                                      duracao_ms, cabecalhos)
+    return response
+
+
 # Configurar CORS para permitir chamadas do frontend
 @app.after_request
 def add_cors_headers(response):
     """Adicionar cabeçalhos CORS para permitir chamadas do frontend"""
     response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,X-Prazo-Ms')
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    response.headers.add('Access-Control-Expose-Headers', 'ETag,Retry-After')
     return response
 
 
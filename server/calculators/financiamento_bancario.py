@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Fase de financiamento bancário após a entrega das chaves
+---------------------------------------------------------
+Na entrega das chaves, o saldo devedor corrigido é repassado a um banco e
+amortizado pelo sistema SAC ou Price (tabela francesa) em até 420 meses.
+
+As tabelas usam as fórmulas fechadas de cada sistema, calculadas de uma vez
+com NumPy (sem laço mês a mês):
+
+SAC (amortização constante A = P / n):
+    saldo(k) = P - k * A
+    juros(k) = i * saldo(k-1)
+    prestação(k) = A + juros(k)
+
+Price (prestação constante):
+    PMT = P * i / (1 - (1 + i)^-n)
+    saldo(k) = P * (1 + i)^k - PMT * ((1 + i)^k - 1) / i
+    juros(k) = i * saldo(k-1)
+    amortização(k) = PMT - juros(k)
+
+Com a fase bancária, as parcelas do incorporador após o mês das chaves deixam
+de existir: o que restaria pagar a ele compõe o saldo financiado pelo banco.
+"""
+
+import datetime
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from financiamento_planta_corrigido import FinanciamentoBancarioInput, FinanciamentoPlantaInput
+from cronograma_vetorizado import datas_cronograma
+
+
+def tabela_sac(principal: float, taxa_mensal: float, prazo: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Tabela SAC em forma fechada.
+
+    Args:
+        principal: Valor financiado
+        taxa_mensal: Taxa de juros em % ao mês
+        prazo: Número de prestações
+
+    Returns:
+        Tupla (prestacao, juros, amortizacao, saldo) dos meses 1..prazo
+    """
+    i = taxa_mensal / 100
+    k = np.arange(1, prazo + 1)
+    amortizacao = np.full(prazo, principal / prazo)
+    saldo = principal - k * (principal / prazo)
+    juros = i * (principal - (k - 1) * (principal / prazo))
+    return amortizacao + juros, juros, amortizacao, saldo
+
+
+def tabela_price(principal: float, taxa_mensal: float, prazo: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Tabela Price (sistema francês) em forma fechada.
+
+    Args:
+        principal: Valor financiado
+        taxa_mensal: Taxa de juros em % ao mês
+        prazo: Número de prestações
+
+    Returns:
+        Tupla (prestacao, juros, amortizacao, saldo) dos meses 1..prazo
+    """
+    i = taxa_mensal / 100
+    k = np.arange(0, prazo + 1)
+    if i == 0:
+        pmt = principal / prazo
+        saldos = principal - k * pmt
+    else:
+        fator = (1 + i) ** k
+        pmt = principal * i / (1 - (1 + i) ** -prazo)
+        saldos = principal * fator - pmt * (fator - 1) / i
+    juros = i * saldos[:-1]
+    prestacao = np.full(prazo, pmt)
+    return prestacao, juros, prestacao - juros, saldos[1:]
+
+
+TABELAS = {
+    'SAC': tabela_sac,
+    'Price': tabela_price,
+}
+
+
+def total_pago_por_real(bancario: FinanciamentoBancarioInput) -> float:
+    """Soma das prestações por real financiado (as duas tabelas são lineares no principal)"""
+    prestacao, _, _, _ = TABELAS[bancario.sistema](1.0, bancario.taxaJurosMensal, bancario.prazoMeses)
+    return float(prestacao.sum())
+
+
+def aplicar_financiamento_bancario(resultado: Dict[str, Any], input_data: FinanciamentoPlantaInput) -> Dict[str, Any]:
+    """
+    Substitui as parcelas após as chaves pela fase de financiamento bancário.
+
+    O saldo devedor corrigido no mês das chaves é financiado pelo sistema
+    escolhido; as prestações são acrescentadas a `parcelas` como
+    tipoPagamento "Financiamento" e somadas ao resumo.
+
+    Args:
+        resultado: Resultado no formato de calcular_financiamento_planta
+        input_data: Dados de entrada com financiamentoBancario preenchido
+
+    Returns:
+        O mesmo dicionário, atualizado
+    """
+    bancario: FinanciamentoBancarioInput = input_data.financiamentoBancario
+    prazo_entrega = input_data.prazoEntrega
+
+    parcelas = [p for p in resultado["parcelas"] if p["mes"] <= prazo_entrega]
+    ultima = parcelas[-1]
+    principal = ultima["saldoDevedor"]
+
+    resumo = resultado["resumo"]
+    resumo_bancario = {
+        "sistema": bancario.sistema,
+        "mesInicio": prazo_entrega + 1,
+        "valorFinanciado": max(principal, 0.0),
+        "prazoMeses": bancario.prazoMeses,
+        "taxaJurosMensal": bancario.taxaJurosMensal,
+        "primeiraPrestacao": 0.0,
+        "ultimaPrestacao": 0.0,
+        "totalJuros": 0.0,
+        "totalPago": 0.0,
+    }
+
+    if principal > 0:
+        prazo = bancario.prazoMeses
+        prestacao, juros, amortizacao, saldo = TABELAS[bancario.sistema](principal, bancario.taxaJurosMensal, prazo)
+
+        # O saldo líquido segue a mesma regra: saldo anterior - pagamento anterior
+        if ultima["saldoLiquido"] is None:
+            # Nenhuma parcela antes das chaves: parte de imóvel - entrada - desconto
+            saldo_liquido_inicial = input_data.valorImovel - resumo["valorEntrada"] - (input_data.desconto or 0)
+            pagamento_chaves = 0.0
+        else:
+            saldo_liquido_inicial = ultima["saldoLiquido"]
+            pagamento_chaves = ultima["valorCorrigido"]
+        pagamentos_anteriores = np.concatenate([[pagamento_chaves], prestacao[:-1]])
+        saldo_liquido = saldo_liquido_inicial - np.cumsum(pagamentos_anteriores)
+
+        meses = range(prazo_entrega + 1, prazo_entrega + prazo + 1)
+        data_base = datetime.date.fromisoformat(parcelas[0]["data"])
+        datas = datas_cronograma(data_base, prazo_entrega + prazo)
+        taxa = bancario.taxaJurosMensal
+        correcao_acumulada = ultima["correcaoAcumulada"]
+
+        for mes, pr, jr, am, sd, sl in zip(meses, prestacao.tolist(), juros.tolist(), amortizacao.tolist(),
+                                           saldo.tolist(), saldo_liquido.tolist()):
+            parcelas.append({
+                "mes": mes,
+                "data": datas[mes],
+                "tipoPagamento": "Financiamento",
+                "valorBase": pr,
+                # Prestações bancárias não são corrigidas; a taxa do banco vai em taxaJuros
+                "percentualCorrecao": 0.0,
+                "valorCorrigido": pr,
+                "saldoDevedor": sd,
+                "saldoLiquido": sl,
+                "correcaoAcumulada": correcao_acumulada,
+                "amortizacao": am,
+                "juros": jr,
+                "taxaJuros": taxa
+            })
+
+        resumo_bancario.update({
+            "primeiraPrestacao": float(prestacao[0]),
+            "ultimaPrestacao": float(prestacao[-1]),
+            "totalJuros": float(juros.sum()),
+            "totalPago": float(prestacao.sum()),
+        })
+
+    # Totais recalculados sobre o cronograma truncado nas chaves + fase bancária
+    total_correcao = sum(p["valorCorrigido"] - p["valorBase"] for p in parcelas if p["valorCorrigido"] > p["valorBase"])
+    valor_total = sum(p["valorCorrigido"] for p in parcelas)
+    resumo.update({
+        "totalParcelas": len(parcelas),
+        "totalCorrecao": total_correcao,
+        "percentualCorrecao": (total_correcao / (valor_total - total_correcao) * 100) if total_correcao > 0 and (valor_total - total_correcao) > 0 else 0,
+        "valorTotal": valor_total,
+        "financiamentoBancario": resumo_bancario,
+    })
+    resultado["parcelas"] = parcelas
+    return resultado
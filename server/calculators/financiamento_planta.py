@@ -199,11 +199,13 @@ def calcular_financiamento_planta(input_data: Union[Dict[str, Any], Financiament
         
         # Número de meses para distribuir (excluindo meses com reforço e chaves)
         meses_com_pagamentos = list(range(1, prazo_pagamento + 1))
-        meses_com_chaves = [prazo_entrega] if valor_chaves_efetivo > 0 else []
+        meses_com_chaves = {prazo_entrega} if valor_chaves_efetivo > 0 else set()
+        # Conjunto para consultas de pertinência em O(1) no laço mensal
+        conjunto_reforcos = set(meses_com_reforco)
         
         # Remover meses que já têm reforço ou chaves
         meses_parcelas_regulares = [mes for mes in meses_com_pagamentos 
-                                    if mes not in meses_com_reforco and mes not in meses_com_chaves]
+                                    if mes not in conjunto_reforcos and mes not in meses_com_chaves]
         
         # Valor de cada parcela mensal
         valor_parcela_mensal = valor_distribuir / len(meses_parcelas_regulares) if meses_parcelas_regulares else 0
@@ -224,7 +226,7 @@ def calcular_financiamento_planta(input_data: Union[Dict[str, Any], Financiament
             valor_base = valor_parcela_mensal
             
             # Verificar se é mês de reforço
-            if incluir_reforco and valor_reforco > 0 and mes in meses_com_reforco:
+            if incluir_reforco and valor_reforco > 0 and mes in conjunto_reforcos:
                 tipo_pagamento = "Reforço"
                 valor_base = valor_reforco
             
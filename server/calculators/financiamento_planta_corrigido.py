@@ -16,7 +16,9 @@ Fórmula do Saldo Líquido:
 import json
 import datetime
 from typing import Dict, Any, List, Optional, Union, Literal
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, model_validator, validator
+
+from regras_pagamento import RegraPagamento, padrao_do_plano, parcela_regular, valores_base_mensais, valores_regras
 
 class ParcelaPersonalizada(BaseModel):
     """Modelo para parcelas personalizadas fornecidas pelo usuário"""
@@ -38,6 +40,12 @@ class ParcelaPersonalizada(BaseModel):
             raise ValueError("Valor deve ser maior que zero")
         return v
 
+class FinanciamentoBancarioInput(BaseModel):
+    """Modelo para a fase de financiamento bancário após a entrega das chaves"""
+    sistema: Literal['SAC', 'Price']
+    prazoMeses: int = Field(..., gt=0, le=420)
+    taxaJurosMensal: float = Field(..., ge=0)
+
 class FinanciamentoPlantaInput(BaseModel):
     """Modelo de entrada para o cálculo de financiamento na planta"""
     valorImovel: float = Field(..., gt=0)
@@ -53,7 +61,14 @@ class FinanciamentoPlantaInput(BaseModel):
     periodicidadeReforco: Optional[Literal['trimestral', 'semestral', 'anual']] = None
     valorReforco: Optional[float] = Field(None, ge=0)
     valorChaves: Optional[float] = Field(None, ge=0)
+    # Regras declarativas de reforços, chaves e carências (substituem os campos de reforço/chaves)
+    regrasPagamento: Optional[List[RegraPagamento]] = None
     parcelasPersonalizadas: Optional[List[ParcelaPersonalizada]] = None
+    calcularSensibilidades: bool = False
+    financiamentoBancario: Optional[FinanciamentoBancarioInput] = None
+    # Janela de meses (inclusiva) devolvida em parcelas; o resumo segue sendo o do cronograma completo
+    mesInicio: Optional[int] = Field(None, ge=0)
+    mesFim: Optional[int] = Field(None, ge=0)
 
     def validar_tipo_parcelamento(self):
         """Valida que os campos específicos para cada tipo de parcelamento estão presentes"""
@@ -66,17 +81,45 @@ class FinanciamentoPlantaInput(BaseModel):
         if self.incluirReforco and not self.periodicidadeReforco:
             raise ValueError("Se incluirReforco=true, periodicidadeReforco deve ser especificado")
 
+        if self.mesInicio is not None and self.mesFim is not None and self.mesFim < self.mesInicio:
+            raise ValueError("mesFim deve ser maior ou igual a mesInicio")
+
+    @model_validator(mode='after')
+    def validar_regras_pagamento(self):
+        """Valida regrasPagamento na construção do modelo (vale para a API e para o motor)"""
+        if self.regrasPagamento and self.tipoParcelamento != 'automatico':
+            raise ValueError("regrasPagamento só se aplica ao parcelamento automático")
+
+        if self.regrasPagamento and (self.incluirReforco or self.valorChaves):
+            raise ValueError("Use regrasPagamento ou os campos de reforço/chaves, não ambos")
+        return self
+
 class Parcela(BaseModel):
     """Modelo para representar uma parcela no financiamento"""
     mes: int
     data: str
-    tipoPagamento: Literal['Entrada', 'Parcela', 'Reforço', 'Chaves']
+    tipoPagamento: Literal['Entrada', 'Parcela', 'Reforço', 'Chaves', 'Financiamento']
     valorBase: float
     percentualCorrecao: float
     valorCorrigido: float
     saldoDevedor: float
     saldoLiquido: Optional[float] = None
     correcaoAcumulada: float
+    amortizacao: Optional[float] = None
+    juros: Optional[float] = None
+    taxaJuros: Optional[float] = None
+
+class ResumoFinanciamentoBancario(BaseModel):
+    """Modelo para o resumo da fase de financiamento bancário"""
+    sistema: Literal['SAC', 'Price']
+    mesInicio: int
+    valorFinanciado: float
+    prazoMeses: int
+    taxaJurosMensal: float
+    primeiraPrestacao: float
+    ultimaPrestacao: float
+    totalJuros: float
+    totalPago: float
 
 class ResumoFinanciamento(BaseModel):
     """Modelo para o resumo do financiamento"""
@@ -89,6 +132,7 @@ class ResumoFinanciamento(BaseModel):
     totalCorrecao: float
     percentualCorrecao: float
     valorTotal: float
+    financiamentoBancario: Optional[ResumoFinanciamentoBancario] = None
 
 class ResultadoFinanciamentoPlanta(BaseModel):
     """Modelo para o resultado do cálculo de financiamento na planta"""
@@ -134,10 +178,6 @@ def calcular_financiamento_planta(input_data: Union[Dict[str, Any], Financiament
     correcao_mensal_ate_chaves = input_data.correcaoMensalAteChaves
     correcao_mensal_apos_chaves = input_data.correcaoMensalAposChaves
     tipo_parcelamento = input_data.tipoParcelamento
-    incluir_reforco = input_data.incluirReforco
-    periodicidade_reforco = input_data.periodicidadeReforco
-    valor_reforco = input_data.valorReforco or 0
-    valor_chaves = input_data.valorChaves or 0
     parcelas_personalizadas = input_data.parcelasPersonalizadas
     valor_desconto = input_data.desconto or 0
     
@@ -168,69 +208,26 @@ def calcular_financiamento_planta(input_data: Union[Dict[str, Any], Financiament
     
     # Calcular valor base das parcelas automaticamente
     if tipo_parcelamento == 'automatico':
-        # Total a ser distribuído (menos entrada, reforços e chaves)
-        valor_total_reforcos = 0
-        meses_com_reforco = []
-        
-        if incluir_reforco and valor_reforco > 0:
-            # Determinar meses com reforço baseado na periodicidade
-            periodo = 0
-            if periodicidade_reforco == 'trimestral':
-                periodo = 3
-            elif periodicidade_reforco == 'semestral':
-                periodo = 6
-            elif periodicidade_reforco == 'anual':
-                periodo = 12
-            
-            if periodo > 0:
-                meses_com_reforco = []
-                for mes in range(periodo, prazo_pagamento + 1, periodo):
-                    if mes <= prazo_entrega:
-                        meses_com_reforco.append(mes)
-                
-                valor_total_reforcos = len(meses_com_reforco) * valor_reforco
-        
-        # Valor residual na entrega das chaves
-        valor_chaves_efetivo = valor_chaves or 0
-        
-        # Valor total a ser distribuído nas parcelas mensais
-        valor_distribuir = saldo_devedor_atual - valor_total_reforcos - valor_chaves_efetivo
+        # Padrão de pagamentos compilado (reforços, chaves e carências), reaproveitado entre cálculos
+        padrao = padrao_do_plano(input_data)
+        valores = valores_regras(input_data)
         
-        # Número de meses para distribuir (excluindo meses com reforço e chaves)
-        meses_com_pagamentos = list(range(1, prazo_pagamento + 1))
-        meses_com_chaves = [prazo_entrega] if valor_chaves_efetivo > 0 else []
-        
-        # Remover meses que já têm reforço ou chaves
-        meses_parcelas_regulares = [mes for mes in meses_com_pagamentos 
-                                    if mes not in meses_com_reforco and mes not in meses_com_chaves]
-        
-        # Valor de cada parcela mensal
-        valor_parcela_mensal = valor_distribuir / len(meses_parcelas_regulares) if meses_parcelas_regulares else 0
+        # Valor de cada parcela mensal: saldo menos os pagamentos especiais, dividido pelos meses regulares
+        valor_parcela_mensal = parcela_regular(padrao, valores, saldo_devedor_atual)
+        valores_base = valores_base_mensais(padrao, valores, valor_parcela_mensal)
         
         print("Detalhes do cálculo automático:", {
-            "valorDistribuir": valor_distribuir,
-            "mesesParcelasRegulares": len(meses_parcelas_regulares),
+            "mesesParcelasRegulares": padrao.n_regulares,
             "valorParcelaMensal": valor_parcela_mensal,
-            "mesesComReforco": meses_com_reforco,
-            "valorTotalReforcos": valor_total_reforcos,
-            "valorChavesEfetivo": valor_chaves_efetivo
+            "mesesComReforco": [mes for mes, tipo in enumerate(padrao.tipos, 1) if tipo == "Reforço"],
+            "mesesComChaves": [mes for mes, tipo in enumerate(padrao.tipos, 1) if tipo == "Chaves"]
         })
         
         # Distribuir as parcelas mensais
         for mes in range(1, prazo_pagamento + 1):
-            # Definir tipo e valor da parcela baseado na lógica
-            tipo_pagamento = "Parcela"
-            valor_base = valor_parcela_mensal
-            
-            # Verificar se é mês de reforço
-            if incluir_reforco and valor_reforco > 0 and mes in meses_com_reforco:
-                tipo_pagamento = "Reforço"
-                valor_base = valor_reforco
-            
-            # Verificar se é mês de chaves
-            if mes == prazo_entrega and valor_chaves_efetivo > 0:
-                tipo_pagamento = "Chaves"
-                valor_base = valor_chaves_efetivo
+            # Tipo e valor da parcela vêm do padrão compilado
+            tipo_pagamento = padrao.tipos[mes - 1]
+            valor_base = valores_base[mes - 1]
             
             # Calcular correção para o mês atual
             percentual_correcao = correcao_mensal_ate_chaves if mes <= prazo_entrega else correcao_mensal_apos_chaves
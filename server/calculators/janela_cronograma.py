@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Janela de meses do cronograma automático por saltos de estado em forma fechada
+-------------------------------------------------------------------------------
+A interface mostra o cronograma em páginas (mesInicio..mesFim). No
+parcelamento automático as taxas são constantes em cada trecho (até as
+chaves e após as chaves), então o estado no mês k tem forma fechada:
+
+- correcaoAcumulada(k) = correcaoAcumulada(a) + (k - a) * r
+- saldoDevedor(k)      = g^(k-a) * saldoDevedor(a) - soma_{a<j<=k} vc(j) * g^(k-j),  g = 1 + r/100
+- total pago até k     = soma_{a<j<=k} vc(j)
+- saldoLiquido(k)      = (imóvel - entrada - desconto) - total pago até k-1
+
+Com vc(j) = valorBase(j) * (1 + correcaoAcumulada(j)/100), as somas são
+séries aritmético-geométricas: uma para as parcelas regulares de todos os
+meses do trecho, outra para a progressão dos meses de reforço (com passo
+igual à periodicidade) e um termo isolado para o mês das chaves.
+
+O cálculo salta direto para o estado do mês anterior à janela e evolui
+apenas as linhas pedidas com o núcleo vetorizado. O resumo do cronograma
+completo também sai das mesmas séries, sem percorrer os meses.
+"""
+
+import datetime
+import math
+from typing import Any, Dict, NamedTuple, Optional
+
+import numpy as np
+
+from financiamento_planta_corrigido import FinanciamentoPlantaInput
+from cronograma_vetorizado import (
+    TIPOS_PAGAMENTO,
+    evoluir_saldos,
+    valor_entrada_efetivo,
+)
+from regras_pagamento import PERIODOS_REFORCO
+from resultado_compacto import ResultadoCompacto
+
+
+# Abaixo deste valor de n * |ln x| a série usa a expansão de Taylor
+# (a fórmula fechada perde precisão quando x -> 1)
+LIMITE_TAYLOR = 1e-3
+
+
+class PlanoFechado(NamedTuple):
+    """Parâmetros do cronograma automático usados pelas fórmulas fechadas"""
+    valor_imovel: float
+    entrada: float
+    desconto: float
+    prazo_entrega: int
+    prazo_pagamento: int
+    taxa_ate_chaves: float
+    taxa_apos_chaves: float
+    parcela: float
+    valor_reforco: float
+    valor_chaves: float
+    # Periodicidade do reforço em meses (0 sem reforço) e número de meses com reforço
+    periodo: int
+    n_reforcos: int
+    # Mês das chaves dentro do prazo (0 se não houver pagamento nas chaves)
+    mes_chaves: int
+    # Chaves caem em um mês de reforço (as chaves prevalecem)
+    sobreposicao: bool
+    n_regulares: int
+
+
+class EstadoMes(NamedTuple):
+    """Estado da recorrência ao fim de um mês"""
+    saldo_devedor: float
+    correcao_acumulada: float
+    total_pago: float
+
+
+def plano_fechado(input_data: FinanciamentoPlantaInput) -> PlanoFechado:
+    """Extrai os parâmetros do cronograma automático, com as mesmas regras do cálculo original"""
+    entrada = valor_entrada_efetivo(input_data)
+    prazo_entrega = input_data.prazoEntrega
+    prazo_pagamento = input_data.prazoPagamento
+
+    valor_reforco = input_data.valorReforco or 0
+    periodo = PERIODOS_REFORCO.get(input_data.periodicidadeReforco or '', 0)
+    if not (input_data.incluirReforco and valor_reforco > 0 and periodo > 0):
+        periodo, valor_reforco = 0, 0
+    n_reforcos = min(prazo_entrega, prazo_pagamento) // periodo if periodo else 0
+
+    valor_chaves = input_data.valorChaves or 0
+    mes_chaves = prazo_entrega if valor_chaves > 0 and prazo_entrega <= prazo_pagamento else 0
+    sobreposicao = bool(mes_chaves and periodo and mes_chaves % periodo == 0)
+
+    n_regulares = prazo_pagamento - n_reforcos - (1 if mes_chaves else 0) + sobreposicao
+    # Como no cálculo original, o reforço que coincide com as chaves ainda é descontado do total a distribuir
+    valor_distribuir = input_data.valorImovel - entrada - n_reforcos * valor_reforco - valor_chaves
+    parcela = valor_distribuir / n_regulares if n_regulares > 0 else 0.0
+
+    return PlanoFechado(
+        valor_imovel=input_data.valorImovel,
+        entrada=entrada,
+        desconto=input_data.desconto or 0,
+        prazo_entrega=prazo_entrega,
+        prazo_pagamento=prazo_pagamento,
+        taxa_ate_chaves=float(input_data.correcaoMensalAteChaves),
+        taxa_apos_chaves=float(input_data.correcaoMensalAposChaves),
+        parcela=parcela,
+        valor_reforco=valor_reforco,
+        valor_chaves=valor_chaves,
+        periodo=periodo,
+        n_reforcos=n_reforcos,
+        mes_chaves=mes_chaves,
+        sobreposicao=sobreposicao,
+        n_regulares=n_regulares,
+    )
+
+
+def soma_aritmetico_geometrica(c0: float, c1: float, x: float, n: int) -> float:
+    """soma_{k=0}^{n-1} (c0 + c1 * k) * x^k"""
+    if n <= 0:
+        return 0.0
+    ln_x = math.log(x)
+    if n * abs(ln_x) < LIMITE_TAYLOR:
+        # x^k = exp(k ln x) até a terceira ordem, com as somas de potências em forma fechada
+        p1 = n * (n - 1) / 2
+        p2 = (n - 1) * n * (2 * n - 1) / 6
+        p3 = p1 * p1
+        p4 = (n - 1) * n * (2 * n - 1) * (3 * (n - 1) ** 2 + 3 * (n - 1) - 1) / 30
+        d = ln_x
+        return (c0 * (n + d * p1 + d * d / 2 * p2 + d ** 3 / 6 * p3)
+                + c1 * (p1 + d * p2 + d * d / 2 * p3 + d ** 3 / 6 * p4))
+    x_n = math.exp(n * ln_x)
+    g0 = math.expm1(n * ln_x) / math.expm1(ln_x)
+    # (1 - x) * soma k x^k = soma_{k=1}^{n-1} x^k - (n - 1) x^n
+    g1 = (g0 - 1 - (n - 1) * x_n) / (1 - x)
+    return c0 * g0 + c1 * g1
+
+
+def _soma_pagamentos(plano: PlanoFechado, inicio: int, fim: int, taxa: float, correcao_inicio: float,
+                     fator: float, parcela: float, um: float) -> float:
+    """
+    soma_{inicio<j<=fim} valorBase(j) * (um + correcaoAcumulada(j)/100) * fator^(fim-j)
+    em um trecho de taxa constante.
+
+    Com fator = 1 + taxa/100 e um = 1 dá o desconto dos pagamentos no saldo
+    devedor; com fator = 1 e um = 1, o total pago; com fator = 1 e um = 0, a
+    correção paga. `parcela` substitui o valor da parcela regular.
+    """
+    def coeficiente(mes: int) -> float:
+        return um + (correcao_inicio + (mes - inicio) * taxa) / 100
+
+    # Parcela regular em todos os meses do trecho (k = fim - j)
+    total = parcela * soma_aritmetico_geometrica(coeficiente(fim), -taxa / 100, fator, fim - inicio)
+
+    # Progressão dos meses de reforço: diferença em relação à parcela regular
+    if plano.periodo:
+        periodo = plano.periodo
+        primeiro = inicio // periodo + 1
+        ultimo = min(fim, periodo * plano.n_reforcos) // periodo
+        if ultimo >= primeiro:
+            mes = periodo * primeiro
+            total += (plano.valor_reforco - parcela) * fator ** (fim - mes) * soma_aritmetico_geometrica(
+                coeficiente(mes), periodo * taxa / 100, fator ** -periodo, ultimo - primeiro + 1)
+
+    # Mês das chaves (substitui o reforço, se coincidir)
+    if inicio < plano.mes_chaves <= fim:
+        diferenca = plano.valor_chaves - parcela
+        if plano.sobreposicao:
+            diferenca -= plano.valor_reforco - parcela
+        total += diferenca * coeficiente(plano.mes_chaves) * fator ** (fim - plano.mes_chaves)
+
+    return total
+
+
+def _trechos(plano: PlanoFechado, mes: int):
+    """Trechos de taxa constante (inicio, fim, taxa) que cobrem os meses 1..mes"""
+    chaves = min(mes, plano.prazo_entrega)
+    if chaves > 0:
+        yield 0, chaves, plano.taxa_ate_chaves
+    if mes > chaves:
+        yield chaves, mes, plano.taxa_apos_chaves
+
+
+def estado_no_mes(plano: PlanoFechado, mes: int) -> EstadoMes:
+    """Estado ao fim do mês `mes` (0..prazoPagamento), sem percorrer os meses anteriores"""
+    saldo = plano.valor_imovel - plano.entrada
+    correcao = 0.0
+    pago = 0.0
+    for inicio, fim, taxa in _trechos(plano, mes):
+        fator = 1 + taxa / 100
+        descontado = _soma_pagamentos(plano, inicio, fim, taxa, correcao, fator, plano.parcela, 1.0)
+        pago += _soma_pagamentos(plano, inicio, fim, taxa, correcao, 1.0, plano.parcela, 1.0)
+        saldo = fator ** (fim - inicio) * saldo - descontado
+        correcao += (fim - inicio) * taxa
+    return EstadoMes(saldo, correcao, pago)
+
+
+def resumo_fechado(plano: PlanoFechado) -> Dict[str, Any]:
+    """Resumo do cronograma completo, com as mesmas regras do cálculo original"""
+    prazo = plano.prazo_pagamento
+    valor_total = plano.entrada + estado_no_mes(plano, prazo).total_pago
+
+    # totalCorrecao soma apenas as linhas com valorCorrigido > valorBase; reforço e chaves
+    # são positivos, e a parcela regular só entra se também for positiva
+    total_correcao = 0.0
+    correcao = 0.0
+    for inicio, fim, taxa in _trechos(plano, prazo):
+        total_correcao += _soma_pagamentos(plano, inicio, fim, taxa, correcao, 1.0, max(plano.parcela, 0.0), 0.0)
+        correcao += (fim - inicio) * taxa
+    total_correcao = max(total_correcao, 0.0)
+
+    percentual_correcao = (total_correcao / (valor_total - total_correcao) * 100) if total_correcao > 0 and (valor_total - total_correcao) > 0 else 0
+
+    return {
+        "valorImovel": plano.valor_imovel,
+        "valorEntrada": plano.entrada,
+        "valorFinanciado": plano.valor_imovel - plano.entrada,
+        "prazoEntrega": plano.prazo_entrega,
+        "prazoPagamento": prazo,
+        "totalParcelas": prazo + 1,
+        "totalCorrecao": total_correcao,
+        "percentualCorrecao": percentual_correcao,
+        "valorTotal": valor_total
+    }
+
+
+def limites_janela(input_data: FinanciamentoPlantaInput, ultimo_mes: int):
+    """Meses (inicio, fim) da janela pedida, limitados ao cronograma"""
+    inicio = input_data.mesInicio or 0
+    fim = ultimo_mes if input_data.mesFim is None else min(input_data.mesFim, ultimo_mes)
+    if input_data.mesFim is not None and input_data.mesFim < inicio:
+        raise ValueError("mesFim deve ser maior ou igual a mesInicio")
+    return inicio, fim
+
+
+def calcular_janela(input_data: FinanciamentoPlantaInput,
+                    data_base: Optional[datetime.date] = None) -> ResultadoCompacto:
+    """
+    Linhas mesInicio..mesFim do parcelamento automático e o resumo do
+    cronograma completo, sem calcular os meses fora da janela.
+    """
+    plano = plano_fechado(input_data)
+    inicio, fim = limites_janela(input_data, plano.prazo_pagamento)
+
+    primeiro = max(inicio, 1)
+    meses = np.arange(primeiro, fim + 1)
+    taxas = np.where(meses <= plano.prazo_entrega, plano.taxa_ate_chaves, plano.taxa_apos_chaves)
+
+    reforco = (meses % plano.periodo == 0) & (meses <= plano.periodo * plano.n_reforcos) if plano.periodo else np.zeros(len(meses), dtype=bool)
+    chaves = (meses == plano.mes_chaves) if plano.mes_chaves else np.zeros(len(meses), dtype=bool)
+    reforco &= ~chaves
+    codigos_tipo = np.select([chaves, reforco], [TIPOS_PAGAMENTO.index('Chaves'), TIPOS_PAGAMENTO.index('Reforço')],
+                             TIPOS_PAGAMENTO.index('Parcela')).astype(np.int8)
+    valores_base = np.select([chaves, reforco], [plano.valor_chaves, plano.valor_reforco], plano.parcela)
+
+    anterior = estado_no_mes(plano, min(primeiro - 1, plano.prazo_pagamento))
+    saldo_liquido_inicial = plano.valor_imovel - plano.entrada - plano.desconto - anterior.total_pago
+    correcao_acumulada, valor_corrigido, saldo_devedor, saldo_liquido = evoluir_saldos(
+        valores_base, taxas, anterior.saldo_devedor, saldo_liquido_inicial, anterior.correcao_acumulada)
+
+    valores = np.stack([valores_base, taxas, valor_corrigido, saldo_devedor, saldo_liquido, correcao_acumulada])
+    codigos = codigos_tipo
+    if inicio == 0:
+        linha_entrada = [plano.entrada, 0.0, plano.entrada, plano.valor_imovel - plano.entrada, np.nan, 0.0]
+        valores = np.column_stack([linha_entrada, valores])
+        meses = np.concatenate([[0], meses])
+        codigos = np.concatenate([[TIPOS_PAGAMENTO.index('Entrada')], codigos_tipo])
+
+    return ResultadoCompacto(meses=meses, codigos_tipo=codigos, valores=valores,
+                             resumo=resumo_fechado(plano), data_base=data_base)
+
+
+def recortar_janela(resultado: Dict[str, Any], input_data: FinanciamentoPlantaInput) -> Dict[str, Any]:
+    """Mantém em `parcelas` só os meses da janela (caminho dos planos sem forma fechada)"""
+    parcelas = resultado["parcelas"]
+    inicio, fim = limites_janela(input_data, parcelas[-1]["mes"] if parcelas else 0)
+    resultado["parcelas"] = [p for p in parcelas if inicio <= p["mes"] <= fim]
+    return resultado
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pipeline do investidor: cronograma, fluxo de caixa da venda futura e TIR
+-------------------------------------------------------------------------
+Hoje o cronograma volta do Python como lista de linhas, é gravado em
+calculationResults.financiamentoPlanta e o Node percorre as linhas de novo
+para montar o fluxo de caixa (montarFluxoCaixaParaTIR) e mais uma vez para
+a TIR (calculateIRR). Aqui as três etapas rodam em uma chamada, sobre as
+colunas do resultado compacto, sem materializar as linhas:
+
+1. cronograma do plano (cache de bases no parcelamento automático);
+2. para cada cenário, o fluxo de caixa até o mês da venda, no modelo de
+   tirCalculator.montarFluxoCaixaParaTIR:
+   - mês 0: -entrada; meses 1..venda-1: -valorCorrigido;
+   - mês da venda: valor de venda projetado - saldo devedor no mês da venda
+     - comissão - custos adicionais - custos de manutenção;
+3. TIR mensal com o mesmo algoritmo de tirCalculator.calculateIRR (Newton
+   com palpites iniciais sucessivos e bisseção como último recurso).
+
+A resposta traz só os números de cada cenário (e o fluxo, se pedido).
+"""
+
+import math
+from typing import Any, Dict, Literal, Optional
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from financiamento_planta_corrigido import FinanciamentoPlantaInput
+from cache_base_normalizada import calcular_cronograma_completo
+from resultado_compacto import ResultadoCompacto
+
+
+# Palpites iniciais do Newton, na ordem de calculateIRR
+PALPITES_TIR = (0.1, 0.05, 0.2, 0.01, 0.3, 0.5, -0.5, 0)
+
+# Limites de busca da TIR mensal (-99% a 500% ao mês)
+TIR_MINIMA = -0.99
+TIR_MAXIMA = 5.0
+
+
+class VendaCenario(BaseModel):
+    """Premissas da venda em um cenário (mesmas de buscarDadosParaTIR)"""
+    prazoVenda: int = Field(..., gt=0)
+    valorizacaoAnual: float = 0
+    comissao: float = 0
+    custosAdicionais: float = 0
+    custosManutencao: float = 0
+
+
+class PipelineInvestidorInput(BaseModel):
+    """Modelo de entrada do pipeline do investidor"""
+    plano: FinanciamentoPlantaInput
+    # Valor de tabela usado na valorização (padrão: valorImovel do plano)
+    valorTabela: Optional[float] = Field(None, gt=0)
+    cenarios: Dict[Literal['padrao', 'conservador', 'otimista'], VendaCenario] = Field(..., min_length=1)
+    incluirFluxo: bool = False
+
+
+def valor_presente_liquido(fluxo: np.ndarray, taxa: float) -> float:
+    """VPL do fluxo (mês 0 sem desconto)"""
+    return float(fluxo @ (1 + taxa) ** -np.arange(len(fluxo), dtype=float))
+
+
+def _tentar_newton(fluxo: np.ndarray, palpite: float, max_iteracoes: int, precisao: float) -> Optional[float]:
+    """Newton-Raphson a partir de um palpite; None se divergir ou sair dos limites"""
+    periodos = np.arange(len(fluxo), dtype=float)
+    taxa = palpite
+    for _ in range(max_iteracoes):
+        with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+            descontos = (1 + taxa) ** -periodos
+            vpl = float(fluxo @ descontos)
+            if abs(vpl) < precisao:
+                return taxa
+            derivada = float(-(periodos * fluxo) @ (descontos / (1 + taxa)))
+        if not abs(derivada) >= 1e-10:
+            return None
+        proxima = taxa - vpl / derivada
+        if not math.isfinite(proxima) or proxima < TIR_MINIMA or proxima > TIR_MAXIMA:
+            return None
+        taxa = proxima
+    return None
+
+
+def _tir_bissecao(fluxo: np.ndarray) -> float:
+    """Bisseção em [-99%, 500%]; sem raiz no intervalo, o limite com VPL mais próximo de zero"""
+    inferior, superior = TIR_MINIMA, TIR_MAXIMA
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        vpl_inferior = valor_presente_liquido(fluxo, inferior)
+        vpl_superior = valor_presente_liquido(fluxo, superior)
+        if np.sign(vpl_inferior) == np.sign(vpl_superior):
+            return inferior if abs(vpl_inferior) < abs(vpl_superior) else superior
+
+        precisao = 1e-7
+        for _ in range(100):
+            meio = (inferior + superior) / 2
+            vpl_meio = valor_presente_liquido(fluxo, meio)
+            if abs(vpl_meio) < precisao or (superior - inferior) < precisao:
+                return meio
+            if np.sign(vpl_meio) == np.sign(vpl_inferior):
+                inferior = meio
+            else:
+                superior = meio
+    return (inferior + superior) / 2
+
+
+def calcular_tir(fluxo: np.ndarray, max_iteracoes: int = 1000, precisao: float = 1e-6) -> float:
+    """TIR mensal em decimal (0.0141 = 1,41% ao mês), como tirCalculator.calculateIRR"""
+    fluxo = np.asarray(fluxo, dtype=float)
+    if not ((fluxo > 0).any() and (fluxo < 0).any()):
+        return _tir_bissecao(fluxo)
+    for palpite in PALPITES_TIR:
+        taxa = _tentar_newton(fluxo, palpite, max_iteracoes, precisao)
+        if taxa is not None:
+            return taxa
+    return _tir_bissecao(fluxo)
+
+
+def _saldo_no_mes(meses: np.ndarray, saldo_devedor: np.ndarray, mes: int) -> float:
+    """Saldo devedor no mês; sem linha nesse mês, o do mês mais próximo (empate: o anterior)"""
+    distancia = np.abs(meses - mes)
+    return float(saldo_devedor[np.argmin(distancia)])
+
+
+def montar_fluxo_caixa(resultado: ResultadoCompacto, venda: VendaCenario, valor_tabela: float) -> Dict[str, Any]:
+    """Fluxo de caixa do investidor até o mês da venda (montarFluxoCaixaParaTIR)"""
+    prazo_venda = venda.prazoVenda
+    meses = resultado.meses
+    valor_corrigido = resultado.coluna('valorCorrigido')
+
+    fluxo = np.zeros(prazo_venda + 1)
+    antes_da_venda = meses < prazo_venda
+    # A linha do mês 0 é a entrada (valorCorrigido = entrada)
+    fluxo[meses[antes_da_venda]] = -valor_corrigido[antes_da_venda]
+
+    valor_venda = valor_tabela * (1 + venda.valorizacaoAnual / 100) ** (prazo_venda / 12)
+    comissao = valor_venda * venda.comissao / 100
+    custos_adicionais = valor_venda * venda.custosAdicionais / 100
+    saldo_venda = _saldo_no_mes(meses, resultado.coluna('saldoDevedor'), prazo_venda)
+    fluxo[prazo_venda] = valor_venda - saldo_venda - comissao - custos_adicionais - venda.custosManutencao
+
+    return {
+        "fluxo": fluxo,
+        "valorVendaProjetada": valor_venda,
+        "comissaoVenda": comissao,
+        "custosAdicionaisVenda": custos_adicionais,
+        "saldoDevedorNoMesVenda": saldo_venda,
+        "totalPagoAteVenda": float(-fluxo[:prazo_venda].sum()),
+        "valorLiquidoFinal": float(fluxo[prazo_venda]),
+    }
+
+
+def calcular_pipeline_investidor(input_data: Any) -> Dict[str, Any]:
+    """
+    Cronograma, fluxo de caixa da venda futura e TIR de cada cenário.
+
+    Args:
+        input_data: PipelineInvestidorInput ou dicionário equivalente
+
+    Returns:
+        Resumo do cronograma e, por cenário, os valores da venda e a TIR
+    """
+    if isinstance(input_data, dict):
+        input_data = PipelineInvestidorInput(**input_data)
+
+    plano = input_data.plano
+    resultado = calcular_cronograma_completo(plano)
+    valor_tabela = input_data.valorTabela or plano.valorImovel
+
+    cenarios = {}
+    for nome, venda in input_data.cenarios.items():
+        fluxo_caixa = montar_fluxo_caixa(resultado, venda, valor_tabela)
+        fluxo = fluxo_caixa.pop("fluxo")
+        tir_mensal = calcular_tir(fluxo)
+        cenario = dict(fluxo_caixa, prazoVenda=venda.prazoVenda, tirMensal=tir_mensal,
+                       tirAnual=(1 + tir_mensal) ** 12 - 1)
+        if input_data.incluirFluxo:
+            cenario["fluxoCaixa"] = fluxo.tolist()
+        cenarios[nome] = cenario
+
+    return {"resumo": resultado.resumo, "cenarios": cenarios}
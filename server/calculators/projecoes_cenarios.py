@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Projeções anuais por cenário, em lote
+--------------------------------------
+Versão vetorizada de:
+
+- rentalYieldCalculator.generateRentalYieldYearlyData
+- assetAppreciationCalculator.generateAssetAppreciationYearlyData
+- projectionDetailsCalculator.calculatePaymentTotals
+
+Os cálculos em TypeScript avaliam uma projeção e um cenário por vez, com um
+laço ano a ano. Aqui os parâmetros de todas as projeções e dos três cenários
+(padrao/conservador/otimista) viram matrizes (projeções x cenários) e os
+anos são um eixo a mais; os juros compostos ano a ano viram potências.
+
+As regras seguem as funções originais, inclusive os valores padrão de cada
+cenário e a leitura dos campos no estilo do JavaScript: campo ausente, vazio
+ou zero usa o padrão. Os dados anuais dependem do período só pelo número de
+anos, então são calculados uma vez até o maior período pedido e recortados.
+"""
+
+import math
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+
+CENARIOS = ('padrao', 'conservador', 'otimista')
+
+# Padrões de rentalYieldCalculator, na ordem de CENARIOS
+ALUGUEL_PERCENTUAL_IMOVEL = (0.005, 0.004, 0.006)
+OCUPACAO_PADRAO = (0.95, 0.90, 0.98)
+TAXA_ADMINISTRACAO_PADRAO = (0.08, 0.08, 0.07)
+REAJUSTE_ALUGUEL_PADRAO = (0.05, 0.04, 0.06)
+
+# Padrão de assetAppreciationCalculator quando não há taxa de valorização
+VALORIZACAO_PADRAO = (0.20, 0.15, 0.25)
+
+# Tipos de pagamento somados por calculatePaymentTotals e os nomes dos totais
+TOTAIS_POR_TIPO = (
+    ('Parcela', 'totalParcelasPagas', 'totalParcelas'),
+    ('Reforço', 'totalReforcosPagos', 'totalReforcos'),
+    ('Chaves', 'totalChavesPago', 'totalChaves'),
+)
+
+_INTEIRO_INICIAL = re.compile(r'^\s*[+-]?\d+')
+
+
+class ProjecoesCenariosInput(BaseModel):
+    """Modelo de entrada: projeções (no formato de Projection) e os períodos em anos"""
+    projecoes: List[Dict[str, Any]] = Field(..., min_length=1)
+    prazos: List[int] = Field(default_factory=lambda: [5, 10, 15], min_length=1)
+
+
+def _numero(valor: Any) -> float:
+    """Number(valor) || 0"""
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        return 0.0
+    return numero if numero == numero else 0.0
+
+
+def _campo(valor: Any, padrao: float, escala: float = 1.0) -> float:
+    """valor ? parseFloat(valor) / escala : padrao (valor ausente, vazio ou 0 usa o padrão)"""
+    if valor is None or valor == '' or valor == 0 or valor is False:
+        return padrao
+    try:
+        return float(valor) / escala
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _inteiro(valor: Any, padrao: float) -> float:
+    """valor ? parseInt(valor) : padrao"""
+    if valor is None or valor == '' or valor == 0 or valor is False:
+        return padrao
+    if isinstance(valor, (int, float)):
+        return float(math.trunc(valor))
+    encontrado = _INTEIRO_INICIAL.match(str(valor))
+    return float(encontrado.group()) if encontrado else math.nan
+
+
+def _arredondar_js(valor: float) -> float:
+    """Math.round (meio para cima, diferente do round do Python)"""
+    return math.floor(valor + 0.5)
+
+
+def _anos_entrega(projecao: Dict[str, Any]) -> int:
+    return math.ceil(_meses_entrega(projecao) / 12)
+
+
+def _meses_entrega(projecao: Dict[str, Any]) -> float:
+    return _numero(projecao.get('deliveryMonths')) or 36
+
+
+def parametros_aluguel(projecoes: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Parâmetros de generateRentalYieldYearlyData, em matrizes (projeções x cenários)"""
+    colunas = {nome: np.zeros((len(projecoes), len(CENARIOS)))
+               for nome in ('aluguel', 'ocupacao', 'administracao', 'manutencao', 'reajuste')}
+    for i, projecao in enumerate(projecoes):
+        preco = _numero(projecao.get('listPrice'))
+        for j, cenario in enumerate(CENARIOS):
+            colunas['aluguel'][i, j] = _campo(projecao.get(f'{cenario}_aluguel_valor_mensal'), preco * ALUGUEL_PERCENTUAL_IMOVEL[j])
+            colunas['ocupacao'][i, j] = _campo(projecao.get(f'{cenario}_aluguel_ocupacao'), OCUPACAO_PADRAO[j], 100)
+            colunas['administracao'][i, j] = _campo(projecao.get(f'{cenario}_aluguel_taxa_administracao'), TAXA_ADMINISTRACAO_PADRAO[j], 100)
+            colunas['manutencao'][i, j] = _campo(projecao.get(f'{cenario}_aluguel_manutencao'), 0.0, 100)
+            colunas['reajuste'][i, j] = _campo(projecao.get(f'{cenario}_aluguel_reajuste_anual'), REAJUSTE_ALUGUEL_PADRAO[j], 100)
+    return colunas
+
+
+def dados_anuais_aluguel(projecoes: List[Dict[str, Any]], anos: int) -> Dict[str, np.ndarray]:
+    """
+    generateRentalYieldYearlyData para todas as projeções e cenários.
+
+    Returns:
+        Colunas (projeções x cenários x anos): rentalIncome, expenses, netIncome, yieldRate
+    """
+    parametros = parametros_aluguel(projecoes)
+    investimento = np.array([_numero(p.get('listPrice')) + _numero(p.get('furnishingCosts')) for p in projecoes])
+    despesas_fixas = np.array([_numero(p.get('condoFees')) * 12 + _numero(p.get('propertyTax')) for p in projecoes])
+    anos_entrega = np.array([_anos_entrega(p) for p in projecoes])
+
+    ano = np.arange(1, anos + 1)
+    # Anos após a entrega; o primeiro ano com aluguel não tem reajuste
+    apos_entrega = ano[None, :] - anos_entrega[:, None]                       # (projeções, anos)
+    alugando = (apos_entrega > 0)[:, None, :]
+    reajustes = np.maximum(apos_entrega - 1, 0)[:, None, :]
+
+    aluguel = parametros['aluguel'][..., None] * (1 + parametros['reajuste'][..., None]) ** reajustes
+    receita = aluguel * 12 * parametros['ocupacao'][..., None]
+    despesas = receita * parametros['administracao'][..., None] + parametros['manutencao'][..., None] + despesas_fixas[:, None, None]
+    liquido = receita - despesas
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rendimento = liquido / investimento[:, None, None]
+
+    return {
+        "rentalIncome": np.where(alugando, receita, 0.0),
+        "expenses": np.where(alugando, despesas, 0.0),
+        "netIncome": np.where(alugando, liquido, 0.0),
+        "yieldRate": np.where(alugando, rendimento, 0.0),
+    }
+
+
+def dados_anuais_valorizacao(projecoes: List[Dict[str, Any]], anos: int) -> Dict[str, np.ndarray]:
+    """
+    generateAssetAppreciationYearlyData para todas as projeções e cenários.
+
+    Durante a obra o valor cresce linearmente até o preço de tabela; após a
+    entrega, valoriza à taxa anual composta.
+
+    Returns:
+        Colunas (projeções x cenários x anos): propertyValue, appreciation, netValue
+    """
+    n = len(projecoes)
+    taxa = np.zeros((n, len(CENARIOS)))
+    custos_anuais = np.zeros((n, len(CENARIOS)))
+    for i, projecao in enumerate(projecoes):
+        for j, cenario in enumerate(CENARIOS):
+            taxa[i, j] = _campo(projecao.get(f'{cenario}_valorizacao_taxa_anual'),
+                                _campo(projecao.get(f'{cenario}_venda_valorizacao'), VALORIZACAO_PADRAO[j], 100), 100)
+            custos_anuais[i, j] = (_campo(projecao.get(f'{cenario}AssetAppreciationMaintenanceCosts'), 0.0)
+                                   + _campo(projecao.get(f'{cenario}AssetAppreciationAnnualTaxes'), 0.0))
+    preco = np.array([_numero(p.get('listPrice')) for p in projecoes])[:, None, None]
+    anos_entrega = np.array([_anos_entrega(p) for p in projecoes])[:, None, None]
+
+    ano = np.arange(1, anos + 1)[None, None, :]
+    em_obra = ano <= anos_entrega
+    # A valorização parte do preço de tabela no fim da obra
+    valorizados = ano - np.maximum(anos_entrega, 0)
+    fator = (1 + taxa[..., None]) ** valorizados
+    with np.errstate(divide='ignore', invalid='ignore'):
+        valor_obra = preco * ano / anos_entrega
+        valorizacao_obra = np.broadcast_to(preco / anos_entrega, valor_obra.shape)
+
+    valor = np.where(em_obra, valor_obra, preco * fator)
+    valorizacao = np.where(em_obra, valorizacao_obra, preco * (1 + taxa[..., None]) ** (valorizados - 1) * taxa[..., None])
+    liquido = np.where(em_obra, valor - custos_anuais[..., None],
+                       valor - custos_anuais[..., None] * (ano - anos_entrega + 1))
+
+    return {"propertyValue": valor, "appreciation": valorizacao, "netValue": liquido}
+
+
+def meses_venda(projecao: Dict[str, Any]) -> List[float]:
+    """Mês da venda de cada cenário (getInvestmentPeriod)"""
+    entrega = _meses_entrega(projecao)
+    return [
+        _inteiro(projecao.get('padraoFutureSaleInvestmentPeriod'), entrega + 1),
+        _inteiro(projecao.get('conservadorFutureSaleInvestmentPeriod'), _arredondar_js(entrega * 1.3)),
+        _inteiro(projecao.get('otimistaFutureSaleInvestmentPeriod'), max(1, _arredondar_js(entrega * 0.7))),
+    ]
+
+
+def totais_pagamentos(projecao: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """calculatePaymentTotals dos três cenários, com uma máscara (cenários x parcelas)"""
+    parcelas = ((projecao.get('calculationResults') or {}).get('financiamentoPlanta') or {}).get('parcelas') or []
+    if not parcelas:
+        vazio = {nome: 0 for _, pagos, bases in TOTAIS_POR_TIPO for nome in (pagos, bases)}
+        return [dict(vazio, totalPagamentos=0, mesDaVenda=0) for _ in CENARIOS]
+
+    venda = np.array(meses_venda(projecao))
+    meses = np.array([p['mes'] for p in parcelas], dtype=float)
+    tipos = np.array([p['tipoPagamento'] for p in parcelas])
+    valor_base = np.array([p['valorBase'] for p in parcelas], dtype=float)
+    valor_corrigido = np.array([p['valorCorrigido'] for p in parcelas], dtype=float)
+
+    ate_venda = meses[None, :] <= venda[:, None]                      # (cenários, parcelas)
+    totais = [{} for _ in CENARIOS]
+    total_pagamentos = np.zeros(len(CENARIOS))
+    for tipo, nome_pagos, nome_bases in TOTAIS_POR_TIPO:
+        mascara = ate_venda & (tipos == tipo)[None, :]
+        pagos = mascara @ valor_corrigido
+        bases = mascara @ valor_base
+        total_pagamentos += pagos
+        for j in range(len(CENARIOS)):
+            totais[j][nome_pagos] = float(pagos[j])
+            totais[j][nome_bases] = float(bases[j])
+    for j in range(len(CENARIOS)):
+        totais[j]["totalPagamentos"] = float(total_pagamentos[j])
+        totais[j]["mesDaVenda"] = _json_numero(venda[j])
+    return totais
+
+
+def _json_numero(valor: float) -> Optional[float]:
+    """NaN e infinito viram null, como no JSON.stringify do JavaScript"""
+    valor = float(valor)
+    if not math.isfinite(valor):
+        return None
+    return int(valor) if valor.is_integer() else valor
+
+
+def _linhas_anuais(colunas: Dict[str, np.ndarray], i: int, j: int, anos: int) -> List[Dict[str, Any]]:
+    """Lista de YearlyDataItem de uma projeção e cenário"""
+    valores = {nome: coluna[i, j, :anos].tolist() for nome, coluna in colunas.items()}
+    return [
+        dict({"year": ano + 1}, **{nome: _json_numero(valores[nome][ano]) for nome in colunas})
+        for ano in range(anos)
+    ]
+
+
+def calcular_projecoes_cenarios(input_data: Any) -> Dict[str, Any]:
+    """
+    Dados anuais de aluguel e valorização e totais de pagamento de todas as
+    projeções, nos três cenários e em cada período pedido.
+
+    Args:
+        input_data: ProjecoesCenariosInput ou dicionário equivalente
+
+    Returns:
+        {"projecoes": [{"id", "cenarios": {cenario: {...}}}]}
+    """
+    if isinstance(input_data, dict):
+        input_data = ProjecoesCenariosInput(**input_data)
+
+    projecoes = input_data.projecoes
+    prazos = sorted(set(input_data.prazos))
+    anos = max(max(prazos), 0)
+
+    aluguel = dados_anuais_aluguel(projecoes, anos)
+    valorizacao = dados_anuais_valorizacao(projecoes, anos)
+
+    resultado = []
+    for i, projecao in enumerate(projecoes):
+        totais = totais_pagamentos(projecao)
+        cenarios = {}
+        for j, cenario in enumerate(CENARIOS):
+            cenarios[cenario] = {
+                "rentalYieldYearly": {str(prazo): _linhas_anuais(aluguel, i, j, max(prazo, 0)) for prazo in prazos},
+                "assetAppreciationYearly": {str(prazo): _linhas_anuais(valorizacao, i, j, max(prazo, 0)) for prazo in prazos},
+                "paymentTotals": totais[j],
+            }
+        resultado.append({"id": projecao.get('id'), "cenarios": cenarios})
+
+    return {"prazos": prazos, "projecoes": resultado}
@@ -13,6 +13,11 @@ import { log } from '../vite';
 const PYTHON_PORT = 5002;
 const PYTHON_API_URL = `http://localhost:${PYTHON_PORT}/api/calcular-financiamento`;
 
+// Política de timeout e retentativas das chamadas ao serviço Python
+const PYTHON_TIMEOUT_MS = 15000;
+const PYTHON_MAX_TENTATIVAS = 3;
+const PYTHON_ESPERA_MAXIMA_MS = 5000;
+
 // Variável para controlar o estado do servidor Python
 let pythonServerProcess: any = null;
 let serverStarting = false;
@@ -78,6 +83,44 @@ export function stopPythonServer(): void {
   }
 }
 
+/**
+ * POST ao serviço Python com timeout por tentativa e retentativas limitadas.
+ * Repete apenas quando o serviço recusa por carga (429/503, respeitando o
+ * Retry-After) ou quando a conexão falha; erros de cálculo não são repetidos.
+ */
+async function postComRetentativas<T>(url: string, dados: unknown): Promise<T> {
+  let ultimoErro: any;
+
+  for (let tentativa = 1; tentativa <= PYTHON_MAX_TENTATIVAS; tentativa++) {
+    try {
+      const response = await axios.post<T>(url, dados, {
+        timeout: PYTHON_TIMEOUT_MS,
+        headers: { 'X-Prazo-Ms': String(PYTHON_TIMEOUT_MS) }
+      });
+      return response.data;
+    } catch (error: any) {
+      ultimoErro = error;
+      const status = error.response?.status;
+      const recusaPorCarga = status === 429 || status === 503;
+      const falhaConexao = !error.response && error.code !== 'ECONNABORTED';
+
+      if (tentativa === PYTHON_MAX_TENTATIVAS || !(recusaPorCarga || falhaConexao)) {
+        throw error;
+      }
+
+      const retryAfter = Number(error.response?.headers?.['retry-after']);
+      const esperaMs = Math.min(
+        Number.isFinite(retryAfter) && retryAfter > 0 ? retryAfter * 1000 : 250 * 2 ** (tentativa - 1),
+        PYTHON_ESPERA_MAXIMA_MS
+      );
+      log(`Serviço Python indisponível (${status ?? error.code}); nova tentativa em ${esperaMs}ms`, "python");
+      await new Promise(resolve => setTimeout(resolve, esperaMs));
+    }
+  }
+
+  throw ultimoErro;
+}
+
 /**
  * Calcula o financiamento na planta usando o serviço Python
  */
@@ -91,17 +134,10 @@ export async function calcularFinanciamentoPlantaPython(input: FinanciamentoPlan
     // Faz a chamada para o serviço Python
     log(`Enviando dados para cálculo Python: ${JSON.stringify(input, null, 2)}`, "python");
     
-    const response = await axios.post(PYTHON_API_URL, input);
-    
-    if (response.status !== 200) {
-      throw new Error(`Erro na resposta do servidor Python: ${response.statusText}`);
-    }
+    const resultado = await postComRetentativas<ResultadoFinanciamentoPlanta>(PYTHON_API_URL, input);
     
     log("Cálculo Python concluído com sucesso!", "python");
     
-    // Logar primeiro os dados que são mais importantes para a verificação
-    const resultado = response.data as ResultadoFinanciamentoPlanta;
-    
     // Logar o saldo líquido para cada mês para verificação
     if (resultado.parcelas && resultado.parcelas.length > 0) {
       log("------- VERIFICAÇÃO DOS SALDOS LÍQUIDOS -------", "python");
@@ -132,4 +168,26 @@ export async function calcularFinanciamentoPlantaPython(input: FinanciamentoPlan
     }
     throw error;
   }
-}
\ No newline at end of file
+}
+
+/**
+ * Envia as variações mensais (%) de um índice ao serviço Python, que mantém
+ * as séries usadas na calibração das taxas de correção. Falhas são apenas
+ * registradas (retorna false): a coleta dos índices não depende do serviço Python.
+ */
+export async function enviarPontosIndicePython(
+  indice: 'incc' | 'ipca' | 'cub',
+  pontos: Array<{ month: string; value: number }>
+): Promise<boolean> {
+  if (pontos.length === 0) {
+    return true;
+  }
+
+  try {
+    await postComRetentativas(`http://localhost:${PYTHON_PORT}/api/indices/${indice}/pontos`, { pontos });
+    return true;
+  } catch (error: any) {
+    log(`Falha ao enviar pontos de ${indice.toUpperCase()} ao serviço Python: ${error.message}`, "python");
+    return false;
+  }
+}
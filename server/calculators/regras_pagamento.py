@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Regras declarativas de pagamento do parcelamento automático
+------------------------------------------------------------
+O parcelamento automático distribui o saldo em parcelas mensais iguais,
+descontados os pagamentos especiais. Os campos clássicos (incluirReforco,
+periodicidadeReforco, valorReforco, valorChaves) descrevem uma única série
+de reforços até as chaves e um único pagamento nas chaves. Contratos reais
+combinam reforços semestrais e anuais, reforços após as chaves, carências e
+vários pagamentos ligados às chaves; para eles há regrasPagamento:
+
+- Reforço / Chaves: paga `valor` de mesInicial a mesFinal, a cada
+  `periodicidade` meses (padrão de mesFinal: fim do prazo); sem
+  periodicidade, paga todo mês do intervalo (padrão: só mesInicial). Com
+  referencia='chaves' os meses contam a partir do mês de entrega.
+- Carência: meses de mesInicial a mesFinal sem parcela regular (os
+  pagamentos especiais do período continuam valendo).
+
+Regras que caem no mesmo mês somam os valores; o tipo do mês segue a
+prioridade Chaves > Reforço > Parcela.
+
+As regras são compiladas uma única vez por estrutura (tipos e meses, sem os
+valores) em máscaras por mês: o quanto de cada regra é pago em cada mês, o
+quanto de cada regra é abatido do valor a distribuir e quais meses recebem a
+parcela regular. Os campos clássicos são compilados pelo mesmo caminho, com
+as regras do cálculo original (reforços só até as chaves; as chaves
+prevalecem sobre o reforço no mesmo mês, que continua sendo abatido).
+
+Este módulo não depende do NumPy: o cálculo original também o usa.
+"""
+
+from functools import lru_cache
+from typing import Any, List, Literal, NamedTuple, Optional, Tuple
+
+from pydantic import BaseModel, Field, model_validator
+
+
+# Periodicidade do reforço em meses
+PERIODOS_REFORCO = {
+    'trimestral': 3,
+    'semestral': 6,
+    'anual': 12,
+}
+
+# Prioridade do tipo do mês quando há mais de um pagamento
+PRIORIDADE_TIPOS = ('Parcela', 'Reforço', 'Chaves')
+
+
+class RegraPagamento(BaseModel):
+    """Regra de pagamento especial (ou de carência) do parcelamento automático"""
+    tipo: Literal['Reforço', 'Chaves', 'Carência']
+    valor: float = Field(0, ge=0)
+    mesInicial: int = Field(..., ge=0)
+    mesFinal: Optional[int] = Field(None, ge=0)
+    periodicidade: Optional[int] = Field(None, gt=0)
+    referencia: Literal['inicio', 'chaves'] = 'inicio'
+
+    @model_validator(mode='after')
+    def validar_regra(self):
+        """Valida valor e intervalo de meses da regra"""
+        if self.tipo != 'Carência' and self.valor <= 0:
+            raise ValueError(f"Regra de {self.tipo} deve ter valor maior que zero")
+        if self.referencia == 'inicio' and self.mesInicial == 0:
+            raise ValueError("mesInicial deve ser maior que zero quando referencia='inicio'")
+        if self.mesFinal is not None and self.mesFinal < self.mesInicial:
+            raise ValueError("mesFinal deve ser maior ou igual a mesInicial")
+        return self
+
+
+class PadraoPagamentos(NamedTuple):
+    """Forma compilada de um conjunto de regras para um prazo"""
+    # Tipo de pagamento dos meses 1..prazo_pagamento
+    tipos: Tuple[str, ...]
+    # Por regra: unidades do valor da regra pagas em cada mês
+    indicadores: Tuple[Tuple[float, ...], ...]
+    # Por regra: unidades do valor da regra abatidas do valor a distribuir
+    contagens: Tuple[int, ...]
+    # Meses que recebem a parcela regular
+    regulares: Tuple[bool, ...]
+    n_regulares: int
+
+
+def meses_com_reforco(periodicidade: Optional[str], prazo_entrega: int, prazo_pagamento: int) -> List[int]:
+    """Meses com reforço no parcelamento automático (apenas até a entrega das chaves)"""
+    periodo = PERIODOS_REFORCO.get(periodicidade or '', 0)
+    if periodo <= 0:
+        return []
+    return [mes for mes in range(periodo, prazo_pagamento + 1, periodo) if mes <= prazo_entrega]
+
+
+def estrutura_pagamentos(input_data: Any) -> Tuple:
+    """Parte não monetária dos pagamentos do plano (chave da forma compilada)"""
+    if input_data.regrasPagamento:
+        return ('regras', tuple(
+            (regra.tipo, regra.mesInicial, regra.mesFinal, regra.periodicidade, regra.referencia)
+            for regra in input_data.regrasPagamento
+        ))
+
+    valor_reforco = input_data.valorReforco or 0
+    reforco_ativo = (input_data.incluirReforco and valor_reforco > 0
+                     and PERIODOS_REFORCO.get(input_data.periodicidadeReforco or '', 0) > 0)
+    return ('legado', input_data.periodicidadeReforco if reforco_ativo else None, (input_data.valorChaves or 0) > 0)
+
+
+def valores_regras(input_data: Any) -> Tuple[float, ...]:
+    """Valor de cada regra, na ordem das linhas de PadraoPagamentos.indicadores"""
+    if input_data.regrasPagamento:
+        return tuple(float(regra.valor) if regra.tipo != 'Carência' else 0.0 for regra in input_data.regrasPagamento)
+    return (float(input_data.valorReforco or 0), float(input_data.valorChaves or 0))
+
+
+def _meses_regra(regra: Tuple, prazo_entrega: int, prazo_pagamento: int) -> range:
+    """Meses (1..prazo_pagamento) cobertos por uma regra compilável"""
+    _, mes_inicial, mes_final, periodicidade, referencia = regra
+    origem = prazo_entrega if referencia == 'chaves' else 0
+    if mes_final is not None:
+        fim = origem + mes_final
+    else:
+        fim = prazo_pagamento if periodicidade else origem + mes_inicial
+    return range(origem + mes_inicial, min(fim, prazo_pagamento) + 1, periodicidade or 1)
+
+
+def _compilar_legado(periodicidade: Optional[str], chaves_ativas: bool,
+                     prazo_entrega: int, prazo_pagamento: int) -> PadraoPagamentos:
+    """Campos clássicos: reforço até as chaves e pagamento único nas chaves"""
+    reforcos = set(meses_com_reforco(periodicidade, prazo_entrega, prazo_pagamento))
+    mes_chaves = prazo_entrega if chaves_ativas and prazo_entrega <= prazo_pagamento else None
+
+    indicador_reforco, indicador_chaves, tipos = [], [], []
+    for mes in range(1, prazo_pagamento + 1):
+        chaves = mes == mes_chaves
+        # Chaves prevalecem sobre o reforço no mesmo mês (o reforço continua abatido)
+        reforco = mes in reforcos and not chaves
+        indicador_reforco.append(1.0 if reforco else 0.0)
+        indicador_chaves.append(1.0 if chaves else 0.0)
+        tipos.append('Chaves' if chaves else 'Reforço' if reforco else 'Parcela')
+
+    regulares = tuple(tipo == 'Parcela' for tipo in tipos)
+    return PadraoPagamentos(
+        tipos=tuple(tipos),
+        indicadores=(tuple(indicador_reforco), tuple(indicador_chaves)),
+        contagens=(len(reforcos), 1 if chaves_ativas else 0),
+        regulares=regulares,
+        n_regulares=sum(regulares),
+    )
+
+
+def _compilar_regras(regras: Tuple, prazo_entrega: int, prazo_pagamento: int) -> PadraoPagamentos:
+    """Regras declarativas: valores somados no mesmo mês, carências sem parcela regular"""
+    prioridade = [0] * prazo_pagamento
+    regulares = [True] * prazo_pagamento
+    indicadores, contagens = [], []
+
+    for regra in regras:
+        indicador = [0.0] * prazo_pagamento
+        meses = _meses_regra(regra, prazo_entrega, prazo_pagamento)
+        if regra[0] == 'Carência':
+            for mes in meses:
+                regulares[mes - 1] = False
+            contagens.append(0)
+        else:
+            nivel = PRIORIDADE_TIPOS.index(regra[0])
+            for mes in meses:
+                indicador[mes - 1] = 1.0
+                regulares[mes - 1] = False
+                prioridade[mes - 1] = max(prioridade[mes - 1], nivel)
+            contagens.append(len(meses))
+        indicadores.append(tuple(indicador))
+
+    return PadraoPagamentos(
+        tipos=tuple(PRIORIDADE_TIPOS[nivel] for nivel in prioridade),
+        indicadores=tuple(indicadores),
+        contagens=tuple(contagens),
+        regulares=tuple(regulares),
+        n_regulares=sum(regulares),
+    )
+
+
+@lru_cache(maxsize=256)
+def compilar_pagamentos(prazo_entrega: int, prazo_pagamento: int, estrutura: Tuple) -> PadraoPagamentos:
+    """Compila (com cache) a estrutura de pagamentos de estrutura_pagamentos para um prazo"""
+    if estrutura[0] == 'legado':
+        return _compilar_legado(estrutura[1], estrutura[2], prazo_entrega, prazo_pagamento)
+    return _compilar_regras(estrutura[1], prazo_entrega, prazo_pagamento)
+
+
+def padrao_do_plano(input_data: Any) -> PadraoPagamentos:
+    """Forma compilada dos pagamentos do plano"""
+    return compilar_pagamentos(input_data.prazoEntrega, input_data.prazoPagamento, estrutura_pagamentos(input_data))
+
+
+def parcela_regular(padrao: PadraoPagamentos, valores: Tuple[float, ...], saldo: float) -> float:
+    """Valor da parcela regular: saldo menos os pagamentos especiais, dividido pelos meses regulares"""
+    valor_distribuir = saldo
+    for valor, contagem in zip(valores, padrao.contagens):
+        valor_distribuir -= contagem * valor
+    return valor_distribuir / padrao.n_regulares if padrao.n_regulares else 0
+
+
+def valores_base_mensais(padrao: PadraoPagamentos, valores: Tuple[float, ...], parcela: float) -> List[float]:
+    """Valor base de cada mês 1..prazo_pagamento"""
+    valores_base = [parcela if regular else 0.0 for regular in padrao.regulares]
+    for valor, indicador in zip(valores, padrao.indicadores):
+        if valor:
+            for i, unidades in enumerate(indicador):
+                if unidades:
+                    valores_base[i] += unidades * valor
+    return valores_base
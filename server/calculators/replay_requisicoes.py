@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Replay determinístico de uma captura de requisições, com perfilamento
+----------------------------------------------------------------------
+Reproduz um arquivo gravado pela captura do serviço (captura_requisicoes.py)
+contra uma versão do motor de cálculo: o diretório informado em --motor
+(por padrão, este) é carregado no próprio processo e as requisições são
+enviadas pelo cliente de teste do Flask, uma a uma, na ordem da captura.
+
+Duas passadas, depois do aquecimento:
+
+1. latência, sem perfilador: p50/p95/p99 por rota, ao lado da duração
+   observada em produção;
+2. perfilamento, com cProfile ou com o amostrador de pilhas embutido:
+   funções com mais tempo próprio, com o tempo acumulado, em ms por
+   requisição. Nesta passada o cálculo roda na própria thread da requisição
+   (sem o pool do controle de admissão), para que o perfilador veja a
+   requisição inteira.
+
+O armazém persistente e a captura ficam desligados e o cache de respostas
+fica sem espaço (use --com-cache para mantê-lo), de modo que cada requisição
+é de fato calculada. A saída padrão do motor é descartada durante o replay.
+
+Exemplos:
+    # Captura de 1% das requisições em produção
+    CAPTURA_REQUISICOES_ARQUIVO=/var/tmp/captura.jsonl gunicorn -w 4 financiamento_api:app
+
+    # Replay da versão anterior (ex.: git worktree) e da atual, com comparação
+    python3 replay_requisicoes.py --captura captura.jsonl --motor /tmp/anterior/server/calculators \\
+        --saida replay_anterior.json
+    python3 replay_requisicoes.py --captura captura.jsonl --comparar replay_anterior.json
+
+    # Amostrador de pilhas e perfil bruto para outras ferramentas (pstats, snakeviz)
+    python3 replay_requisicoes.py --captura captura.jsonl --perfilador amostragem
+    python3 replay_requisicoes.py --captura captura.jsonl --perfil-bruto replay.prof
+"""
+
+import argparse
+import contextlib
+import cProfile
+import datetime
+import importlib
+import json
+import os
+import platform
+import pstats
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from carga_financiamento import percentil
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+
+# ---------------------------------------------------------------------------
+# Captura e motor
+# ---------------------------------------------------------------------------
+
+def ler_captura(arquivo: str, rotas: Optional[List[str]], limite: Optional[int]) -> List[Dict[str, Any]]:
+    """Requisições da captura, na ordem do arquivo (linhas inválidas são ignoradas)"""
+    registros = []
+    with open(arquivo, encoding='utf-8') as f:
+        for linha in f:
+            try:
+                registro = json.loads(linha)
+            except ValueError:
+                continue
+            if rotas and registro.get('rota') not in rotas:
+                continue
+            registros.append(registro)
+            if limite and len(registros) >= limite:
+                break
+    return registros
+
+
+def carregar_motor(diretorio: str, com_cache: bool) -> Any:
+    """Importa financiamento_api do diretório do motor, isolado do estado compartilhado da máquina"""
+    temporario = tempfile.mkdtemp(prefix='replay-financiamento-')
+    os.environ.update({
+        'ARMAZEM_RESULTADOS_CAMINHO': '',
+        'CAPTURA_REQUISICOES_ARQUIVO': '',
+        'SERIES_INDICES_CAMINHO': os.path.join(temporario, 'indices.sqlite3'),
+        'TAREFAS_DIRETORIO': os.path.join(temporario, 'tarefas'),
+        # O perfilamento deixa o cálculo mais lento; o prazo padrão não deve vencer no replay
+        'CALCULO_PRAZO_S': '600',
+    })
+    if not com_cache:
+        os.environ['CACHE_RESPOSTAS_MAX_BYTES'] = '0'
+    sys.path.insert(0, os.path.abspath(diretorio))
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        return importlib.import_module('financiamento_api')
+
+
+@contextlib.contextmanager
+def calculo_na_thread_da_requisicao(motor: Any):
+    """Executa o trabalho do controle de admissão na thread de quem chama (versões sem ele: nada muda)"""
+    controle = getattr(motor, 'controle_admissao', None)
+    if controle is None:
+        yield
+        return
+    controle.executar = lambda funcao, custo, prazo_s=None: funcao()
+    try:
+        yield
+    finally:
+        del controle.executar
+
+
+def enviar(cliente: Any, registro: Dict[str, Any]) -> Tuple[int, float]:
+    """Envia uma requisição da captura; devolve o status e a duração em ms"""
+    corpo = json.dumps(registro['corpo'])
+    inicio = time.perf_counter()
+    resposta = cliente.post(registro['rota'], data=corpo, content_type='application/json',
+                            headers=registro.get('cabecalhos') or {})
+    resposta.get_data()
+    return resposta.status_code, (time.perf_counter() - inicio) * 1000
+
+
+# ---------------------------------------------------------------------------
+# Latência
+# ---------------------------------------------------------------------------
+
+def metricas_latencia(registros: List[Dict[str, Any]], medidas: List[Tuple[str, int, float, bool]]) -> Dict[str, Any]:
+    """
+    Latências por rota (e '*') no replay, ao lado da duração vista em produção.
+
+    Só entram nas latências as requisições com o mesmo status da captura
+    (uma rota inexistente em outra versão do motor responde 404 em 1 ms).
+    """
+    por_rota = {}
+    for rota in sorted({m[0] for m in medidas}) + ['*']:
+        selecionadas = [m for m in medidas if rota == '*' or m[0] == rota]
+        latencias = sorted(m[2] for m in selecionadas if m[3])
+        producao = sorted(r['duracaoMs'] for r in registros
+                          if (rota == '*' or r['rota'] == rota) and r.get('duracaoMs') is not None)
+        por_rota[rota] = {
+            "requisicoes": len(selecionadas),
+            "divergencias": sum(1 for m in selecionadas if not m[3]),
+            "mediaMs": sum(latencias) / len(latencias) if latencias else None,
+            "p50Ms": percentil(latencias, 50),
+            "p95Ms": percentil(latencias, 95),
+            "p99Ms": percentil(latencias, 99),
+            "producaoP50Ms": percentil(producao, 50),
+            "producaoP95Ms": percentil(producao, 95),
+        }
+    return por_rota
+
+
+def passada_latencia(cliente: Any, registros: List[Dict[str, Any]], repeticoes: int) -> Dict[str, Any]:
+    """Reproduz a captura `repeticoes` vezes sem perfilador"""
+    medidas = []
+    divergencias = Counter()
+    for _ in range(repeticoes):
+        for registro in registros:
+            status, duracao_ms = enviar(cliente, registro)
+            mesmo_status = status == registro.get('status')
+            medidas.append((registro['rota'], status, duracao_ms, mesmo_status))
+            if not mesmo_status:
+                divergencias[f"{registro['rota']} {registro.get('status')}->{status}"] += 1
+    return {"rotas": metricas_latencia(registros, medidas), "divergenciasStatus": dict(divergencias)}
+
+
+# ---------------------------------------------------------------------------
+# Perfilamento
+# ---------------------------------------------------------------------------
+
+def nome_funcao(arquivo: str, nome: str, diretorio_motor: str) -> str:
+    """'arquivo:função', com o caminho relativo ao motor (comparável entre versões em diretórios diferentes)"""
+    if arquivo.startswith(diretorio_motor + os.sep):
+        arquivo = os.path.relpath(arquivo, diretorio_motor)
+    elif arquivo.startswith(('<', '~')):
+        return nome
+    else:
+        arquivo = os.sep.join(arquivo.split(os.sep)[-2:])
+    return f"{arquivo}:{nome}"
+
+
+class AmostradorPilhas:
+    """
+    Perfilador estatístico: amostra a pilha de uma thread a intervalos fixos.
+
+    Uma amostra conta como tempo próprio da função no topo da pilha e como
+    tempo acumulado de cada função presente na pilha. O amostrador só roda
+    quando obtém o GIL, então trechos longos em C sem soltar o GIL são
+    atribuídos à função Python que os chamou.
+    """
+
+    def __init__(self, id_thread: int, intervalo_s: float):
+        self.id_thread = id_thread
+        self.intervalo_s = intervalo_s
+        self.amostras = 0
+        self.proprias: Counter = Counter()
+        self.acumuladas: Counter = Counter()
+        self.linhas: Dict[Tuple[str, str], int] = {}
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._laco, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_):
+        self._parar.set()
+        self._thread.join()
+
+    def _laco(self) -> None:
+        while not self._parar.wait(self.intervalo_s):
+            quadro = sys._current_frames().get(self.id_thread)
+            if quadro is None:
+                continue
+            self.amostras += 1
+            vistas = set()
+            topo = True
+            while quadro is not None:
+                codigo = quadro.f_code
+                chave = (codigo.co_filename, codigo.co_name)
+                self.linhas.setdefault(chave, codigo.co_firstlineno)
+                if topo:
+                    self.proprias[chave] += 1
+                    topo = False
+                if chave not in vistas:
+                    vistas.add(chave)
+                    self.acumuladas[chave] += 1
+                quadro = quadro.f_back
+
+
+def pontos_quentes_cprofile(perfil: cProfile.Profile, diretorio_motor: str,
+                            n_requisicoes: int, top: int) -> List[Dict[str, Any]]:
+    """Funções com mais tempo próprio no cProfile (funções de mesmo nome e arquivo somadas)"""
+    agregadas: Dict[str, Dict[str, Any]] = {}
+    for (arquivo, linha, nome), (_, chamadas, proprio, acumulado, _) in pstats.Stats(perfil).stats.items():
+        chave = nome_funcao(arquivo, nome, diretorio_motor)
+        item = agregadas.setdefault(chave, {"funcao": chave, "linha": linha, "chamadas": 0,
+                                            "proprioS": 0.0, "acumuladoS": 0.0})
+        item["chamadas"] += chamadas
+        item["proprioS"] += proprio
+        item["acumuladoS"] = max(item["acumuladoS"], acumulado)
+    total_s = sum(item["proprioS"] for item in agregadas.values()) or 1.0
+    pontos = sorted(agregadas.values(), key=lambda item: item["proprioS"], reverse=True)[:top]
+    return [{
+        "funcao": item["funcao"],
+        "linha": item["linha"],
+        "chamadasPorRequisicao": item["chamadas"] / n_requisicoes,
+        "proprioMsPorRequisicao": item["proprioS"] * 1000 / n_requisicoes,
+        "acumuladoMsPorRequisicao": item["acumuladoS"] * 1000 / n_requisicoes,
+        "fracaoPropria": item["proprioS"] / total_s,
+    } for item in pontos]
+
+
+def pontos_quentes_amostragem(amostrador: AmostradorPilhas, decorrido_s: float, diretorio_motor: str,
+                              n_requisicoes: int, top: int) -> List[Dict[str, Any]]:
+    """Funções com mais amostras no topo da pilha, convertidas em ms pela duração da passada"""
+    amostras = amostrador.amostras or 1
+    ms_por_amostra = decorrido_s * 1000 / amostras / n_requisicoes
+    return [{
+        "funcao": nome_funcao(chave[0], chave[1], diretorio_motor),
+        "linha": amostrador.linhas[chave],
+        "chamadasPorRequisicao": None,
+        "proprioMsPorRequisicao": proprias * ms_por_amostra,
+        "acumuladoMsPorRequisicao": amostrador.acumuladas[chave] * ms_por_amostra,
+        "fracaoPropria": proprias / amostras,
+    } for chave, proprias in amostrador.proprias.most_common(top)]
+
+
+def passada_perfilada(cliente: Any, motor: Any, registros: List[Dict[str, Any]], perfilador: str,
+                      intervalo_s: float, top: int, perfil_bruto: Optional[str]) -> Dict[str, Any]:
+    """Reproduz a captura uma vez sob o perfilador e devolve os pontos quentes"""
+    diretorio_motor = os.path.dirname(os.path.abspath(motor.__file__))
+    n = len(registros)
+    with calculo_na_thread_da_requisicao(motor):
+        inicio = time.perf_counter()
+        if perfilador == 'cprofile':
+            perfil = cProfile.Profile()
+            perfil.enable()
+            for registro in registros:
+                enviar(cliente, registro)
+            perfil.disable()
+            if perfil_bruto:
+                perfil.dump_stats(perfil_bruto)
+            pontos = pontos_quentes_cprofile(perfil, diretorio_motor, n, top)
+        else:
+            with AmostradorPilhas(threading.get_ident(), intervalo_s) as amostrador:
+                for registro in registros:
+                    enviar(cliente, registro)
+            pontos = pontos_quentes_amostragem(amostrador, time.perf_counter() - inicio, diretorio_motor, n, top)
+        decorrido = time.perf_counter() - inicio
+    return {"perfilador": perfilador, "duracaoS": decorrido, "pontosQuentes": pontos}
+
+
+# ---------------------------------------------------------------------------
+# Relatórios
+# ---------------------------------------------------------------------------
+
+def _ms(valor: Optional[float]) -> str:
+    return f"{valor:9.2f}" if valor is not None else f"{'-':>9}"
+
+
+def imprimir_latencias(latencia: Dict[str, Any]) -> None:
+    print(f"{'rota':<34} {'req.':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'prod p50':>9} {'prod p95':>9}")
+    for rota, r in latencia["rotas"].items():
+        print(f"{rota:<34} {r['requisicoes']:>6} {_ms(r['p50Ms'])} {_ms(r['p95Ms'])} {_ms(r['p99Ms'])} "
+              f"{_ms(r['producaoP50Ms'])} {_ms(r['producaoP95Ms'])}")
+    for divergencia, quantidade in latencia["divergenciasStatus"].items():
+        print(f"  AVISO: status divergente da captura ({divergencia}): {quantidade}x")
+
+
+def imprimir_pontos_quentes(perfil: Dict[str, Any]) -> None:
+    print(f"\nPontos quentes ({perfil['perfilador']}, ms por requisição):")
+    print(f"{'próprio':>9} {'acumul.':>9} {'%':>6} {'chamadas':>9}  função")
+    for p in perfil["pontosQuentes"]:
+        chamadas = f"{p['chamadasPorRequisicao']:9.1f}" if p['chamadasPorRequisicao'] is not None else f"{'-':>9}"
+        print(f"{p['proprioMsPorRequisicao']:9.3f} {p['acumuladoMsPorRequisicao']:9.3f} "
+              f"{p['fracaoPropria']:6.1%} {chamadas}  {p['funcao']}:{p['linha']}")
+
+
+def _variacao(atual: Optional[float], antes: Optional[float]) -> str:
+    return f"{atual / antes - 1:+.1%}" if atual is not None and antes else "-"
+
+
+def comparar(atual: Dict[str, Any], arquivo_anterior: str) -> None:
+    """Variação das latências por rota e do tempo próprio dos pontos quentes em relação a um replay anterior"""
+    with open(arquivo_anterior, encoding='utf-8') as f:
+        anterior = json.load(f)
+    print(f"\nComparação com {arquivo_anterior} (motor {anterior['parametros']['motor']}):")
+    for rota, r in atual["latencia"]["rotas"].items():
+        antes = anterior["latencia"]["rotas"].get(rota)
+        if not antes:
+            continue
+        print(f"  {rota}: p50 {_ms(antes['p50Ms']).strip()} -> {_ms(r['p50Ms']).strip()} ms "
+              f"({_variacao(r['p50Ms'], antes['p50Ms'])}), p95 {_variacao(r['p95Ms'], antes['p95Ms'])}, "
+              f"p99 {_variacao(r['p99Ms'], antes['p99Ms'])}")
+
+    if atual.get("perfil") and anterior.get("perfil"):
+        antes_por_funcao = {p["funcao"]: p for p in anterior["perfil"]["pontosQuentes"]}
+        print("  Pontos quentes (ms próprios por requisição):")
+        for p in atual["perfil"]["pontosQuentes"]:
+            antes = antes_por_funcao.get(p["funcao"])
+            valor_antes = antes["proprioMsPorRequisicao"] if antes else None
+            print(f"    {_ms(valor_antes)} -> {_ms(p['proprioMsPorRequisicao'])} "
+                  f"({_variacao(p['proprioMsPorRequisicao'], valor_antes)})  {p['funcao']}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Replay de uma captura de requisições do serviço de cálculo")
+    parser.add_argument('--captura', required=True, help="Arquivo JSONL gravado pela captura do serviço")
+    parser.add_argument('--motor', default=DIRETORIO, help="Diretório com o financiamento_api.py a reproduzir")
+    parser.add_argument('--rotas', type=lambda texto: [r for r in texto.split(',') if r],
+                        help="Só estas rotas, ex.: /api/calcular-financiamento,/api/comparar-planos")
+    parser.add_argument('--limite', type=int, help="Número máximo de requisições lidas da captura")
+    parser.add_argument('--aquecimento', type=int, default=1, help="Passadas de aquecimento (não medidas)")
+    parser.add_argument('--repeticoes', type=int, default=3, help="Passadas medidas na latência")
+    parser.add_argument('--perfilador', choices=('cprofile', 'amostragem', 'nenhum'), default='cprofile')
+    parser.add_argument('--intervalo', type=float, default=0.001, help="Intervalo do amostrador, em segundos")
+    parser.add_argument('--top', type=int, default=25, help="Número de pontos quentes no relatório")
+    parser.add_argument('--perfil-bruto', help="Grava o perfil do cProfile neste arquivo (formato pstats)")
+    parser.add_argument('--com-cache', action='store_true', help="Mantém o cache de respostas em memória")
+    parser.add_argument('--saida', default=f"replay_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    parser.add_argument('--comparar', help="Arquivo JSON de um replay anterior")
+    args = parser.parse_args()
+
+    registros = ler_captura(args.captura, args.rotas, args.limite)
+    if not registros:
+        parser.error(f"Nenhuma requisição reproduzível em {args.captura}")
+
+    motor = carregar_motor(args.motor, args.com_cache)
+    cliente = motor.app.test_client()
+    print(f"Reproduzindo {len(registros)} requisições de {args.captura} contra {os.path.abspath(args.motor)}...")
+
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        for _ in range(args.aquecimento):
+            for registro in registros:
+                enviar(cliente, registro)
+        latencia = passada_latencia(cliente, registros, args.repeticoes)
+        perfil = None
+        if args.perfilador != 'nenhum':
+            perfil = passada_perfilada(cliente, motor, registros, args.perfilador, args.intervalo,
+                                       args.top, args.perfil_bruto)
+
+    imprimir_latencias(latencia)
+    if perfil:
+        imprimir_pontos_quentes(perfil)
+
+    resultado = {
+        "executadoEm": datetime.datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "parametros": dict({k: v for k, v in vars(args).items() if k not in ('saida', 'comparar')},
+                           motor=os.path.abspath(args.motor), requisicoes=len(registros)),
+        "latencia": latencia,
+        "perfil": perfil,
+    }
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados gravados em {args.saida}")
+
+    if args.comparar:
+        comparar(resultado, args.comparar)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
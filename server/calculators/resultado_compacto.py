@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Representação compacta do resultado do financiamento na planta
+---------------------------------------------------------------
+Guarda o cronograma em colunas tipadas do NumPy, em vez de uma lista de
+dicionários por mês. As linhas são expostas sob demanda:
+
+- resultado[i] devolve uma visão leve (LinhaParcela) que lê das colunas;
+- resultado.parcela(i) / resultado.para_modelo() constroem os modelos pydantic;
+- resultado.para_dict() produz exatamente o formato JSON atual.
+
+Com fase bancária, amortização, juros e a taxa de juros do banco ficam em
+colunas à parte (valores_bancarios), NaN fora da fase bancária; sem ela, não
+são alocadas.
+
+Um cronograma de 420 meses ocupa cerca de 22 KB nas colunas (medido com
+nbytes), contra algumas centenas de KB como lista de dicionários, o que
+importa para jobs de lote e de carteira que mantêm milhares de cronogramas
+em memória.
+"""
+
+import datetime
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+
+from financiamento_planta_corrigido import (
+    FinanciamentoPlantaInput,
+    Parcela,
+    ResultadoFinanciamentoPlanta,
+    ResumoFinanciamento,
+)
+from cronograma_vetorizado import TIPOS_PAGAMENTO, calcular_resumo, datas_cronograma
+
+
+# Colunas de ponto flutuante, na ordem dos campos de Parcela
+COLUNAS_VALORES = ('valorBase', 'percentualCorrecao', 'valorCorrigido', 'saldoDevedor',
+                   'saldoLiquido', 'correcaoAcumulada')
+
+# Colunas preenchidas só nas linhas da fase bancária (NaN nas demais)
+COLUNAS_BANCARIAS = ('amortizacao', 'juros', 'taxaJuros')
+
+
+class LinhaParcela:
+    """Visão preguiçosa de uma linha do cronograma compacto"""
+
+    __slots__ = ('_resultado', '_indice')
+
+    def __init__(self, resultado: 'ResultadoCompacto', indice: int):
+        self._resultado = resultado
+        self._indice = indice
+
+    @property
+    def mes(self) -> int:
+        return int(self._resultado.meses[self._indice])
+
+    @property
+    def data(self) -> str:
+        return self._resultado.datas()[self.mes]
+
+    @property
+    def tipoPagamento(self) -> str:
+        return TIPOS_PAGAMENTO[self._resultado.codigos_tipo[self._indice]]
+
+    def __getattr__(self, nome: str) -> Optional[float]:
+        if nome not in COLUNAS_VALORES and nome not in COLUNAS_BANCARIAS:
+            raise AttributeError(nome)
+        if self.mes == 0 and nome in ('percentualCorrecao', 'correcaoAcumulada'):
+            return 0
+        valor = float(self._resultado.coluna(nome)[self._indice])
+        return None if valor != valor else valor  # NaN -> None
+
+    def para_dict(self) -> Dict[str, Any]:
+        return self._resultado.para_dict_linha(self._indice)
+
+    def __repr__(self) -> str:
+        return f"LinhaParcela({self.para_dict()!r})"
+
+
+class ResultadoCompacto:
+    """Cronograma em colunas tipadas, com o mesmo conteúdo de ResultadoFinanciamentoPlanta"""
+
+    __slots__ = ('meses', 'codigos_tipo', 'valores', 'valores_bancarios', 'resumo', 'data_base')
+
+    def __init__(self, meses: np.ndarray, codigos_tipo: np.ndarray, valores: np.ndarray,
+                 resumo: Dict[str, Any], data_base: Optional[datetime.date] = None,
+                 valores_bancarios: Optional[np.ndarray] = None):
+        """
+        Args:
+            meses: Mês de cada linha (inclui o mês 0)
+            codigos_tipo: Índice em TIPOS_PAGAMENTO de cada linha
+            valores: Matriz (len(COLUNAS_VALORES), n_linhas); saldoLiquido nulo é NaN
+            resumo: Resumo no formato de ResumoFinanciamento
+            data_base: Data do mês 0 (padrão: hoje)
+            valores_bancarios: Matriz (len(COLUNAS_BANCARIAS), n_linhas), NaN fora da
+                fase bancária; None quando o plano não tem fase bancária
+        """
+        self.meses = np.asarray(meses, dtype=np.int32)
+        self.codigos_tipo = np.asarray(codigos_tipo, dtype=np.int8)
+        self.valores = np.asarray(valores, dtype=np.float64)
+        self.valores_bancarios = None if valores_bancarios is None else np.asarray(valores_bancarios, dtype=np.float64)
+        self.resumo = resumo
+        self.data_base = data_base or datetime.date.today()
+
+    @classmethod
+    def de_dict(cls, resultado: Dict[str, Any], data_base: Optional[datetime.date] = None) -> 'ResultadoCompacto':
+        """Converte o resultado em formato de dicionário para a forma compacta"""
+        parcelas = resultado["parcelas"]
+        valores = np.array([
+            [np.nan if p[coluna] is None else p[coluna] for p in parcelas]
+            for coluna in COLUNAS_VALORES
+        ], dtype=np.float64).reshape(len(COLUNAS_VALORES), len(parcelas))
+        valores_bancarios = None
+        if any(p.get("amortizacao") is not None for p in parcelas):
+            valores_bancarios = np.array([
+                [np.nan if p.get(coluna) is None else p[coluna] for p in parcelas]
+                for coluna in COLUNAS_BANCARIAS
+            ], dtype=np.float64)
+        return cls(
+            meses=[p["mes"] for p in parcelas],
+            codigos_tipo=[TIPOS_PAGAMENTO.index(p["tipoPagamento"]) for p in parcelas],
+            valores=valores,
+            resumo=dict(resultado["resumo"]),
+            data_base=data_base,
+            valores_bancarios=valores_bancarios,
+        )
+
+    def __len__(self) -> int:
+        return len(self.meses)
+
+    def __getitem__(self, indice: int) -> LinhaParcela:
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError(indice)
+        return LinhaParcela(self, indice)
+
+    def __iter__(self) -> Iterator[LinhaParcela]:
+        return (LinhaParcela(self, i) for i in range(len(self)))
+
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pelas colunas"""
+        bancarios = 0 if self.valores_bancarios is None else self.valores_bancarios.nbytes
+        return self.meses.nbytes + self.codigos_tipo.nbytes + self.valores.nbytes + bancarios
+
+    def coluna(self, nome: str) -> np.ndarray:
+        """Coluna de valores (visão, sem cópia; colunas bancárias ausentes são só NaN)"""
+        if nome in COLUNAS_BANCARIAS:
+            if self.valores_bancarios is None:
+                return np.full(len(self), np.nan)
+            return self.valores_bancarios[COLUNAS_BANCARIAS.index(nome)]
+        return self.valores[COLUNAS_VALORES.index(nome)]
+
+    def datas(self):
+        """Datas formatadas dos meses 0..último mês (em cache por data base e prazo)"""
+        return datas_cronograma(self.data_base, int(self.meses.max()) if len(self) else 0)
+
+    def para_dict_linha(self, indice: int) -> Dict[str, Any]:
+        """Linha no formato de dicionário do cálculo original"""
+        mes = int(self.meses[indice])
+        linha = {
+            "mes": mes,
+            "data": self.datas()[mes],
+            "tipoPagamento": TIPOS_PAGAMENTO[self.codigos_tipo[indice]],
+        }
+        for coluna, valor in zip(COLUNAS_VALORES, self.valores[:, indice].tolist()):
+            linha[coluna] = None if valor != valor else valor  # NaN -> None
+        if mes == 0:
+            # O mês 0 não tem correção (inteiros, como no cálculo original)
+            linha["percentualCorrecao"] = 0
+            linha["correcaoAcumulada"] = 0
+        if self.valores_bancarios is not None:
+            # Só as linhas da fase bancária trazem amortização, juros e taxa de juros
+            for coluna, valor in zip(COLUNAS_BANCARIAS, self.valores_bancarios[:, indice].tolist()):
+                if valor == valor:
+                    linha[coluna] = valor
+        return linha
+
+    def parcela(self, indice: int) -> Parcela:
+        """Linha como modelo pydantic"""
+        return Parcela(**self.para_dict_linha(indice))
+
+    def para_modelo(self) -> ResultadoFinanciamentoPlanta:
+        """Resultado completo como modelo pydantic"""
+        return ResultadoFinanciamentoPlanta(
+            parcelas=[self.parcela(i) for i in range(len(self))],
+            resumo=ResumoFinanciamento(**self.resumo),
+        )
+
+    def para_dict(self) -> Dict[str, Any]:
+        """Resultado no formato JSON atual ({"parcelas": [...], "resumo": {...}})"""
+        datas = self.datas()
+        colunas = [c.tolist() for c in self.valores]
+        bancarias = [] if self.valores_bancarios is None else [c.tolist() for c in self.valores_bancarios]
+        parcelas = []
+        for i, (mes, codigo) in enumerate(zip(self.meses.tolist(), self.codigos_tipo.tolist())):
+            linha = {"mes": mes, "data": datas[mes], "tipoPagamento": TIPOS_PAGAMENTO[codigo]}
+            for nome, coluna in zip(COLUNAS_VALORES, colunas):
+                valor = coluna[i]
+                linha[nome] = None if valor != valor else valor
+            if mes == 0:
+                linha["percentualCorrecao"] = 0
+                linha["correcaoAcumulada"] = 0
+            for nome, coluna in zip(COLUNAS_BANCARIAS, bancarias):
+                valor = coluna[i]
+                if valor == valor:
+                    linha[nome] = valor
+            parcelas.append(linha)
+        return {"parcelas": parcelas, "resumo": dict(self.resumo)}
+
+
+def montar_resultado_compacto(input_data: FinanciamentoPlantaInput, entrada: float, meses: np.ndarray,
+                              codigos_tipo: np.ndarray, valores_base: np.ndarray, taxas: np.ndarray,
+                              correcao_acumulada: np.ndarray, valor_corrigido: np.ndarray,
+                              saldo_devedor: np.ndarray, saldo_liquido: np.ndarray,
+                              data_base: Optional[datetime.date] = None) -> ResultadoCompacto:
+    """
+    Monta o resultado compacto a partir das colunas dos meses com pagamento
+    (sem o mês 0), acrescentando a linha de entrada e o resumo.
+    """
+    linha_entrada = [entrada, 0.0, entrada, input_data.valorImovel - entrada, np.nan, 0.0]
+    valores = np.column_stack([
+        linha_entrada,
+        np.stack([valores_base, taxas, valor_corrigido, saldo_devedor, saldo_liquido, correcao_acumulada]),
+    ])
+    return ResultadoCompacto(
+        meses=np.concatenate([[0], meses]),
+        codigos_tipo=np.concatenate([[TIPOS_PAGAMENTO.index('Entrada')], codigos_tipo]),
+        valores=valores,
+        resumo=calcular_resumo(input_data, entrada, valores_base, valor_corrigido, len(meses) + 1),
+        data_base=data_base,
+    )
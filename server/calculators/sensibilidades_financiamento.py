@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Sensibilidades analíticas do financiamento na planta
+-----------------------------------------------------
+Calcula as derivadas de primeira ordem de valorTotal, totalCorrecao e do
+saldoDevedor final em relação a:
+
+- correcaoMensalAteChaves (por ponto percentual ao mês)
+- correcaoMensalAposChaves (por ponto percentual ao mês)
+- valorEntrada (por real de entrada)
+
+As derivadas são propagadas em modo direto (forward mode) sobre as mesmas
+colunas de evoluir_saldos: cada soma acumulada (correcaoAcumulada) e cada
+produto acumulado (fator de correção G) carrega o seu vetor tangente, e o
+saldo final sai da solução fechada S(n) = G(n) * (S(0) - soma vc(j) / G(j)).
+Com d ln G(m) = soma_{j<=m} d taxa(j) / (100 + taxa(j)):
+
+    dS(n) = S(n) * d ln G(n) + G(n) * (dS(0) - soma (dvc(j) - vc(j) * d ln G(j)) / G(j))
+
+Tudo em operações do NumPy sobre a matriz (parâmetros x meses), sem laço
+mensal em Python e sem recalcular o cronograma com entradas perturbadas.
+
+Com financiamentoBancario, as colunas param no mês das chaves e o saldo
+devedor desse mês é o principal financiado. As duas tabelas (SAC e Price)
+são lineares no principal, então o total das prestações é principal vezes o
+total pago por real financiado; as prestações não têm correção e o saldo
+final da tabela é zero.
+"""
+
+from typing import Any, Dict, Tuple, Union
+
+import numpy as np
+
+from financiamento_planta_corrigido import FinanciamentoPlantaInput
+from cronograma_vetorizado import SEM_PAGAMENTO, colunas_personalizadas, taxas_mensais, valor_entrada_efetivo
+from financiamento_bancario import total_pago_por_real
+from regras_pagamento import padrao_do_plano, parcela_regular, valores_regras
+
+
+# Ordem das componentes dos vetores tangentes
+PARAMETROS = ('correcaoMensalAteChaves', 'correcaoMensalAposChaves', 'valorEntrada')
+
+
+def _colunas_automaticas(input_data: FinanciamentoPlantaInput, entrada: float,
+                         d_entrada: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Valores base, d(valor base)/d(valorEntrada), taxas e meses com correção do parcelamento automático"""
+    padrao = padrao_do_plano(input_data)
+    valores = valores_regras(input_data)
+    prazo = input_data.prazoPagamento
+
+    regulares = np.array(padrao.regulares, dtype=bool)
+    parcela = parcela_regular(padrao, valores, input_data.valorImovel - entrada)
+    d_parcela = -d_entrada / padrao.n_regulares if padrao.n_regulares else 0.0
+
+    valores_base = np.where(regulares, parcela, 0.0)
+    if padrao.indicadores:
+        valores_base += np.asarray(valores, dtype=float) @ np.asarray(padrao.indicadores, dtype=float)
+    taxas = taxas_mensais(input_data.prazoEntrega, prazo,
+                          input_data.correcaoMensalAteChaves, input_data.correcaoMensalAposChaves)
+    return valores_base, np.where(regulares, d_parcela, 0.0), taxas, np.ones(prazo, dtype=bool)
+
+
+def _colunas_personalizadas(input_data: FinanciamentoPlantaInput) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Mesmas colunas no parcelamento personalizado (meses sem parcela não têm correção)"""
+    valores_base, taxas, codigos_tipo = colunas_personalizadas(input_data)
+    return valores_base, np.zeros_like(valores_base), taxas, codigos_tipo != SEM_PAGAMENTO
+
+
+def calcular_sensibilidades(input_data: Union[Dict[str, Any], FinanciamentoPlantaInput]) -> Dict[str, Dict[str, float]]:
+    """
+    Derivadas de primeira ordem dos principais totais do financiamento.
+
+    Args:
+        input_data: Dados de entrada para o cálculo do financiamento
+
+    Returns:
+        Dicionário {grandeza: {parametro: derivada}}
+    """
+    if isinstance(input_data, dict):
+        input_data = FinanciamentoPlantaInput(**input_data)
+
+    entrada = valor_entrada_efetivo(input_data)
+    # Com percentualEntrada a entrada não depende de valorEntrada
+    d_entrada = 0.0 if input_data.percentualEntrada else 1.0
+
+    if input_data.tipoParcelamento == 'automatico':
+        valores_base, d_valores_base_entrada, taxas, com_correcao = _colunas_automaticas(input_data, entrada, d_entrada)
+    else:
+        valores_base, d_valores_base_entrada, taxas, com_correcao = _colunas_personalizadas(input_data)
+
+    bancario = input_data.financiamentoBancario
+    if bancario:
+        # Parcelas após as chaves dão lugar à fase bancária
+        n = min(input_data.prazoEntrega, input_data.prazoPagamento)
+        valores_base, d_valores_base_entrada = valores_base[:n], d_valores_base_entrada[:n]
+        taxas, com_correcao = taxas[:n], com_correcao[:n]
+    meses = np.arange(1, len(taxas) + 1)
+
+    # Tangentes (parâmetros x meses) das taxas e dos valores base
+    ate_chaves = meses <= input_data.prazoEntrega
+    d_taxas = np.stack([com_correcao & ate_chaves, com_correcao & ~ate_chaves, np.zeros_like(ate_chaves)]).astype(float)
+    d_valores_base = np.zeros_like(d_taxas)
+    d_valores_base[2] = d_valores_base_entrada
+
+    # valor_corrigido = valor_base * (1 + correcao_acumulada / 100)
+    fator_correcao = 1 + np.cumsum(taxas) / 100
+    valor_corrigido = valores_base * fator_correcao
+    d_valor_corrigido = d_valores_base * fator_correcao + valores_base * np.cumsum(d_taxas, axis=1) / 100
+
+    # Saldo pela solução fechada, com G(m) e d ln G(m)
+    saldo_inicial = input_data.valorImovel - entrada
+    d_saldo_inicial = np.array([0.0, 0.0, -d_entrada])
+    fator = np.cumprod(1 + taxas / 100)
+    d_log_fator = np.cumsum(d_taxas / (100 + taxas), axis=1)
+    if len(fator):
+        saldo = fator[-1] * (saldo_inicial - np.sum(valor_corrigido / fator))
+        d_saldo = saldo * d_log_fator[:, -1] + fator[-1] * (
+            d_saldo_inicial - np.sum((d_valor_corrigido - valor_corrigido * d_log_fator) / fator, axis=1))
+    else:
+        saldo, d_saldo = saldo_inicial, d_saldo_inicial
+
+    d_valor_total = d_valor_corrigido.sum(axis=1) + np.array([0.0, 0.0, d_entrada])
+    # Somente parcelas com correção positiva entram no total de correção
+    positiva = valor_corrigido > valores_base
+    d_total_correcao = (d_valor_corrigido - d_valores_base)[:, positiva].sum(axis=1)
+
+    # Fase bancária: principal = saldo no mês das chaves (sem prestações se não houver saldo)
+    if bancario and saldo > 0:
+        d_valor_total = d_valor_total + total_pago_por_real(bancario) * d_saldo
+        d_saldo = np.zeros(len(PARAMETROS))
+
+    return {
+        "valorTotal": dict(zip(PARAMETROS, d_valor_total.tolist())),
+        "totalCorrecao": dict(zip(PARAMETROS, d_total_correcao.tolist())),
+        "saldoDevedorFinal": dict(zip(PARAMETROS, d_saldo.tolist())),
+    }
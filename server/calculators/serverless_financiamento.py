@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Ponto de entrada serverless para o cálculo de financiamento na planta
+---------------------------------------------------------------------
+Handler no formato de função Python da Vercel (classe `handler` derivada de
+BaseHTTPRequestHandler), sem depender do processo Flask iniciado pelo Node.
+
+Para manter o cold start baixo, o módulo importa apenas a biblioteca padrão.
+O motor de cálculo (pydantic e, se disponível, o cache vetorizado com NumPy)
+é carregado na primeira requisição e reutilizado nas seguintes, de modo que
+os modelos pydantic são preparados uma única vez por instância.
+
+As dependências da função (pydantic v2 e NumPy) estão em requirements.txt,
+neste mesmo diretório, que o runtime @vercel/python instala no build. O
+orçamento de importação e a instalação em ambiente limpo são verificados por
+teste_cold_start.py.
+"""
+
+import json
+import os
+import sys
+from http.server import BaseHTTPRequestHandler
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Os módulos do motor ficam no mesmo diretório deste arquivo
+_DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+if _DIRETORIO not in sys.path:
+    sys.path.insert(0, _DIRETORIO)
+
+_motor: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+
+CABECALHOS_CORS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+    'Access-Control-Allow-Methods': 'POST,OPTIONS',
+}
+
+
+def carregar_motor() -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Importa o motor de cálculo na primeira chamada e o reutiliza depois"""
+    global _motor
+    if _motor is None:
+        try:
+            # Acelerador opcional: cache de bases normalizadas (requer NumPy)
+            from cache_base_normalizada import calcular_financiamento_planta_rapido as motor
+        except ImportError:
+            from financiamento_planta_corrigido import calcular_financiamento_planta as motor
+        _motor = motor
+    return _motor
+
+
+def processar_requisicao(corpo: bytes) -> Tuple[int, Dict[str, str], bytes]:
+    """
+    Processa o corpo JSON de uma requisição de cálculo.
+
+    Returns:
+        Tupla (status HTTP, cabeçalhos, corpo da resposta)
+    """
+    cabecalhos = {'Content-Type': 'application/json', **CABECALHOS_CORS}
+    try:
+        dados = json.loads(corpo or b'null')
+    except ValueError:
+        return 400, cabecalhos, json.dumps({"error": "JSON inválido"}).encode('utf-8')
+
+    if not dados:
+        return 400, cabecalhos, json.dumps({"error": "Dados de entrada não fornecidos"}).encode('utf-8')
+
+    try:
+        resultado = carregar_motor()(dados)
+    except Exception as e:
+        return 500, cabecalhos, json.dumps({"error": f"Erro no cálculo: {str(e)}"}).encode('utf-8')
+
+    return 200, cabecalhos, json.dumps(resultado).encode('utf-8')
+
+
+class handler(BaseHTTPRequestHandler):
+    """Handler HTTP no formato esperado pelo runtime Python da Vercel"""
+
+    def _responder(self, status: int, cabecalhos: Dict[str, str], corpo: bytes = b'') -> None:
+        self.send_response(status)
+        for nome, valor in cabecalhos.items():
+            self.send_header(nome, valor)
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        if corpo:
+            self.wfile.write(corpo)
+
+    def do_OPTIONS(self):
+        self._responder(204, CABECALHOS_CORS)
+
+    def do_POST(self):
+        tamanho = int(self.headers.get('Content-Length') or 0)
+        self._responder(*processar_requisicao(self.rfile.read(tamanho)))
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tarefas assíncronas de cálculo (varreduras de planos e carteiras)
+-----------------------------------------------------------------
+Varreduras com milhares de planos e carteiras grandes levam minutos e não
+cabem em uma requisição HTTP. Uma tarefa é submetida, executada por um pool
+local de threads e acompanhada por consulta de estado; o resultado fica em
+disco e é transmitido quando pedido.
+
+Cada tarefa tem um diretório próprio em TAREFAS_DIRETORIO:
+
+- estado.json     estado e progresso (gravado de forma atômica a cada lote)
+- cancelar        marcador de cancelamento, verificado entre os lotes
+- resultado.npz   colunas do resultado, escritas lote a lote
+
+Como estado e cancelamento vivem no disco, qualquer worker do serviço
+responde por qualquer tarefa, não só o que a executa.
+
+As tarefas não passam pelo controle de admissão das requisições síncronas,
+então cada processo limita as suas: com TAREFAS_MAX_PENDENTES tarefas na
+fila ou em execução, a submissão é recusada com FilaSaturada (HTTP 429 com
+Retry-After, estimado pela duração média das tarefas).
+
+O resultado é um arquivo .npz (zip de arrays .npy, lido com numpy.load). Na
+varredura, cada lote grava os membros "loteNNNNN/<coluna>":
+
+- meses (int32), codigos_tipo (int8) e valores (float64, COLUNAS_VALORES x linhas)
+  com as linhas de todos os planos do lote em sequência;
+- valores_bancarios (float64, COLUNAS_BANCARIAS x linhas): amortização, juros
+  e taxa de juros, NaN fora da fase bancária;
+- inicio_plano (int64): posição da primeira linha de cada plano (mais o total);
+- resumo (float64, planos x COLUNAS_RESUMO).
+
+Na carteira, o arquivo traz meses, recebimentos (tipos x meses), saldoDevedor
+e os nomes das colunas.
+"""
+
+import datetime
+import json
+import math
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Literal, Optional
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from controle_admissao import FilaSaturada
+from financiamento_planta_corrigido import FinanciamentoPlantaInput
+from cache_base_normalizada import calcular_financiamento_planta_compacto, calcular_financiamento_planta_rapido
+from carteira_financiamento import TIPOS_CARTEIRA, CarteiraInput, agregar_carteira, prazo_carteira
+from resultado_compacto import COLUNAS_BANCARIAS, COLUNAS_VALORES, ResultadoCompacto
+
+
+# Campos numéricos do resumo gravados por plano na varredura
+COLUNAS_RESUMO = ('valorEntrada', 'valorFinanciado', 'totalParcelas', 'totalCorrecao',
+                  'percentualCorrecao', 'valorTotal')
+
+ESTADOS_FINAIS = ('concluida', 'cancelada', 'falhou')
+
+_ID_TAREFA = re.compile(r'^[0-9a-f]{32}$')
+
+
+class TarefaInput(BaseModel):
+    """Modelo de entrada para a submissão de uma tarefa"""
+    tipo: Literal['varredura', 'carteira']
+    planos: Optional[List[FinanciamentoPlantaInput]] = None
+    carteira: Optional[CarteiraInput] = None
+    tamanhoLote: int = Field(256, gt=0)
+
+    def validar_tipo(self):
+        """Valida que os dados do tipo de tarefa estão presentes"""
+        if self.tipo == 'varredura' and not self.planos:
+            raise ValueError("Para tarefas de varredura, é obrigatório fornecer planos")
+        if self.tipo == 'carteira' and self.carteira is None:
+            raise ValueError("Para tarefas de carteira, é obrigatório fornecer carteira")
+
+
+class TarefaCancelada(Exception):
+    """A tarefa foi cancelada entre dois lotes"""
+
+
+class TarefaNaoEncontrada(Exception):
+    """Não há tarefa com o identificador informado"""
+
+
+def _gravar_array(arquivo: zipfile.ZipFile, nome: str, array: np.ndarray) -> None:
+    """Acrescenta um membro .npy ao .npz (formato de numpy.savez)"""
+    with arquivo.open(nome + '.npy', 'w', force_zip64=True) as destino:
+        np.lib.format.write_array(destino, np.asanyarray(array), allow_pickle=False)
+
+
+def _calcular_plano(plano: FinanciamentoPlantaInput) -> ResultadoCompacto:
+    """Cronograma compacto de um plano da varredura"""
+    if plano.financiamentoBancario or plano.mesInicio is not None or plano.mesFim is not None:
+        return ResultadoCompacto.de_dict(calcular_financiamento_planta_rapido(plano))
+    return calcular_financiamento_planta_compacto(plano)
+
+
+class GerenciadorTarefas:
+    """Submissão, execução, acompanhamento e cancelamento das tarefas"""
+
+    def __init__(self, diretorio: str, workers: int = 2, retencao_s: float = 24 * 3600, max_pendentes: int = 8):
+        self.diretorio = diretorio
+        self.retencao_s = retencao_s
+        self.workers = workers
+        self.max_pendentes = max_pendentes
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tarefa')
+        # Reentrante: _avancar lê e grava o estado dentro da mesma seção crítica
+        self._lock = threading.RLock()
+        # Tarefas deste processo na fila ou em execução
+        self._pendentes = 0
+        # Média móvel (EWMA) da duração das tarefas, para o Retry-After
+        self._segundos_por_tarefa = 30.0
+
+    # -- arquivos ----------------------------------------------------------
+
+    def _caminho(self, id_tarefa: str, nome: str = '') -> str:
+        if not _ID_TAREFA.match(id_tarefa or ''):
+            raise TarefaNaoEncontrada(id_tarefa)
+        return os.path.join(self.diretorio, id_tarefa, nome)
+
+    def _gravar_estado(self, id_tarefa: str, **campos) -> Dict[str, Any]:
+        """Atualiza estado.json de forma atômica (escreve em temporário e renomeia)"""
+        with self._lock:
+            estado = self._ler_estado(id_tarefa)
+            estado.update(campos, atualizadaEm=datetime.datetime.now().isoformat(timespec='seconds'))
+            caminho = self._caminho(id_tarefa, 'estado.json')
+            with open(caminho + '.tmp', 'w', encoding='utf-8') as arquivo:
+                json.dump(estado, arquivo, ensure_ascii=False)
+            os.replace(caminho + '.tmp', caminho)
+        return estado
+
+    def _ler_estado(self, id_tarefa: str) -> Dict[str, Any]:
+        try:
+            with open(self._caminho(id_tarefa, 'estado.json'), encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except FileNotFoundError:
+            return {}
+
+    def _verificar_cancelamento(self, id_tarefa: str) -> None:
+        if os.path.exists(self._caminho(id_tarefa, 'cancelar')):
+            raise TarefaCancelada(id_tarefa)
+
+    # -- API ---------------------------------------------------------------
+
+    def _retry_after(self) -> int:
+        excesso = self._pendentes - self.max_pendentes + 1
+        return max(1, math.ceil(excesso * self._segundos_por_tarefa / self.workers))
+
+    def submeter(self, dados: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Valida a tarefa, grava o estado inicial e a coloca na fila do pool.
+
+        Raises:
+            FilaSaturada: já há max_pendentes tarefas na fila ou em execução
+        """
+        tarefa = TarefaInput(**dados)
+        tarefa.validar_tipo()
+
+        with self._lock:
+            if self._pendentes >= self.max_pendentes:
+                raise FilaSaturada(self._retry_after())
+            self._pendentes += 1
+        try:
+            return self._enfileirar(tarefa)
+        except BaseException:
+            with self._lock:
+                self._pendentes -= 1
+            raise
+
+    def _enfileirar(self, tarefa: TarefaInput) -> Dict[str, Any]:
+        self.limpar_antigas()
+
+        id_tarefa = uuid.uuid4().hex
+        os.makedirs(self._caminho(id_tarefa), exist_ok=True)
+
+        if tarefa.tipo == 'varredura':
+            total_planos = len(tarefa.planos)
+        else:
+            total_planos = len(tarefa.carteira.unidades)
+        total_lotes = -(-total_planos // tarefa.tamanhoLote)
+
+        estado = self._gravar_estado(
+            id_tarefa,
+            id=id_tarefa,
+            tipo=tarefa.tipo,
+            estado='pendente',
+            progresso={"lotesConcluidos": 0, "totalLotes": total_lotes,
+                       "planosConcluidos": 0, "totalPlanos": total_planos},
+            erro=None,
+            criadaEm=datetime.datetime.now().isoformat(timespec='seconds'),
+            pid=os.getpid(),
+        )
+        self._executor.submit(self._executar, id_tarefa, tarefa)
+        return estado
+
+    def consultar(self, id_tarefa: str) -> Dict[str, Any]:
+        """Estado e progresso da tarefa"""
+        estado = self._ler_estado(id_tarefa)
+        if not estado:
+            raise TarefaNaoEncontrada(id_tarefa)
+        if estado["estado"] not in ESTADOS_FINAIS and not _processo_ativo(estado["pid"]):
+            # O worker que executava a tarefa terminou (reinício ou deploy) antes de concluí-la
+            estado = self._gravar_estado(id_tarefa, estado='falhou', erro="Tarefa interrompida pelo reinício do serviço")
+        return estado
+
+    def cancelar(self, id_tarefa: str) -> Dict[str, Any]:
+        """Pede o cancelamento; a tarefa para antes do próximo lote"""
+        estado = self.consultar(id_tarefa)
+        if estado["estado"] not in ESTADOS_FINAIS:
+            open(self._caminho(id_tarefa, 'cancelar'), 'w').close()
+            if estado["estado"] == 'pendente':
+                estado = self._gravar_estado(id_tarefa, estado='cancelada')
+        return estado
+
+    def caminho_resultado(self, id_tarefa: str) -> Optional[str]:
+        """Arquivo de resultado da tarefa concluída, ou None se ainda não houver"""
+        if self.consultar(id_tarefa)["estado"] != 'concluida':
+            return None
+        return self._caminho(id_tarefa, 'resultado.npz')
+
+    def limpar_antigas(self) -> None:
+        """Remove os diretórios das tarefas finalizadas há mais que o tempo de retenção"""
+        if not os.path.isdir(self.diretorio):
+            return
+        limite = time.time() - self.retencao_s
+        for id_tarefa in os.listdir(self.diretorio):
+            if not _ID_TAREFA.match(id_tarefa):
+                continue
+            caminho = self._caminho(id_tarefa, 'estado.json')
+            try:
+                if os.path.getmtime(caminho) < limite and self._ler_estado(id_tarefa).get("estado") in ESTADOS_FINAIS:
+                    shutil.rmtree(self._caminho(id_tarefa), ignore_errors=True)
+            except OSError:
+                continue
+
+    # -- execução ----------------------------------------------------------
+
+    def _executar(self, id_tarefa: str, tarefa: TarefaInput) -> None:
+        inicio = time.monotonic()
+        try:
+            self._verificar_cancelamento(id_tarefa)
+            self._gravar_estado(id_tarefa, estado='executando')
+            caminho = self._caminho(id_tarefa, 'resultado.npz')
+            if tarefa.tipo == 'varredura':
+                self._executar_varredura(id_tarefa, tarefa, caminho + '.parcial')
+            else:
+                self._executar_carteira(id_tarefa, tarefa, caminho + '.parcial')
+            os.replace(caminho + '.parcial', caminho)
+            self._gravar_estado(id_tarefa, estado='concluida')
+        except TarefaCancelada:
+            self._gravar_estado(id_tarefa, estado='cancelada')
+        except Exception as e:
+            self._gravar_estado(id_tarefa, estado='falhou', erro=str(e))
+        finally:
+            decorrido = time.monotonic() - inicio
+            with self._lock:
+                self._pendentes -= 1
+                self._segundos_por_tarefa = 0.9 * self._segundos_por_tarefa + 0.1 * decorrido
+
+    def _avancar(self, id_tarefa: str, lote: int, planos: int) -> None:
+        # Leitura e gravação na mesma seção crítica: uma atualização concorrente
+        # do estado (cancelamento, consulta) não se perde nem desfaz o progresso
+        with self._lock:
+            estado = self._ler_estado(id_tarefa)
+            progresso = dict(estado["progresso"], lotesConcluidos=lote + 1,
+                             planosConcluidos=estado["progresso"]["planosConcluidos"] + planos)
+            self._gravar_estado(id_tarefa, progresso=progresso)
+
+    def _executar_varredura(self, id_tarefa: str, tarefa: TarefaInput, caminho: str) -> None:
+        """Calcula os planos em lotes; cada lote vira um grupo de membros no .npz"""
+        planos = tarefa.planos
+        with zipfile.ZipFile(caminho, 'w', compression=zipfile.ZIP_DEFLATED) as arquivo:
+            _gravar_array(arquivo, 'colunas_valores', np.array(COLUNAS_VALORES))
+            _gravar_array(arquivo, 'colunas_bancarias', np.array(COLUNAS_BANCARIAS))
+            _gravar_array(arquivo, 'colunas_resumo', np.array(COLUNAS_RESUMO))
+
+            for lote, inicio in enumerate(range(0, len(planos), tarefa.tamanhoLote)):
+                self._verificar_cancelamento(id_tarefa)
+                resultados = [_calcular_plano(plano) for plano in planos[inicio:inicio + tarefa.tamanhoLote]]
+
+                prefixo = f'lote{lote:05d}/'
+                _gravar_array(arquivo, prefixo + 'meses', np.concatenate([r.meses for r in resultados]))
+                _gravar_array(arquivo, prefixo + 'codigos_tipo', np.concatenate([r.codigos_tipo for r in resultados]))
+                _gravar_array(arquivo, prefixo + 'valores', np.concatenate([r.valores for r in resultados], axis=1))
+                _gravar_array(arquivo, prefixo + 'valores_bancarios', np.stack(
+                    [np.concatenate([r.coluna(coluna) for r in resultados]) for coluna in COLUNAS_BANCARIAS]))
+                _gravar_array(arquivo, prefixo + 'inicio_plano', np.cumsum([0] + [len(r) for r in resultados]))
+                _gravar_array(arquivo, prefixo + 'resumo', np.array(
+                    [[r.resumo[coluna] for coluna in COLUNAS_RESUMO] for r in resultados], dtype=float))
+
+                self._avancar(id_tarefa, lote, len(resultados))
+
+    def _executar_carteira(self, id_tarefa: str, tarefa: TarefaInput, caminho: str) -> None:
+        """
+        Agrega a carteira em lotes de unidades e soma as linhas do tempo
+        parciais (a agregação é linear; após o fim de um lote, permanece em
+        aberto só o saldo residual dele, sem as unidades quitadas pelo banco).
+        """
+        carteira = tarefa.carteira
+        unidades = carteira.unidades
+        horizonte = max(u.mesInicio + prazo_carteira(u.plano) for u in unidades)
+        recebimentos = np.zeros((len(TIPOS_CARTEIRA), horizonte + 1))
+        saldo_devedor = np.zeros(horizonte + 1)
+
+        for lote, inicio in enumerate(range(0, len(unidades), tarefa.tamanhoLote)):
+            self._verificar_cancelamento(id_tarefa)
+            unidades_lote = unidades[inicio:inicio + tarefa.tamanhoLote]
+            parcial = agregar_carteira(CarteiraInput(unidades=unidades_lote, tamanhoLote=carteira.tamanhoLote))
+            meses = len(parcial["meses"])
+            for codigo, tipo in enumerate(TIPOS_CARTEIRA):
+                recebimentos[codigo, :meses] += parcial["recebimentos"][tipo]
+            saldo_devedor[:meses] += parcial["saldoDevedor"]
+            saldo_devedor[meses:] += parcial["saldoResidual"]
+            self._avancar(id_tarefa, lote, len(unidades_lote))
+
+        with zipfile.ZipFile(caminho, 'w', compression=zipfile.ZIP_DEFLATED) as arquivo:
+            _gravar_array(arquivo, 'tipos', np.array(TIPOS_CARTEIRA))
+            _gravar_array(arquivo, 'meses', np.arange(horizonte + 1, dtype=np.int32))
+            _gravar_array(arquivo, 'recebimentos', recebimentos)
+            _gravar_array(arquivo, 'saldoDevedor', saldo_devedor)
+
+
+def _processo_ativo(pid: int) -> bool:
+    """Verifica se o processo que executa a tarefa ainda existe nesta máquina"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+gerenciador_tarefas = GerenciadorTarefas(
+    os.environ.get('TAREFAS_DIRETORIO', os.path.join(tempfile.gettempdir(), 'financiamento-tarefas')),
+    workers=int(os.environ.get('TAREFAS_WORKERS', 2)),
+    retencao_s=float(os.environ.get('TAREFAS_RETENCAO_S', 24 * 3600)),
+    max_pendentes=int(os.environ.get('TAREFAS_MAX_PENDENTES', 8)),
+)
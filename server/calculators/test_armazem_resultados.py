@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes do armazém persistente de resultados
+-------------------------------------------
+Ida e volta pelo SQLite entre instâncias (como entre workers), limite de
+tamanho e validade, ativação só por ARMAZEM_RESULTADOS_CAMINHO e o blob
+gzip servido como está pela rota de cálculo.
+"""
+
+import gzip
+import json
+import os
+import subprocess
+import sys
+import time
+
+import armazem_resultados
+import cache_respostas
+import financiamento_api
+from armazem_resultados import ArmazemResultados
+from cache_respostas import CacheRespostas
+
+
+PLANO = {
+    "valorImovel": 420000, "valorEntrada": 42000, "prazoEntrega": 30, "prazoPagamento": 96,
+    "correcaoMensalAteChaves": 0.5, "correcaoMensalAposChaves": 0.8,
+}
+
+
+def test_desativado_sem_caminho():
+    ambiente = {k: v for k, v in os.environ.items() if k != 'ARMAZEM_RESULTADOS_CAMINHO'}
+    codigo = "import armazem_resultados as a; print(a.armazem_resultados.ativo)"
+    saida = subprocess.run([sys.executable, '-c', codigo], capture_output=True, text=True, check=True,
+                           cwd=os.path.dirname(os.path.abspath(armazem_resultados.__file__)), env=ambiente)
+    assert saida.stdout.strip() == 'False'
+
+    inativo = ArmazemResultados('')
+    inativo.guardar('a' * 64, b'corpo')
+    assert inativo.obter('a' * 64) is None
+    assert inativo.estatisticas() == {"acertos": 0, "falhas": 0, "entradas": 0, "bytes": 0}
+
+
+def test_ida_e_volta_entre_instancias(tmp_path):
+    caminho = str(tmp_path / 'resultados.sqlite')
+    corpo_gzip = gzip.compress(b'{"parcelas": []}', mtime=0)
+    ArmazemResultados(caminho).guardar('h1', corpo_gzip)
+
+    outro_worker = ArmazemResultados(caminho)
+    assert outro_worker.obter('h1') == corpo_gzip
+    assert outro_worker.obter('h2') is None
+    assert outro_worker.estatisticas() == {"acertos": 1, "falhas": 1, "entradas": 1, "bytes": len(corpo_gzip)}
+
+
+def test_limite_remove_os_acessos_mais_antigos(tmp_path):
+    armazem = ArmazemResultados(str(tmp_path / 'resultados.sqlite'), max_bytes=1000)
+    for indice in range(4):
+        armazem.guardar(f'h{indice}', bytes(300))
+        time.sleep(0.01)
+    # 1200 bytes > 1000: sai o mais antigo (com a folga, o suficiente para caber 900)
+    assert armazem.obter('h0') is None
+    assert [armazem.obter(f'h{indice}') is not None for indice in range(1, 4)] == [True, True, True]
+    # Corpo maior que o limite não é guardado
+    armazem.guardar('grande', bytes(2000))
+    assert armazem.obter('grande') is None
+
+
+def test_entradas_de_outro_dia_expiram(tmp_path, monkeypatch):
+    armazem = ArmazemResultados(str(tmp_path / 'resultados.sqlite'))
+    armazem.guardar('ontem', b'x')
+    agora = time.time()
+    monkeypatch.setattr(armazem_resultados.time, 'time', lambda: agora + armazem_resultados.VALIDADE_S + 1)
+    armazem.guardar('hoje', b'y')
+    assert armazem.obter('ontem') is None
+    assert armazem.obter('hoje') == b'y'
+
+
+def test_rota_serve_o_blob_gzip_do_armazem(tmp_path, monkeypatch):
+    armazem = ArmazemResultados(str(tmp_path / 'resultados.sqlite'))
+    monkeypatch.setattr(financiamento_api, 'armazem_resultados', armazem)
+    monkeypatch.setattr(financiamento_api, 'cache_respostas', CacheRespostas())
+    cliente = financiamento_api.app.test_client()
+
+    primeira = cliente.post('/api/calcular-financiamento', json=PLANO)
+    assert primeira.status_code == 200
+    assert armazem.estatisticas()["entradas"] == 1
+
+    # Outro worker (cache em memória vazio): cliente gzip recebe o blob guardado, sem descomprimir
+    monkeypatch.setattr(financiamento_api, 'cache_respostas', CacheRespostas())
+    def proibido(*args, **kwargs):
+        raise AssertionError("o blob do armazém não deveria ser descomprimido")
+    with monkeypatch.context() as contexto:
+        contexto.setattr(gzip, 'decompress', proibido)
+        resposta = cliente.post('/api/calcular-financiamento', json=PLANO, headers={'Accept-Encoding': 'gzip'})
+    assert resposta.status_code == 200
+    assert resposta.headers['Content-Encoding'] == 'gzip'
+    hash_entrada = resposta.headers['ETag'].strip('"').rsplit('-', 1)[0]
+    assert resposta.data == armazem.obter(hash_entrada)
+
+    # Sem gzip, o mesmo blob é descomprimido uma vez e o JSON é o da primeira resposta
+    monkeypatch.setattr(financiamento_api, 'cache_respostas', CacheRespostas())
+    identidade = cliente.post('/api/calcular-financiamento', json=PLANO)
+    assert 'Content-Encoding' not in identidade.headers
+    assert json.loads(identidade.data) == json.loads(primeira.data)
+    assert armazem.estatisticas()["acertos"] >= 2
+
+
+def test_cache_em_memoria_converte_so_a_partir_do_gzip():
+    cache = CacheRespostas()
+    corpo = b'{"a": 1}'
+    assert cache.guardar('h', 'gzip', None, cache_respostas.comprimir(corpo, 'gzip')) == cache_respostas.comprimir(corpo, 'gzip')
+    assert 'identity' not in cache._corpos['h']
+    assert cache.obter('h', 'identity') == corpo
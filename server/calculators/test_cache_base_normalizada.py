@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes do cache de bases normalizadas
+-------------------------------------
+A soma ponderada das bases em cache deve reproduzir o laço mês a mês de
+calcular_financiamento_planta, inclusive quando a base vem de um plano com
+outros valores monetários.
+"""
+
+import pytest
+
+from financiamento_planta_corrigido import FinanciamentoPlantaInput, calcular_financiamento_planta
+from cache_base_normalizada import CacheBaseNormalizada, cache_bases, calcular_automatico_por_base, chave_base
+
+
+PLANO_BASE = {
+    "valorImovel": 500000,
+    "valorEntrada": 50000,
+    "prazoEntrega": 36,
+    "prazoPagamento": 120,
+    "correcaoMensalAteChaves": 0.5,
+    "correcaoMensalAposChaves": 0.8,
+}
+
+PLANOS = {
+    "simples": {},
+    "reforco_e_chaves": {"incluirReforco": True, "periodicidadeReforco": "semestral",
+                         "valorReforco": 10000, "valorChaves": 30000},
+    "percentual_e_desconto": {"percentualEntrada": 12.5, "desconto": 8000},
+    "entrega_no_fim": {"prazoPagamento": 36, "incluirReforco": True, "periodicidadeReforco": "anual",
+                       "valorReforco": 20000},
+    "regras": {"regrasPagamento": [
+        {"tipo": "Reforço", "valor": 12000, "mesInicial": 6, "periodicidade": 6},
+        {"tipo": "Chaves", "valor": 40000, "mesInicial": 0, "referencia": "chaves"},
+        {"tipo": "Carência", "mesInicial": 1, "mesFinal": 3},
+    ]},
+    "taxa_zero": {"correcaoMensalAteChaves": 0, "correcaoMensalAposChaves": 0},
+}
+
+
+def montar_plano(*alteracoes) -> FinanciamentoPlantaInput:
+    """PLANO_BASE com as alterações aplicadas em ordem"""
+    dados = dict(PLANO_BASE)
+    for alteracao in alteracoes:
+        dados.update(alteracao)
+    return FinanciamentoPlantaInput(**dados)
+
+
+def comparar_resultados(obtido, esperado, rel=1e-9, abs=1e-6):
+    """Mesmas linhas (exceto a data, que depende do dia) e o mesmo resumo"""
+    assert len(obtido["parcelas"]) == len(esperado["parcelas"])
+    for linha, referencia in zip(obtido["parcelas"], esperado["parcelas"]):
+        assert linha["mes"] == referencia["mes"]
+        assert linha["tipoPagamento"] == referencia["tipoPagamento"]
+        for campo, valor in referencia.items():
+            if campo in ("mes", "data", "tipoPagamento"):
+                continue
+            if valor is None:
+                assert linha[campo] is None, (linha["mes"], campo)
+            else:
+                assert linha[campo] == pytest.approx(valor, rel=rel, abs=abs), (linha["mes"], campo)
+    for campo, valor in esperado["resumo"].items():
+        assert obtido["resumo"][campo] == pytest.approx(valor, rel=rel, abs=abs), campo
+
+
+@pytest.mark.parametrize("nome", sorted(PLANOS))
+def test_base_em_cache_igual_ao_laco(nome):
+    plano = montar_plano(PLANOS[nome])
+    comparar_resultados(calcular_automatico_por_base(plano).para_dict(), calcular_financiamento_planta(plano))
+
+
+@pytest.mark.parametrize("nome", sorted(PLANOS))
+def test_base_reaproveitada_com_outros_valores(nome):
+    """Uma base construída por um plano responde outro com os mesmos prazos e taxas"""
+    calcular_automatico_por_base(montar_plano(PLANOS[nome]))
+    alteracoes = {"valorImovel": 873210.55, "valorEntrada": 91234.5, "desconto": 1500}
+    if PLANOS[nome].get("valorReforco"):
+        alteracoes["valorReforco"] = 7777.0
+    if "regrasPagamento" in PLANOS[nome]:
+        alteracoes["regrasPagamento"] = [dict(regra, valor=regra.get("valor", 0) * 1.7)
+                                         for regra in PLANOS[nome]["regrasPagamento"]]
+    plano = montar_plano(PLANOS[nome], alteracoes)
+
+    acertos = cache_bases.acertos
+    resultado = calcular_automatico_por_base(plano)
+    assert cache_bases.acertos == acertos + 1
+    comparar_resultados(resultado.para_dict(), calcular_financiamento_planta(plano))
+
+
+def test_chave_ignora_valores_monetarios():
+    plano = montar_plano(PLANOS["reforco_e_chaves"])
+    outro = plano.model_copy(update={"valorImovel": 1e6, "valorEntrada": 1e5, "valorReforco": 1, "valorChaves": 2})
+    mais_longo = plano.model_copy(update={"prazoPagamento": 121})
+    assert chave_base(plano) == chave_base(outro)
+    assert chave_base(plano) != chave_base(mais_longo)
+
+
+def test_cache_lru_descarta_a_base_mais_antiga():
+    cache = CacheBaseNormalizada(max_entradas=2)
+    chaves = [chave_base(montar_plano({"prazoPagamento": prazo})) for prazo in (60, 72, 84)]
+    for chave in chaves:
+        cache.obter(chave)
+    cache.obter(chaves[0])
+    assert cache.estatisticas() == {"entradas": 2, "acertos": 0, "falhas": 4}
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes da compressão e revalidação das respostas
+------------------------------------------------
+Versão do motor, negociação de Accept-Encoding, despejo do cache LRU por
+bytes e o ciclo ETag/If-None-Match da rota de cálculo.
+"""
+
+import gzip
+import json
+import shutil
+
+import pytest
+
+import cache_respostas
+from cache_respostas import CacheRespostas, modulos_motor, negociar_codificacao, versao_motor
+from financiamento_api import app
+
+
+PLANO = {
+    "valorImovel": 500000, "valorEntrada": 50000, "prazoEntrega": 36, "prazoPagamento": 120,
+    "correcaoMensalAteChaves": 0.5, "correcaoMensalAposChaves": 0.8,
+}
+
+
+def test_versao_cobre_so_os_modulos_do_motor(tmp_path):
+    modulos = modulos_motor()
+    assert {'cache_base_normalizada', 'cronograma_vetorizado', 'financiamento_planta_corrigido'} <= set(modulos)
+    assert not [m for m in modulos if m.startswith(('test_', 'teste_'))]
+    assert 'carga_financiamento' not in modulos and 'replay_requisicoes' not in modulos
+
+    for nome in modulos + ['carga_financiamento', 'test_cache_respostas']:
+        shutil.copy(f'{cache_respostas.DIRETORIO}/{nome}.py', tmp_path / f'{nome}.py')
+    versao = versao_motor(str(tmp_path))
+
+    with open(tmp_path / 'carga_financiamento.py', 'a') as f:
+        f.write('\n# alteração fora do motor\n')
+    (tmp_path / 'test_novo.py').write_text('def test_nada():\n    pass\n')
+    assert versao_motor(str(tmp_path)) == versao
+
+    with open(tmp_path / 'cronograma_vetorizado.py', 'a') as f:
+        f.write('\n# alteração no motor\n')
+    assert versao_motor(str(tmp_path)) != versao
+
+
+@pytest.mark.parametrize("accept_encoding,esperada", [
+    (None, 'identity'),
+    ('', 'identity'),
+    ('gzip', 'gzip'),
+    ('deflate, gzip;q=0.5', 'gzip'),
+    ('gzip;q=0', 'identity'),
+    ('*', 'gzip'),
+    ('*;q=0.3, gzip;q=0', 'identity'),
+    ('GZIP;q=0.9, identity', 'gzip'),
+    ('deflate', 'identity'),
+])
+def test_negociacao_de_codificacao(monkeypatch, accept_encoding, esperada):
+    monkeypatch.setattr(cache_respostas, 'CODIFICACOES_SUPORTADAS', ('gzip',))
+    assert negociar_codificacao(accept_encoding) == esperada
+
+
+def test_lru_limitado_em_bytes():
+    cache = CacheRespostas(max_bytes=300)
+    for chave in 'abc':
+        cache.guardar(chave, 'identity', chave.encode() * 100)
+    assert cache._bytes == 300
+
+    # Usar "a" o torna o mais recente: o próximo despejo leva "b"
+    assert cache.obter('a', 'identity') == b'a' * 100
+    cache.guardar('d', 'identity', b'd' * 100)
+    assert cache.obter('b', 'identity') is None
+    assert [cache.obter(chave, 'identity') is not None for chave in 'acd'] == [True, True, True]
+    assert cache._bytes == 300
+
+    # Outra codificação da mesma entrada conta no limite e despeja a mais antiga
+    gzip_a = cache.obter('a', 'gzip')
+    assert gzip.decompress(gzip_a) == b'a' * 100
+    assert cache.obter('c', 'identity') is None
+    assert cache._bytes == sum(len(v) for corpos in cache._corpos.values() for v in corpos.values())
+    assert cache._bytes <= 300 + len(gzip_a)
+
+
+def test_etag_e_304_na_rota_de_calculo():
+    cliente = app.test_client()
+    resposta = cliente.post('/api/calcular-financiamento', json=PLANO, headers={'Accept-Encoding': 'gzip'})
+    assert resposta.status_code == 200
+    assert resposta.headers['Content-Encoding'] == 'gzip'
+    assert resposta.headers['Vary'] == 'Accept-Encoding'
+    etag = resposta.headers['ETag']
+    corpo = json.loads(gzip.decompress(resposta.data))
+    assert len(corpo["parcelas"]) == PLANO["prazoPagamento"] + 1
+
+    revalidacao = cliente.post('/api/calcular-financiamento', json=PLANO,
+                               headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert revalidacao.status_code == 304
+    assert revalidacao.data == b''
+    assert revalidacao.headers['ETag'] == etag
+
+    # Sem gzip, a representação é outra: outra ETag e o mesmo JSON sem compressão
+    identidade = cliente.post('/api/calcular-financiamento', json=PLANO, headers={'If-None-Match': etag})
+    assert identidade.status_code == 200
+    assert 'Content-Encoding' not in identidade.headers
+    assert identidade.headers['ETag'] != etag
+    assert json.loads(identidade.data) == corpo
+
+    # Plano alterado: a ETag antiga não revalida
+    alterado = cliente.post('/api/calcular-financiamento', json=dict(PLANO, valorEntrada=60000),
+                            headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert alterado.status_code == 200
+    assert alterado.headers['ETag'] != etag
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes da calibração pelas séries de índices
+--------------------------------------------
+As estatísticas incrementais das janelas móveis contra o recálculo direto
+com NumPy, a reconstrução das séries após revisões gravadas por outro
+worker e a ativação só por SERIES_INDICES_CAMINHO.
+"""
+
+import os
+import random
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import calibracao_indices
+from calibracao_indices import (
+    FRACAO_APARADA,
+    JANELAS,
+    PERCENTIS,
+    CalibracaoIndices,
+    IndiceNaoEncontrado,
+    JanelaMovel,
+)
+
+
+def resumo_direto(valores):
+    """Estatísticas da janela recalculadas do zero"""
+    valores = np.asarray(valores, dtype=float)
+    ordenados = np.sort(valores)
+    aparar = int(len(valores) * FRACAO_APARADA)
+    resumo = {
+        "media": valores.mean(),
+        "mediana": np.median(valores),
+        "mediaAparada": ordenados[aparar:len(valores) - aparar].mean(),
+        "taxaEquivalente": (np.prod(1 + valores / 100) ** (1 / len(valores)) - 1) * 100,
+    }
+    for p in PERCENTIS:
+        resumo[f"p{p}"] = np.percentile(valores, p)
+    return resumo
+
+
+def serie_aleatoria(semente, pontos):
+    aleatorio = random.Random(semente)
+    # Valores repetidos de propósito: a remoção por bisseção precisa achar o valor certo
+    return [round(aleatorio.uniform(-0.4, 1.6), 1) for _ in range(pontos)]
+
+
+def meses(quantidade, ano=2015):
+    return [f"{ano + m // 12}-{m % 12 + 1:02d}" for m in range(quantidade)]
+
+
+@pytest.mark.parametrize("tamanho", JANELAS)
+def test_janela_incremental_igual_ao_recalculo(tamanho):
+    valores = serie_aleatoria(tamanho, 150)
+    janela = JanelaMovel(tamanho)
+    for posicao, valor in enumerate(valores):
+        janela.adicionar(valor)
+        esperado = resumo_direto(valores[max(0, posicao + 1 - tamanho):posicao + 1])
+        assert list(janela.valores) == valores[max(0, posicao + 1 - tamanho):posicao + 1]
+        for chave, valor_esperado in esperado.items():
+            assert janela.resumo[chave] == pytest.approx(valor_esperado, rel=1e-9, abs=1e-9), (posicao, chave)
+
+
+def pontos(lista_meses, valores):
+    return {"pontos": [{"month": mes, "value": valor} for mes, valor in zip(lista_meses, valores)]}
+
+
+def test_revisoes_de_outro_worker_reconstroem_a_serie(tmp_path):
+    caminho = str(tmp_path / 'indices.sqlite3')
+    coletor, leitor = CalibracaoIndices(caminho), CalibracaoIndices(caminho)
+    lista_meses, valores = meses(40), serie_aleatoria(1, 40)
+
+    coletor.adicionar_pontos('incc', pontos(lista_meses[10:30], valores[10:30]))
+    assert leitor.resumo('incc', 12)["mesFinal"] == lista_meses[29]
+
+    # Mês novo: caminho incremental
+    coletor.adicionar_pontos('incc', pontos(lista_meses[30:40], valores[30:40]))
+    # Revisão de um mês já lido e meses anteriores ao início: reconstrução
+    valores[35] += 0.3
+    coletor.adicionar_pontos('incc', pontos([lista_meses[35]], [valores[35]]))
+    coletor.adicionar_pontos('incc', pontos(lista_meses[:10], valores[:10]))
+
+    for tamanho in JANELAS:
+        resumo = leitor.resumo('incc', tamanho)
+        inicio = max(0, 40 - tamanho)
+        assert (resumo["mesInicial"], resumo["mesFinal"]) == (lista_meses[inicio], lista_meses[-1])
+        assert resumo["pontos"] == 40 - inicio
+        assert resumo["completa"] == (tamanho <= 40)
+        for chave, valor_esperado in resumo_direto(valores[inicio:]).items():
+            assert resumo[chave] == pytest.approx(valor_esperado, rel=1e-9, abs=1e-9), (tamanho, chave)
+        # Um worker recém-iniciado chega ao mesmo resumo lendo a série inteira
+        assert CalibracaoIndices(caminho).resumo('incc', tamanho) == resumo
+
+
+def test_pontos_inalterados_nao_contam(tmp_path):
+    calibracao = CalibracaoIndices(str(tmp_path / 'indices.sqlite3'))
+    lote = pontos(meses(3), [0.5, 0.6, 0.7])
+    assert calibracao.adicionar_pontos('ipca', lote)["alterados"] == 3
+    assert calibracao.adicionar_pontos('ipca', lote) == {"indice": 'ipca', "alterados": 0, "mesFinal": '2015-03'}
+
+
+def test_calibracao_usa_a_estatistica_e_nao_sugere_taxa_negativa(tmp_path):
+    calibracao = CalibracaoIndices(str(tmp_path / 'indices.sqlite3'))
+    calibracao.adicionar_pontos('incc', pontos(meses(12), serie_aleatoria(3, 12)))
+    calibracao.adicionar_pontos('ipca', pontos(meses(12), [-0.2] * 12))
+    resultado = calibracao.calibrar({"indiceAteChaves": "incc", "indiceAposChaves": "ipca",
+                                     "janela": 12, "estatistica": "p75"})
+    assert resultado["sugestao"]["correcaoMensalAteChaves"] == resultado["indices"]["incc"]["p75"]
+    assert resultado["sugestao"]["correcaoMensalAposChaves"] == 0.0
+
+    with pytest.raises(IndiceNaoEncontrado):
+        calibracao.calibrar({"indiceAteChaves": "cub", "indiceAposChaves": None})
+    with pytest.raises(ValueError):
+        calibracao.calibrar({"janela": 7})
+
+
+def test_desativada_sem_caminho():
+    ambiente = {k: v for k, v in os.environ.items() if k != 'SERIES_INDICES_CAMINHO'}
+    codigo = "import calibracao_indices as c; print(c.calibracao_indices.ativo)"
+    saida = subprocess.run([sys.executable, '-c', codigo], capture_output=True, text=True, check=True,
+                           cwd=os.path.dirname(os.path.abspath(calibracao_indices.__file__)), env=ambiente)
+    assert saida.stdout.strip() == 'False'
+
+    desativada = CalibracaoIndices(None)
+    assert desativada.adicionar_pontos('incc', pontos(meses(12), [0.5] * 12)) == \
+        {"indice": 'incc', "alterados": 0, "mesFinal": None}
+    with pytest.raises(IndiceNaoEncontrado):
+        desativada.calibrar({})
+    with pytest.raises(IndiceNaoEncontrado):
+        desativada.adicionar_pontos('igpm', pontos(meses(1), [0.5]))
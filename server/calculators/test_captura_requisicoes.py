@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes da captura e do replay de requisições
+--------------------------------------------
+A anonimização do corpo (campos enumerados e textos numéricos preservados,
+valores monetários com 3 algarismos significativos, demais textos em hash)
+e uma captura feita pela API reproduzida pelo replay_requisicoes.py.
+"""
+
+import json
+import math
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+import financiamento_api
+from cache_respostas import CacheRespostas
+from captura_requisicoes import (
+    CAMPOS_ENUMERADOS,
+    VALOR_MONETARIO_MINIMO,
+    CapturaRequisicoes,
+    arredondar_significativos,
+)
+from replay_requisicoes import ler_captura
+
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+PLANO = {
+    "valorImovel": 487654, "valorEntrada": 48765.43, "prazoEntrega": 36, "prazoPagamento": 120,
+    "correcaoMensalAteChaves": 0.5, "correcaoMensalAposChaves": 0.8,
+}
+
+
+@pytest.mark.parametrize("valor,esperado", [
+    (487654, 488000), (48765.43, 48800), (1234.5, 1230), (-23456, -23500), (0.012345, 0.0123), (999, 999),
+])
+def test_arredondar_significativos(valor, esperado):
+    assert arredondar_significativos(valor) == pytest.approx(esperado)
+
+
+def test_arredondar_significativos_mantem_zero_e_nao_finitos():
+    assert arredondar_significativos(0) == 0
+    assert arredondar_significativos(math.inf) == math.inf
+    assert math.isnan(arredondar_significativos(math.nan))
+
+
+def test_anonimizar_preserva_o_que_o_calculo_le():
+    captura = CapturaRequisicoes(None)
+    corpo = dict(PLANO, tipoParcelamento="personalizado", incluirReforco=False, valorChaves=None,
+                 financiamentoBancario={"sistema": "SAC", "taxaJurosMensal": 0.9, "prazoMeses": 240},
+                 parcelasPersonalizadas=[{"mes": 3, "valor": 5432.1, "tipo": "Reforço"},
+                                         {"mes": 4, "valor": 850, "tipo": "Parcela"}],
+                 listPrice="512345.67", condoFees="650", padrao_aluguel_ocupacao="92.5")
+    anonimo = captura.anonimizar(corpo)
+
+    # Campos enumerados e valores abaixo de R$ 1.000 (prazos, meses, taxas) ficam como estão
+    assert {"tipoParcelamento", "sistema", "tipo"} <= CAMPOS_ENUMERADOS
+    assert anonimo["tipoParcelamento"] == "personalizado"
+    assert anonimo["financiamentoBancario"] == {"sistema": "SAC", "taxaJurosMensal": 0.9, "prazoMeses": 240}
+    assert [p["tipo"] for p in anonimo["parcelasPersonalizadas"]] == ["Reforço", "Parcela"]
+    assert [p["mes"] for p in anonimo["parcelasPersonalizadas"]] == [3, 4]
+    for campo in ("prazoEntrega", "prazoPagamento", "correcaoMensalAteChaves", "incluirReforco", "valorChaves"):
+        assert anonimo[campo] == corpo[campo]
+
+    # Valores a partir de R$ 1.000 com 3 algarismos significativos, inteiros continuam inteiros
+    assert VALOR_MONETARIO_MINIMO == 1000
+    assert anonimo["valorImovel"] == 488000 and isinstance(anonimo["valorImovel"], int)
+    assert anonimo["valorEntrada"] == pytest.approx(48800.0)
+    assert anonimo["valorEntrada"] <= anonimo["valorImovel"]
+    assert [p["valor"] for p in anonimo["parcelasPersonalizadas"]] == [pytest.approx(5430), 850]
+
+    # Textos numéricos continuam numéricos (os monetários arredondados)
+    assert float(anonimo["listPrice"]) == pytest.approx(512000)
+    assert (anonimo["condoFees"], anonimo["padrao_aluguel_ocupacao"]) == ("650", "92.5")
+
+    # O corpo original não é alterado
+    assert corpo["valorImovel"] == 487654
+
+
+def test_anonimizar_troca_textos_livres_por_hash():
+    captura = CapturaRequisicoes(None)
+    anonimo = captura.anonimizar({"nomeCliente": "Maria da Silva", "observacoes": ["Apto 1201", "Maria da Silva"],
+                                  "tipo": "Chaves"})
+    assert re.fullmatch(r'[0-9a-f]{12}', anonimo["nomeCliente"])
+    assert anonimo["observacoes"][1] == anonimo["nomeCliente"]
+    assert anonimo["observacoes"][0] != anonimo["nomeCliente"]
+    assert anonimo["tipo"] == "Chaves"
+    # O sal é do processo: o mesmo texto não gera o mesmo hash em outra instância
+    assert CapturaRequisicoes(None).anonimizar("Maria da Silva") != anonimo["nomeCliente"]
+
+
+def test_captura_desativada_ou_fora_da_amostra(tmp_path):
+    assert not CapturaRequisicoes(None).sortear('POST', True)
+    captura = CapturaRequisicoes(str(tmp_path / 'captura.jsonl'), amostra=1.0)
+    assert captura.sortear('POST', True)
+    assert not captura.sortear('GET', True)
+    assert not captura.sortear('POST', False)
+    assert not CapturaRequisicoes(str(tmp_path / 'captura.jsonl'), amostra=0).sortear('POST', True)
+
+
+def test_captura_pela_api_e_replay(tmp_path, monkeypatch):
+    arquivo = str(tmp_path / 'captura.jsonl')
+    captura = CapturaRequisicoes(arquivo, amostra=1.0)
+    monkeypatch.setattr(financiamento_api, 'captura_requisicoes', captura)
+    monkeypatch.setattr(financiamento_api, 'cache_respostas', CacheRespostas())
+    cliente = financiamento_api.app.test_client()
+
+    requisicoes = [
+        ('/api/calcular-financiamento', dict(PLANO, nomeCliente="Maria da Silva")),
+        ('/api/calcular-financiamento', dict(PLANO, prazoEntrega=24, valorEntrada=-1)),
+        ('/api/carteira/recebimentos', {"unidades": [{"plano": PLANO}, {"plano": dict(PLANO, valorImovel=612345)}]}),
+    ]
+    status = [cliente.post(rota, json=corpo, headers={'Accept-Encoding': 'gzip'}).status_code
+              for rota, corpo in requisicoes]
+    assert status[0] == 200 and status[2] == 200 and status[1] >= 400
+    assert captura.gravadas == 3
+
+    registros = ler_captura(arquivo, None, None)
+    assert [(r["rota"], r["status"]) for r in registros] == [(rota, s) for (rota, _), s in zip(requisicoes, status)]
+    assert registros[0]["cabecalhos"] == {'Accept-Encoding': 'gzip'}
+    assert registros[0]["corpo"]["valorImovel"] == 488000
+    assert "Maria" not in open(arquivo, encoding='utf-8').read()
+    assert [r["rota"] for r in ler_captura(arquivo, ['/api/carteira/recebimentos'], None)] == \
+        ['/api/carteira/recebimentos']
+    assert len(ler_captura(arquivo, None, 2)) == 2
+
+    # O replay reproduz a captura anonimizada com os mesmos status, em outro processo
+    saida = str(tmp_path / 'replay.json')
+    ambiente = {k: v for k, v in os.environ.items() if k != 'CAPTURA_REQUISICOES_ARQUIVO'}
+    subprocess.run([sys.executable, os.path.join(DIRETORIO, 'replay_requisicoes.py'), '--captura', arquivo,
+                    '--aquecimento', '0', '--repeticoes', '2', '--top', '5', '--saida', saida],
+                   cwd=str(tmp_path), env=ambiente, capture_output=True, text=True, check=True)
+    with open(saida, encoding='utf-8') as f:
+        replay = json.load(f)
+    assert replay["parametros"]["requisicoes"] == 3
+    assert replay["latencia"]["divergenciasStatus"] == {}
+    assert replay["latencia"]["rotas"]["*"]["requisicoes"] == 6
+    assert replay["latencia"]["rotas"]["/api/calcular-financiamento"]["requisicoes"] == 4
+    assert 0 < len(replay["perfil"]["pontosQuentes"]) <= 5
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes da agregação da carteira
+-------------------------------
+A linha do tempo agregada (em lotes, pelas bases normalizadas) contra a soma
+direta dos cronogramas de cada unidade.
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from carga_financiamento import GeradorPlanos
+from cache_base_normalizada import calcular_financiamento_planta_rapido
+from carteira_financiamento import TIPOS_CARTEIRA, agregar_carteira
+
+
+def carteira_aleatoria(semente, unidades, fracao_bancario):
+    gerador = GeradorPlanos(semente, 0.3, [12, 24, 36], 0.5, ['trimestral', 'semestral', 'anual'])
+    aleatorio = random.Random(semente)
+    resultado = []
+    for _ in range(unidades):
+        plano = gerador.plano()
+        if aleatorio.random() < fracao_bancario:
+            plano["financiamentoBancario"] = {"sistema": aleatorio.choice(["SAC", "Price"]),
+                                              "prazoMeses": 200, "taxaJurosMensal": 0.8}
+        resultado.append({"mesInicio": aleatorio.randint(0, 18), "plano": plano})
+    return resultado
+
+
+def agregar_por_forca_bruta(unidades, horizonte):
+    """
+    Soma, unidade a unidade, os recebimentos por tipo no calendário da
+    carteira. O saldo devedor de cada unidade fica constante após a última
+    linha; com fase bancária, a dívida sai da carteira após o mês das chaves.
+    """
+    recebimentos = np.zeros((len(TIPOS_CARTEIRA), horizonte + 1))
+    saldo = np.zeros(horizonte + 1)
+    for unidade in unidades:
+        inicio = unidade["mesInicio"]
+        parcelas = [p for p in calcular_financiamento_planta_rapido(unidade["plano"])["parcelas"]
+                    if p["tipoPagamento"] != 'Financiamento']
+        for linha in parcelas:
+            tipo = 'Entrada' if linha["mes"] == 0 else linha["tipoPagamento"]
+            recebimentos[TIPOS_CARTEIRA.index(tipo), inicio + linha["mes"]] += linha["valorCorrigido"]
+
+        saldos = {linha["mes"]: linha["saldoDevedor"] for linha in parcelas}
+        quitacao = unidade["plano"]["prazoEntrega"] if unidade["plano"].get("financiamentoBancario") else None
+        atual = 0.0
+        for mes in range(horizonte + 1 - inicio):
+            atual = saldos.get(mes, atual)
+            if quitacao is not None and mes > quitacao:
+                atual = 0.0
+            saldo[inicio + mes] += atual
+    return recebimentos, saldo
+
+
+@pytest.mark.parametrize("semente,fracao_bancario,tamanho_lote", [(1, 0.0, 256), (7, 0.5, 7), (11, 1.0, 3)])
+def test_carteira_igual_a_soma_das_unidades(semente, fracao_bancario, tamanho_lote):
+    unidades = carteira_aleatoria(semente, 30, fracao_bancario)
+    resultado = agregar_carteira({"unidades": unidades, "tamanhoLote": tamanho_lote})
+    horizonte = resultado["resumo"]["horizonte"]
+    recebimentos, saldo = agregar_por_forca_bruta(unidades, horizonte)
+
+    for codigo, tipo in enumerate(TIPOS_CARTEIRA):
+        np.testing.assert_allclose(resultado["recebimentos"][tipo], recebimentos[codigo], rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(resultado["saldoDevedor"], saldo, rtol=1e-9, atol=1e-5)
+    np.testing.assert_allclose(resultado["recebimentoTotal"], recebimentos.sum(axis=0), rtol=1e-9, atol=1e-6)
+    assert resultado["resumo"]["totalRecebido"] == pytest.approx(recebimentos.sum(), rel=1e-9)
+
+
+def test_horizonte_corta_na_entrega_com_fase_bancaria():
+    plano = {"valorImovel": 400000, "valorEntrada": 40000, "prazoEntrega": 24, "prazoPagamento": 120,
+             "correcaoMensalAteChaves": 0.5, "correcaoMensalAposChaves": 0.8,
+             "financiamentoBancario": {"sistema": "SAC", "prazoMeses": 300, "taxaJurosMensal": 0.9}}
+    resultado = agregar_carteira({"unidades": [{"mesInicio": 5, "plano": plano}]})
+    assert resultado["resumo"]["horizonte"] == 5 + 24
+    assert resultado["saldoDevedor"][-1] > 0
+    assert sum(resultado["recebimentos"]["Parcela"]) > 0
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes da comparação de planos
+------------------------------
+Valor presente, custo total e pico do saldo de cada variante contra o
+cronograma completo calculado plano a plano, com e sem fase bancária.
+"""
+
+import pytest
+
+from financiamento_planta_corrigido import FinanciamentoPlantaInput
+from cache_base_normalizada import calcular_financiamento_planta_rapido
+from comparacao_planos import comparar_planos
+
+
+PLANO = {
+    "valorImovel": 550000, "valorEntrada": 55000, "prazoEntrega": 30, "prazoPagamento": 100,
+    "correcaoMensalAteChaves": 0.5, "correcaoMensalAposChaves": 0.8,
+    "incluirReforco": True, "periodicidadeReforco": "semestral", "valorReforco": 12000, "valorChaves": 40000,
+}
+
+BANCARIO = {"sistema": "Price", "prazoMeses": 180, "taxaJurosMensal": 0.9}
+
+VARIANTES = [
+    {"nome": "base"},
+    {"nome": "mais_entrada", "alteracoes": {"valorEntrada": 110000}},
+    {"nome": "reforco_anual", "alteracoes": {"periodicidadeReforco": "anual", "valorReforco": 25000}},
+    {"nome": "prazo_longo", "alteracoes": {"prazoPagamento": 140}},
+    {"nome": "banco_price", "alteracoes": {"financiamentoBancario": BANCARIO}},
+    {"nome": "banco_sac", "alteracoes": {"financiamentoBancario": dict(BANCARIO, sistema="SAC")}},
+]
+
+
+def metricas_por_plano(plano, taxa_desconto):
+    """Métricas de uma variante sobre o cronograma completo (sem a janela do plano base)"""
+    completo = FinanciamentoPlantaInput(**dict(plano, mesInicio=None, mesFim=None))
+    parcelas = calcular_financiamento_planta_rapido(completo)["parcelas"]
+    entrada, pagamentos = parcelas[0], parcelas[1:]
+    return {
+        "valorPresente": entrada["valorCorrigido"] + sum(
+            p["valorCorrigido"] / (1 + taxa_desconto / 100) ** p["mes"] for p in pagamentos),
+        "custoTotalCorrigido": sum(p["valorCorrigido"] for p in parcelas),
+        "picoSaldoDevedor": max(p["saldoDevedor"] for p in parcelas),
+    }
+
+
+@pytest.mark.parametrize("janela", [{}, {"mesInicio": 10, "mesFim": 20}, {"mesInicio": 40}])
+def test_ranking_igual_ao_calculo_por_plano(janela):
+    plano = dict(PLANO, **janela)
+    resultado = comparar_planos({"plano": plano, "variantes": VARIANTES, "taxaDescontoMensal": 0.7})
+
+    esperado = {variante["nome"]: metricas_por_plano(dict(plano, **variante.get("alteracoes", {})), 0.7)
+                for variante in VARIANTES}
+    ordem = sorted(esperado, key=lambda nome: esperado[nome]["valorPresente"])
+    assert [linha["nome"] for linha in resultado["planos"]] == ordem
+    for linha in resultado["planos"]:
+        for chave, valor in esperado[linha["nome"]].items():
+            assert linha[chave] == pytest.approx(valor, rel=1e-9), (linha["nome"], chave)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes do controle de admissão
+------------------------------
+Estimativa de custo por tipo de requisição, contabilidade da capacidade da
+fila e as respostas 429 (fila saturada) e 503 (prazo vencido) da API.
+"""
+
+import threading
+import time
+
+import pytest
+
+import financiamento_api
+from cache_respostas import CacheRespostas
+from controle_admissao import (
+    CUSTO_MES_AUTOMATICO,
+    CUSTO_MES_PERSONALIZADO,
+    CUSTO_PROJECAO,
+    ControleAdmissao,
+    FilaSaturada,
+    PrazoExcedido,
+    estimar_custo,
+)
+
+
+PLANO = {
+    "valorImovel": 500000, "valorEntrada": 50000, "prazoEntrega": 36, "prazoPagamento": 120,
+    "correcaoMensalAteChaves": 0.5, "correcaoMensalAposChaves": 0.8,
+}
+
+PERSONALIZADO = dict(PLANO, tipoParcelamento="personalizado",
+                     parcelasPersonalizadas=[{"mes": m, "valor": 3000, "tipo": "Parcela"} for m in range(1, 81)])
+
+
+def test_estimativa_de_custo_por_tipo_de_requisicao():
+    automatico = 1 + 120 * CUSTO_MES_AUTOMATICO
+    personalizado = 1 + 120 * (120 + 80) * CUSTO_MES_PERSONALIZADO
+    assert estimar_custo(PLANO) == pytest.approx(automatico)
+    assert estimar_custo(PERSONALIZADO) == pytest.approx(personalizado)
+    assert estimar_custo({"unidades": [{"plano": PLANO}, {"plano": PERSONALIZADO}, {"plano": PLANO}]}) == \
+        pytest.approx(2 * automatico + personalizado)
+    assert estimar_custo({"projecoes": [{}, {}], "prazos": [5, 10]}) == pytest.approx(1 + 4 * CUSTO_PROJECAO)
+    assert estimar_custo({"projecoes": [{}]}) == pytest.approx(1 + 3 * CUSTO_PROJECAO)
+    assert estimar_custo({"plano": PLANO, "cenarios": {"a": {}, "b": {}}}) == pytest.approx(automatico + 2 * CUSTO_PROJECAO)
+    assert estimar_custo({"planoAnterior": PLANO, "planoNovo": PERSONALIZADO}) == pytest.approx(automatico + personalizado)
+    variantes = [{}, {"alteracoes": {"prazoPagamento": 240}}]
+    assert estimar_custo({"plano": PLANO, "variantes": variantes}) == \
+        pytest.approx(automatico + 1 + 240 * CUSTO_MES_AUTOMATICO)
+
+
+class Bloqueio:
+    """Ocupa o único worker do controle até ser liberado"""
+
+    def __init__(self, controle, custo):
+        self.controle = controle
+        self.liberar = threading.Event()
+        self.iniciado = threading.Event()
+        self.thread = threading.Thread(target=controle.executar, args=(self._trabalho, custo, 30))
+        self.thread.start()
+        assert self.iniciado.wait(5)
+
+    def _trabalho(self):
+        self.iniciado.set()
+        self.liberar.wait(10)
+
+    def encerrar(self):
+        self.liberar.set()
+        self.thread.join(5)
+
+
+def aguardar_custo(controle, custo):
+    fim = time.monotonic() + 5
+    while controle.estatisticas()["custoPendente"] != pytest.approx(custo):
+        assert time.monotonic() < fim, controle.estatisticas()
+        time.sleep(0.005)
+
+
+def test_capacidade_contabiliza_fila_e_execucao():
+    controle = ControleAdmissao(workers=1, capacidade=10, prazo_padrao_s=5)
+    bloqueio = Bloqueio(controle, 4)
+    assert controle.estatisticas()["custoPendente"] == 4
+
+    with pytest.raises(FilaSaturada) as erro:
+        controle.executar(lambda: None, 7)
+    assert erro.value.retry_after >= 1
+    assert controle.estatisticas()["custoPendente"] == 4
+
+    # Cabe na fila: espera o worker e executa
+    resultado = {}
+    na_fila = threading.Thread(target=lambda: resultado.setdefault("valor", controle.executar(lambda: 42, 6)))
+    na_fila.start()
+    aguardar_custo(controle, 10)
+    with pytest.raises(FilaSaturada):
+        controle.executar(lambda: None, 0.5)
+
+    bloqueio.encerrar()
+    na_fila.join(5)
+    assert resultado["valor"] == 42
+    aguardar_custo(controle, 0)
+
+    # Com a fila vazia, uma requisição maior que a capacidade ainda é aceita
+    assert controle.executar(lambda: 'grande', 50) == 'grande'
+    aguardar_custo(controle, 0)
+
+
+def test_prazo_vencido_na_fila_nao_executa():
+    controle = ControleAdmissao(workers=1, capacidade=10, prazo_padrao_s=5)
+    bloqueio = Bloqueio(controle, 1)
+    chamadas = []
+    with pytest.raises(PrazoExcedido):
+        controle.executar(lambda: chamadas.append(1), 1, prazo_s=0.05)
+    bloqueio.encerrar()
+    aguardar_custo(controle, 0)
+    assert chamadas == []
+
+
+def test_prazo_vencido_durante_o_calculo_libera_a_capacidade_ao_terminar():
+    controle = ControleAdmissao(workers=1, capacidade=10, prazo_padrao_s=5)
+    with pytest.raises(PrazoExcedido):
+        controle.executar(lambda: time.sleep(0.2), 3, prazo_s=0.05)
+    assert controle.estatisticas()["custoPendente"] == 3
+    aguardar_custo(controle, 0)
+
+
+@pytest.fixture
+def api_com_um_worker(monkeypatch):
+    controle = ControleAdmissao(workers=1, capacidade=10, prazo_padrao_s=5)
+    monkeypatch.setattr(financiamento_api, 'controle_admissao', controle)
+    monkeypatch.setattr(financiamento_api, 'cache_respostas', CacheRespostas())
+    bloqueio = Bloqueio(controle, 4)
+    yield financiamento_api.app.test_client()
+    bloqueio.encerrar()
+
+
+def test_api_responde_429_com_a_fila_cheia(api_com_um_worker):
+    # Custo 1 + 420/60 = 8, com 4 já em execução: não cabe na capacidade 10
+    resposta = api_com_um_worker.post('/api/calcular-financiamento', json=dict(PLANO, prazoPagamento=420))
+    assert resposta.status_code == 429
+    assert int(resposta.headers['Retry-After']) >= 1
+    assert 'saturada' in resposta.get_json()["error"]
+
+
+def test_api_responde_503_quando_o_prazo_vence(api_com_um_worker):
+    # Cabe na fila, mas o único worker está ocupado até o prazo de 50 ms vencer
+    resposta = api_com_um_worker.post('/api/carteira/recebimentos', json={"unidades": [{"plano": PLANO}]},
+                                      headers={'X-Prazo-Ms': '50'})
+    assert resposta.status_code == 503
+    assert resposta.headers['Retry-After'] == '1'
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes da diferença entre cronogramas
+-------------------------------------
+A comparação vetorizada contra a comparação linha a linha dos dois
+cronogramas completos, com as mesmas regras de alinhamento.
+"""
+
+import pytest
+
+from financiamento_planta_corrigido import FinanciamentoPlantaInput, calcular_financiamento_planta
+from cache_base_normalizada import calcular_financiamento_planta_rapido
+from diferenca_cronogramas import COLUNAS_DIFERENCA, calcular_diferenca_cronogramas
+
+
+PLANO = {
+    "valorImovel": 650000, "valorEntrada": 65000, "prazoEntrega": 30, "prazoPagamento": 90,
+    "correcaoMensalAteChaves": 0.5, "correcaoMensalAposChaves": 0.8,
+    "incluirReforco": True, "periodicidadeReforco": "semestral", "valorReforco": 15000, "valorChaves": 40000,
+}
+
+PERSONALIZADO = {
+    "valorImovel": 650000, "valorEntrada": 65000, "prazoEntrega": 30, "prazoPagamento": 90,
+    "correcaoMensalAteChaves": 0.5, "correcaoMensalAposChaves": 0.8, "tipoParcelamento": "personalizado",
+    "parcelasPersonalizadas": [{"mes": m, "valor": 5000, "tipo": "Reforço" if m % 12 == 0 else "Parcela"}
+                               for m in range(2, 80, 2)],
+}
+
+CASOS = {
+    "sem_alteracao": (PLANO, PLANO),
+    "reforco_maior": (PLANO, dict(PLANO, valorReforco=16000)),
+    "chaves_antes": (PLANO, dict(PLANO, prazoEntrega=24)),
+    "prazo_maior": (PLANO, dict(PLANO, prazoPagamento=120)),
+    "automatico_para_personalizado": (PLANO, PERSONALIZADO),
+    "fase_bancaria": (PLANO, dict(PLANO, financiamentoBancario={"sistema": "Price", "prazoMeses": 100,
+                                                                "taxaJurosMensal": 0.9})),
+}
+
+
+def alinhar_linhas(parcelas, meses):
+    """Tipo, pagamento e saldos em cada mês, repetindo o último saldo nos meses sem linha"""
+    por_mes = {linha["mes"]: linha for linha in parcelas}
+    colunas = {}
+    ultima = None
+    for mes in meses:
+        linha = por_mes.get(mes)
+        ultima = linha or ultima
+        colunas[mes] = {
+            "tipo": linha["tipoPagamento"] if linha else None,
+            "valorCorrigido": linha["valorCorrigido"] if linha else 0.0,
+            "saldoDevedor": ultima["saldoDevedor"],
+            "saldoLiquido": ultima["saldoLiquido"],
+        }
+    return colunas
+
+
+def diferenca_por_forca_bruta(anterior, novo, tolerancia):
+    parcelas_anterior = calcular_financiamento_planta_rapido(anterior)["parcelas"]
+    parcelas_novo = calcular_financiamento_planta_rapido(novo)["parcelas"]
+    meses = sorted({linha["mes"] for linha in parcelas_anterior} | {linha["mes"] for linha in parcelas_novo})
+    colunas_anterior = alinhar_linhas(parcelas_anterior, meses)
+    colunas_novo = alinhar_linhas(parcelas_novo, meses)
+
+    alterados = {}
+    for mes in meses:
+        a, n = colunas_anterior[mes], colunas_novo[mes]
+        diferencas = {}
+        alterado = a["tipo"] != n["tipo"]
+        for nome in COLUNAS_DIFERENCA:
+            if a[nome] is None or n[nome] is None:
+                alterado |= (a[nome] is None) != (n[nome] is None)
+                diferencas[nome] = None
+            else:
+                diferencas[nome] = n[nome] - a[nome]
+                alterado |= abs(diferencas[nome]) > tolerancia
+        if alterado:
+            alterados[mes] = (a, n, diferencas)
+    return len(meses), alterados
+
+
+@pytest.mark.parametrize("tolerancia", [0.01, 100.0])
+@pytest.mark.parametrize("nome", sorted(CASOS))
+def test_diferenca_igual_a_comparacao_linha_a_linha(nome, tolerancia):
+    anterior, novo = CASOS[nome]
+    resultado = calcular_diferenca_cronogramas({"planoAnterior": anterior, "planoNovo": novo, "tolerancia": tolerancia})
+    total_meses, alterados = diferenca_por_forca_bruta(anterior, novo, tolerancia)
+
+    assert resultado["totalMeses"] == total_meses
+    assert [linha["mes"] for linha in resultado["meses"]] == sorted(alterados)
+    for linha in resultado["meses"]:
+        a, n, diferencas = alterados[linha["mes"]]
+        assert (linha["tipoAnterior"], linha["tipoNovo"]) == (a["tipo"], n["tipo"])
+        for coluna in COLUNAS_DIFERENCA:
+            esperado = {"anterior": a[coluna], "novo": n[coluna], "diferenca": diferencas[coluna]}
+            for campo, valor in esperado.items():
+                if valor is None:
+                    assert linha[coluna][campo] is None
+                else:
+                    assert linha[coluna][campo] == pytest.approx(valor, rel=1e-9, abs=1e-6), (linha["mes"], coluna, campo)
+
+
+def test_resumo_traz_a_diferenca_dos_totais():
+    anterior, novo = CASOS["reforco_maior"]
+    resumo = calcular_diferenca_cronogramas({"planoAnterior": anterior, "planoNovo": novo})["resumo"]
+    esperado_anterior = calcular_financiamento_planta(FinanciamentoPlantaInput(**anterior))["resumo"]
+    esperado_novo = calcular_financiamento_planta(FinanciamentoPlantaInput(**novo))["resumo"]
+    for chave in ("valorTotal", "totalCorrecao", "totalParcelas"):
+        assert resumo[chave]["diferenca"] == pytest.approx(esperado_novo[chave] - esperado_anterior[chave], rel=1e-9)
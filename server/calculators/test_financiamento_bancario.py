@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes da fase de financiamento bancário
+----------------------------------------
+As tabelas SAC e Price em forma fechada contra a amortização mês a mês, e a
+troca das parcelas após as chaves pela fase bancária.
+"""
+
+import numpy as np
+import pytest
+
+from financiamento_planta_corrigido import FinanciamentoBancarioInput, FinanciamentoPlantaInput, calcular_financiamento_planta
+from cache_base_normalizada import calcular_financiamento_planta_rapido
+from financiamento_bancario import TABELAS, tabela_price, tabela_sac, total_pago_por_real
+
+
+def amortizar(principal, taxa_mensal, prazo, sistema):
+    """Tabela mês a mês: juros sobre o saldo, prestação pelo sistema, saldo menos a amortização"""
+    i = taxa_mensal / 100
+    if sistema == 'Price':
+        pmt = principal / prazo if i == 0 else principal * i / (1 - (1 + i) ** -prazo)
+    saldo = principal
+    linhas = []
+    for _ in range(prazo):
+        juros = saldo * i
+        amortizacao = principal / prazo if sistema == 'SAC' else pmt - juros
+        saldo -= amortizacao
+        linhas.append((amortizacao + juros, juros, amortizacao, saldo))
+    return [np.array(coluna) for coluna in zip(*linhas)]
+
+
+@pytest.mark.parametrize("sistema", sorted(TABELAS))
+@pytest.mark.parametrize("taxa,prazo", [(0.9, 240), (0.0, 120), (2.5, 36), (0.01, 1), (1.2, 420)])
+def test_tabela_igual_a_amortizacao_mes_a_mes(sistema, taxa, prazo):
+    principal = 387654.32
+    for obtida, esperada in zip(TABELAS[sistema](principal, taxa, prazo), amortizar(principal, taxa, prazo, sistema)):
+        np.testing.assert_allclose(obtida, esperada, rtol=1e-9, atol=1e-6)
+
+
+@pytest.mark.parametrize("taxa", [0.0, 0.7])
+def test_propriedades_das_tabelas(taxa):
+    principal, prazo = 250000.0, 180
+    prestacao, juros, amortizacao, saldo = tabela_sac(principal, taxa, prazo)
+    assert np.allclose(amortizacao, principal / prazo)
+    assert np.all(np.diff(prestacao) <= 1e-9)
+
+    prestacao, juros, amortizacao, saldo = tabela_price(principal, taxa, prazo)
+    assert np.allclose(prestacao, prestacao[0])
+    assert amortizacao.sum() == pytest.approx(principal)
+    assert saldo[-1] == pytest.approx(0, abs=1e-6)
+
+
+@pytest.mark.parametrize("sistema", sorted(TABELAS))
+def test_total_pago_linear_no_principal(sistema):
+    bancario = FinanciamentoBancarioInput(sistema=sistema, taxaJurosMensal=0.85, prazoMeses=200)
+    prestacao, _, _, _ = TABELAS[sistema](123456.0, bancario.taxaJurosMensal, bancario.prazoMeses)
+    assert prestacao.sum() == pytest.approx(123456.0 * total_pago_por_real(bancario), rel=1e-12)
+
+
+@pytest.mark.parametrize("sistema", sorted(TABELAS))
+@pytest.mark.parametrize("tipo", ['automatico', 'personalizado'])
+def test_fase_bancaria_substitui_parcelas_apos_as_chaves(sistema, tipo):
+    dados = {
+        "valorImovel": 600000, "valorEntrada": 60000, "prazoEntrega": 24, "prazoPagamento": 100,
+        "correcaoMensalAteChaves": 0.5, "correcaoMensalAposChaves": 0.8, "valorChaves": 50000,
+    }
+    if tipo == 'personalizado':
+        dados.update(tipoParcelamento='personalizado', valorChaves=None,
+                     parcelasPersonalizadas=[{"mes": m, "valor": 4000, "tipo": "Parcela"} for m in range(1, 90, 3)])
+    bancario = {"sistema": sistema, "taxaJurosMensal": 0.9, "prazoMeses": 150}
+    sem_banco = calcular_financiamento_planta(FinanciamentoPlantaInput(**dados))
+    resultado = calcular_financiamento_planta_rapido(dict(dados, financiamentoBancario=bancario))
+
+    antes = [p for p in sem_banco["parcelas"] if p["mes"] <= 24]
+    fase = [p for p in resultado["parcelas"] if p["tipoPagamento"] == 'Financiamento']
+    assert [p["mes"] for p in resultado["parcelas"][:len(antes)]] == [p["mes"] for p in antes]
+    assert [p["mes"] for p in fase] == list(range(25, 25 + 150))
+
+    principal = antes[-1]["saldoDevedor"]
+    prestacao, juros, amortizacao, saldo = amortizar(principal, 0.9, 150, sistema)
+    np.testing.assert_allclose([p["valorCorrigido"] for p in fase], prestacao, rtol=1e-9)
+    np.testing.assert_allclose([p["juros"] for p in fase], juros, rtol=1e-9)
+    np.testing.assert_allclose([p["amortizacao"] for p in fase], amortizacao, rtol=1e-9)
+    # A taxa do banco vai em taxaJuros; as prestações não têm correção
+    assert {(p["taxaJuros"], p["percentualCorrecao"]) for p in fase} == {(0.9, 0.0)}
+    assert not [p for p in resultado["parcelas"] if p["tipoPagamento"] != 'Financiamento' and "taxaJuros" in p]
+
+    resumo = resultado["resumo"]
+    assert resumo["financiamentoBancario"]["valorFinanciado"] == pytest.approx(principal)
+    assert resumo["financiamentoBancario"]["totalPago"] == pytest.approx(prestacao.sum())
+    assert resumo["valorTotal"] == pytest.approx(sum(p["valorCorrigido"] for p in resultado["parcelas"]))
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes da janela de meses do cronograma
+---------------------------------------
+O salto em forma fechada até mesInicio deve dar as mesmas linhas que o laço
+completo de calcular_financiamento_planta recortado na janela, e o resumo
+deve continuar sendo o do cronograma inteiro.
+"""
+
+import pytest
+
+from financiamento_planta_corrigido import FinanciamentoPlantaInput, calcular_financiamento_planta
+from cache_base_normalizada import calcular_financiamento_planta_rapido
+from janela_cronograma import estado_no_mes, plano_fechado, soma_aritmetico_geometrica
+
+
+PLANO_BASE = {
+    "valorImovel": 720000,
+    "valorEntrada": 72000,
+    "desconto": 5000,
+    "prazoEntrega": 30,
+    "prazoPagamento": 150,
+    "correcaoMensalAteChaves": 0.6,
+    "correcaoMensalAposChaves": 0.9,
+    "incluirReforco": True,
+    "periodicidadeReforco": "trimestral",
+    "valorReforco": 9000,
+    "valorChaves": 45000,
+}
+
+JANELAS = [(0, 0), (0, 12), (1, 1), (29, 31), (30, 30), (45, 90), (149, 150), (100, None), (140, 400)]
+
+
+def linhas_laco(dados):
+    """Linhas do laço completo, por mês"""
+    return {linha["mes"]: linha for linha in calcular_financiamento_planta(FinanciamentoPlantaInput(**dados))["parcelas"]}
+
+
+def comparar_linhas(obtidas, esperadas):
+    assert [linha["mes"] for linha in obtidas] == [linha["mes"] for linha in esperadas]
+    for linha, referencia in zip(obtidas, esperadas):
+        assert linha["tipoPagamento"] == referencia["tipoPagamento"]
+        for campo, valor in referencia.items():
+            if campo in ("mes", "data", "tipoPagamento"):
+                continue
+            if valor is None:
+                assert linha[campo] is None, (linha["mes"], campo)
+            else:
+                assert linha[campo] == pytest.approx(valor, rel=1e-9, abs=1e-6), (linha["mes"], campo)
+
+
+@pytest.mark.parametrize("inicio,fim", JANELAS)
+def test_janela_igual_ao_laco_recortado(inicio, fim):
+    completo = calcular_financiamento_planta(FinanciamentoPlantaInput(**PLANO_BASE))
+    resultado = calcular_financiamento_planta_rapido(dict(PLANO_BASE, mesInicio=inicio, mesFim=fim))
+
+    ultimo = completo["parcelas"][-1]["mes"] if fim is None else fim
+    esperadas = [linha for linha in completo["parcelas"] if inicio <= linha["mes"] <= ultimo]
+    comparar_linhas(resultado["parcelas"], esperadas)
+    for campo, valor in completo["resumo"].items():
+        assert resultado["resumo"][campo] == pytest.approx(valor, rel=1e-9, abs=1e-6), campo
+
+
+@pytest.mark.parametrize("taxas", [(0, 0), (1e-5, 2e-4), (0, 1.1), (1.5, 0)])
+def test_janela_com_taxas_pequenas_ou_nulas(taxas):
+    """Taxas abaixo de LIMITE_TAYLOR usam a série de Taylor da soma geométrica"""
+    dados = dict(PLANO_BASE, correcaoMensalAteChaves=taxas[0], correcaoMensalAposChaves=taxas[1])
+    esperadas = linhas_laco(dados)
+    resultado = calcular_financiamento_planta_rapido(dict(dados, mesInicio=40, mesFim=60))
+    comparar_linhas(resultado["parcelas"], [esperadas[mes] for mes in range(40, 61)])
+
+
+@pytest.mark.parametrize("mes", [0, 1, 3, 29, 30, 31, 77, 150])
+def test_estado_no_mes_igual_ao_laco(mes):
+    esperadas = linhas_laco(PLANO_BASE)
+    estado = estado_no_mes(plano_fechado(FinanciamentoPlantaInput(**PLANO_BASE)), mes)
+    assert estado.saldo_devedor == pytest.approx(esperadas[mes]["saldoDevedor"], rel=1e-9)
+    if mes:
+        assert estado.correcao_acumulada == pytest.approx(esperadas[mes]["correcaoAcumulada"], rel=1e-9)
+    assert estado.total_pago == pytest.approx(
+        sum(linha["valorCorrigido"] for m, linha in esperadas.items() if 1 <= m <= mes), rel=1e-9, abs=1e-6)
+
+
+@pytest.mark.parametrize("x", [1.0, 1 + 1e-9, 1 - 1e-6, 1.0001, 1.006, 1 / 1.05])
+def test_soma_aritmetico_geometrica(x):
+    n = 47
+    esperado = sum((2.5 + 0.75 * k) * x ** k for k in range(n))
+    assert soma_aritmetico_geometrica(2.5, 0.75, x, n) == pytest.approx(esperado, rel=1e-12)
+
+
+def test_janela_invertida_e_recusada():
+    with pytest.raises(ValueError):
+        calcular_financiamento_planta_rapido(dict(PLANO_BASE, mesInicio=20, mesFim=10))
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes do pipeline do investidor
+--------------------------------
+calcular_tir contra a referência de tirCalculator.ts (calculateIRR,
+tryCalculateIRR e calculateIRRBisection, transcritas abaixo linha a linha,
+sem NumPy), e o fluxo de caixa da venda contra o cronograma completo.
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from cache_base_normalizada import calcular_financiamento_planta_rapido
+from pipeline_investidor import calcular_pipeline_investidor, calcular_tir
+
+
+# -- referência: tirCalculator.ts ------------------------------------------
+
+def calculate_npv(cashflows, rate):
+    return sum(cashflow / math.pow(1 + rate, index) for index, cashflow in enumerate(cashflows))
+
+
+def try_calculate_irr(cashflows, initial_guess, max_iterations, precision):
+    guess = initial_guess
+    for _ in range(max_iterations):
+        try:
+            npv = sum(cashflow / math.pow(1 + guess, index) for index, cashflow in enumerate(cashflows))
+        except (OverflowError, ZeroDivisionError):
+            # No JavaScript o VPL vira Infinity/NaN e a tentativa termina com null logo adiante
+            return None
+        if abs(npv) < precision:
+            return guess
+        derivative_npv = sum(-(index * cashflow) / math.pow(1 + guess, index + 1)
+                             for index, cashflow in enumerate(cashflows))
+        if abs(derivative_npv) < 1e-10:
+            return None
+        next_guess = guess - npv / derivative_npv
+        if not math.isfinite(next_guess) or next_guess < -0.99 or next_guess > 5:
+            return None
+        guess = next_guess
+    return None
+
+
+def calculate_irr_bisection(cashflows):
+    lower_bound, upper_bound = -0.99, 5.0
+    npv_lower = calculate_npv(cashflows, lower_bound)
+    npv_upper = calculate_npv(cashflows, upper_bound)
+    sinal = lambda x: (x > 0) - (x < 0)
+    if sinal(npv_lower) == sinal(npv_upper):
+        return lower_bound if abs(npv_lower) < abs(npv_upper) else upper_bound
+    precision = 0.0000001
+    for _ in range(100):
+        middle_rate = (lower_bound + upper_bound) / 2
+        npv_middle = calculate_npv(cashflows, middle_rate)
+        if abs(npv_middle) < precision or (upper_bound - lower_bound) < precision:
+            return middle_rate
+        if sinal(npv_middle) == sinal(npv_lower):
+            lower_bound = middle_rate
+        else:
+            upper_bound = middle_rate
+    return (lower_bound + upper_bound) / 2
+
+
+def calculate_irr(cashflows, max_iterations=1000, precision=0.000001):
+    if not (any(flow > 0 for flow in cashflows) and any(flow < 0 for flow in cashflows)):
+        return calculate_irr_bisection(cashflows)
+    for initial_guess in [0.1, 0.05, 0.2, 0.01, 0.3, 0.5, -0.5, 0]:
+        result = try_calculate_irr(cashflows, initial_guess, max_iterations, precision)
+        if result is not None:
+            return result
+    return calculate_irr_bisection(cashflows)
+
+
+# -- testes ------------------------------------------------------------------
+
+PLANO = {
+    "valorImovel": 480000, "valorEntrada": 48000, "prazoEntrega": 36, "prazoPagamento": 100,
+    "correcaoMensalAteChaves": 0.5, "correcaoMensalAposChaves": 0.8,
+    "incluirReforco": True, "periodicidadeReforco": "anual", "valorReforco": 12000, "valorChaves": 30000,
+}
+
+
+def fluxo_investidor(prazo_venda, valorizacao_anual):
+    """Entrada e parcelas até a venda, e o valor líquido da venda no último mês"""
+    parcelas = calcular_financiamento_planta_rapido(PLANO)["parcelas"]
+    fluxo = [0.0] * (prazo_venda + 1)
+    for linha in parcelas:
+        if linha["mes"] < prazo_venda:
+            fluxo[linha["mes"]] = -linha["valorCorrigido"]
+    saldo = min(parcelas, key=lambda linha: abs(linha["mes"] - prazo_venda))["saldoDevedor"]
+    venda = PLANO["valorImovel"] * (1 + valorizacao_anual / 100) ** (prazo_venda / 12)
+    fluxo[prazo_venda] = venda * (1 - 0.06) - saldo
+    return fluxo
+
+
+FLUXOS = {
+    "investidor_24m": fluxo_investidor(24, 8),
+    "investidor_36m_perda": fluxo_investidor(36, -5),
+    "investidor_60m": fluxo_investidor(60, 15),
+    "emprestimo": [-1000] + [88.85] * 12,
+    "retorno_alto": [-100, 0, 0, 450],
+    "sem_troca_de_sinal_positivo": [100, 50, 25],
+    "sem_troca_de_sinal_negativo": [-100, -50],
+    "duas_trocas_de_sinal": [-100, 230, -132],
+    "taxa_negativa": [-1000, 100, 100, 100],
+    "um_mes": [-1000, 1010],
+}
+
+
+@pytest.mark.parametrize("nome", sorted(FLUXOS))
+def test_tir_igual_a_referencia_typescript(nome):
+    fluxo = FLUXOS[nome]
+    assert calcular_tir(np.array(fluxo)) == pytest.approx(calculate_irr(fluxo), rel=1e-9, abs=1e-9)
+
+
+def test_pipeline_usa_o_fluxo_do_cronograma():
+    cenarios = {"conservador": {"prazoVenda": 24, "valorizacaoAnual": 8, "comissao": 6},
+                "otimista": {"prazoVenda": 60, "valorizacaoAnual": 15, "comissao": 6}}
+    resultado = calcular_pipeline_investidor({"plano": PLANO, "cenarios": cenarios, "incluirFluxo": True})
+    for nome, venda in (("conservador", (24, 8)), ("otimista", (60, 15))):
+        esperado = fluxo_investidor(*venda)
+        cenario = resultado["cenarios"][nome]
+        np.testing.assert_allclose(cenario["fluxoCaixa"], esperado, rtol=1e-9, atol=1e-6)
+        assert cenario["tirMensal"] == pytest.approx(calculate_irr(esperado), rel=1e-9, abs=1e-9)
+        assert cenario["tirAnual"] == pytest.approx((1 + cenario["tirMensal"]) ** 12 - 1)
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes das projeções por cenário
+--------------------------------
+calcular_projecoes_cenarios contra as referências em TypeScript, transcritas
+abaixo laço a laço, sem NumPy:
+
+- rentalYieldCalculator.generateRentalYieldYearlyData
+- assetAppreciationCalculator.generateAssetAppreciationYearlyData
+- projectionDetailsCalculator.calculatePaymentTotals (e getInvestmentPeriod)
+
+Os campos vêm como no banco (textos numéricos), como números e ausentes ou
+zerados, para cobrir a leitura no estilo do JavaScript e os padrões de cada
+cenário.
+"""
+
+import math
+import re
+
+import pytest
+
+from cache_base_normalizada import calcular_financiamento_planta_rapido
+from projecoes_cenarios import CENARIOS, calcular_projecoes_cenarios
+
+
+# -- referência: leitura dos campos no JavaScript ----------------------------
+
+def verdadeiro(valor):
+    return valor not in (None, '', 0, False)
+
+
+def number(valor):
+    """Number(valor) || 0"""
+    try:
+        return float(valor or 0)
+    except ValueError:
+        return 0.0
+
+
+def parse_int(valor):
+    return int(re.match(r'\s*[+-]?\d+', str(valor)).group())
+
+
+def math_round(valor):
+    return math.floor(valor + 0.5)
+
+
+# -- referência: rentalYieldCalculator.ts ------------------------------------
+
+PADROES_ALUGUEL = {
+    'padrao': (0.005, 0.95, 0.08, 0.05),
+    'conservador': (0.004, 0.90, 0.08, 0.04),
+    'otimista': (0.006, 0.98, 0.07, 0.06),
+}
+
+
+def generate_rental_yield_yearly_data(projection, delivery_months, selected_timeframe):
+    yearly_data = []
+    list_price = number(projection.get('listPrice'))
+    furnishing_costs = number(projection.get('furnishingCosts'))
+    condo_fees = number(projection.get('condoFees'))
+    property_tax = number(projection.get('propertyTax'))
+
+    cenario = projection.get('activeScenario') or 'padrao'
+    percentual, ocupacao, administracao, reajuste = PADROES_ALUGUEL[cenario]
+    campo = lambda nome: projection.get(f'{cenario}_aluguel_{nome}')
+    monthly_rental = float(campo('valor_mensal')) if verdadeiro(campo('valor_mensal')) else list_price * percentual
+    occupancy_rate = float(campo('ocupacao')) / 100 if verdadeiro(campo('ocupacao')) else ocupacao
+    management_fee = float(campo('taxa_administracao')) / 100 if verdadeiro(campo('taxa_administracao')) else administracao
+    maintenance_costs = float(campo('manutencao')) / 100 if verdadeiro(campo('manutencao')) else 0
+    annual_rental_increase = float(campo('reajuste_anual')) / 100 if verdadeiro(campo('reajuste_anual')) else reajuste
+
+    initial_investment = list_price + furnishing_costs
+    delivery_years = math.ceil(delivery_months / 12)
+    current_rental = monthly_rental
+    for year in range(1, selected_timeframe + 1):
+        if year <= delivery_years:
+            yearly_data.append({"year": year, "rentalIncome": 0, "expenses": 0, "netIncome": 0, "yieldRate": 0})
+        else:
+            if year > delivery_years + 1:
+                current_rental *= (1 + annual_rental_increase)
+            annual_gross_income = current_rental * 12 * occupancy_rate
+            management_expense = annual_gross_income * management_fee
+            annual_expenses = management_expense + maintenance_costs + (condo_fees * 12) + property_tax
+            annual_net_income = annual_gross_income - annual_expenses
+            yearly_data.append({
+                "year": year,
+                "rentalIncome": annual_gross_income,
+                "expenses": annual_expenses,
+                "netIncome": annual_net_income,
+                "yieldRate": annual_net_income / initial_investment,
+            })
+    return yearly_data
+
+
+# -- referência: assetAppreciationCalculator.ts ------------------------------
+
+VALORIZACAO_PADRAO = {'padrao': 0.20, 'conservador': 0.15, 'otimista': 0.25}
+
+
+def generate_asset_appreciation_yearly_data(projection, selected_timeframe):
+    yearly_data = []
+    list_price = number(projection.get('listPrice'))
+
+    cenario = projection.get('activeScenario') or 'padrao'
+    if verdadeiro(projection.get(f'{cenario}_valorizacao_taxa_anual')):
+        annual_appreciation_rate = float(projection[f'{cenario}_valorizacao_taxa_anual']) / 100
+    elif verdadeiro(projection.get(f'{cenario}_venda_valorizacao')):
+        annual_appreciation_rate = float(projection[f'{cenario}_venda_valorizacao']) / 100
+    else:
+        annual_appreciation_rate = VALORIZACAO_PADRAO[cenario]
+    manutencao = projection.get(f'{cenario}AssetAppreciationMaintenanceCosts')
+    impostos = projection.get(f'{cenario}AssetAppreciationAnnualTaxes')
+    annual_maintenance_costs = float(manutencao) if verdadeiro(manutencao) else 0
+    annual_taxes = float(impostos) if verdadeiro(impostos) else 0
+
+    delivery_months = number(projection.get('deliveryMonths')) or 36
+    delivery_years = math.ceil(delivery_months / 12)
+    current_value = list_price
+    for year in range(1, selected_timeframe + 1):
+        if year <= delivery_years:
+            current_value = list_price * (year / delivery_years)
+            yearly_data.append({
+                "year": year,
+                "propertyValue": current_value,
+                "appreciation": current_value - (yearly_data[year - 2]["propertyValue"] if year > 1 else 0),
+                "netValue": current_value - (annual_maintenance_costs + annual_taxes),
+            })
+        else:
+            appreciation = current_value * annual_appreciation_rate
+            current_value = current_value + appreciation
+            yearly_data.append({
+                "year": year,
+                "propertyValue": current_value,
+                "appreciation": appreciation,
+                "netValue": current_value - (annual_maintenance_costs + annual_taxes) * (year - delivery_years + 1),
+            })
+    return yearly_data
+
+
+# -- referência: projectionDetailsCalculator.ts ------------------------------
+
+def get_investment_period(projection, scenario):
+    entrega_default = number(projection.get('deliveryMonths')) or 36
+    periodo = projection.get(f'{scenario}FutureSaleInvestmentPeriod')
+    if verdadeiro(periodo):
+        return parse_int(periodo)
+    if scenario == 'padrao':
+        return entrega_default + 1
+    if scenario == 'conservador':
+        return math_round(entrega_default * 1.3)
+    return max(1, math_round(entrega_default * 0.7))
+
+
+def calculate_payment_totals(projection, scenario):
+    parcelas = ((projection.get('calculationResults') or {}).get('financiamentoPlanta') or {}).get('parcelas') or []
+    totais = dict.fromkeys(('totalParcelasPagas', 'totalParcelas', 'totalReforcosPagos', 'totalReforcos',
+                            'totalChavesPago', 'totalChaves', 'totalPagamentos', 'mesDaVenda'), 0)
+    if not parcelas:
+        return totais
+    mes_da_venda = get_investment_period(projection, scenario)
+    for parcela in parcelas:
+        if parcela['mes'] <= mes_da_venda:
+            if parcela['tipoPagamento'] == 'Parcela':
+                totais['totalParcelasPagas'] += parcela['valorCorrigido']
+                totais['totalParcelas'] += parcela['valorBase']
+            elif parcela['tipoPagamento'] == 'Reforço':
+                totais['totalReforcosPagos'] += parcela['valorCorrigido']
+                totais['totalReforcos'] += parcela['valorBase']
+            elif parcela['tipoPagamento'] == 'Chaves':
+                totais['totalChavesPago'] += parcela['valorCorrigido']
+                totais['totalChaves'] += parcela['valorBase']
+    totais['totalPagamentos'] = totais['totalParcelasPagas'] + totais['totalReforcosPagos'] + totais['totalChavesPago']
+    totais['mesDaVenda'] = mes_da_venda
+    return totais
+
+
+# -- casos ---------------------------------------------------------------------
+
+def parcelas(prazo_entrega):
+    return calcular_financiamento_planta_rapido({
+        "valorImovel": 550000, "valorEntrada": 55000, "prazoEntrega": prazo_entrega, "prazoPagamento": 72,
+        "correcaoMensalAteChaves": 0.5, "correcaoMensalAposChaves": 0.8,
+        "incluirReforco": True, "periodicidadeReforco": "semestral", "valorReforco": 8000, "valorChaves": 40000,
+    })["parcelas"]
+
+
+PROJECOES = [
+    # Só o obrigatório: todos os padrões, sem parcelas
+    {"id": 1, "listPrice": 400000, "deliveryMonths": 30},
+    # Campos como textos do banco, taxa de valorização pelo campo da venda e meses "no meio" do arredondamento
+    {
+        "id": 2, "listPrice": "550000", "furnishingCosts": "25000", "condoFees": "600", "propertyTax": "1800",
+        "deliveryMonths": "25",
+        "padrao_aluguel_valor_mensal": "2800", "padrao_aluguel_ocupacao": "92",
+        "padrao_aluguel_taxa_administracao": "10", "padrao_aluguel_manutencao": "150",
+        "padrao_aluguel_reajuste_anual": "4.5",
+        "conservador_aluguel_valor_mensal": "2400", "otimista_aluguel_reajuste_anual": "7",
+        "padrao_valorizacao_taxa_anual": "9", "conservador_venda_valorizacao": "6",
+        "otimista_valorizacao_taxa_anual": "12", "otimista_venda_valorizacao": "30",
+        "padraoAssetAppreciationMaintenanceCosts": "1200", "otimistaAssetAppreciationAnnualTaxes": "900",
+        "padraoFutureSaleInvestmentPeriod": "18.7",
+        "calculationResults": {"financiamentoPlanta": {"parcelas": parcelas(25)}},
+    },
+    # Números, zeros que caem no padrão e venda depois da última parcela
+    {
+        "id": 3, "listPrice": 300000, "furnishingCosts": 0, "deliveryMonths": 0,
+        "padrao_aluguel_ocupacao": 0, "conservador_aluguel_taxa_administracao": 12.5,
+        "conservadorAssetAppreciationMaintenanceCosts": 2000.5, "conservadorAssetAppreciationAnnualTaxes": 750,
+        "conservadorFutureSaleInvestmentPeriod": 120, "otimistaFutureSaleInvestmentPeriod": 24,
+        "calculationResults": {"financiamentoPlanta": {"parcelas": parcelas(36)}},
+    },
+]
+
+PRAZOS = [5, 10, 15]
+
+
+@pytest.fixture(scope='module')
+def resultado():
+    return calcular_projecoes_cenarios({"projecoes": PROJECOES, "prazos": PRAZOS})
+
+
+def iguais(linhas, esperadas):
+    assert len(linhas) == len(esperadas)
+    for linha, esperada in zip(linhas, esperadas):
+        assert linha.keys() == esperada.keys()
+        for chave, valor in esperada.items():
+            assert linha[chave] == pytest.approx(valor, rel=1e-12, abs=1e-9), (linha["year"], chave)
+
+
+@pytest.mark.parametrize("indice", range(len(PROJECOES)))
+@pytest.mark.parametrize("cenario", CENARIOS)
+def test_aluguel_igual_ao_typescript(resultado, indice, cenario):
+    projecao = dict(PROJECOES[indice], activeScenario=cenario)
+    entrega = number(projecao.get('deliveryMonths')) or 36
+    for prazo in PRAZOS:
+        iguais(resultado["projecoes"][indice]["cenarios"][cenario]["rentalYieldYearly"][str(prazo)],
+               generate_rental_yield_yearly_data(projecao, entrega, prazo))
+
+
+@pytest.mark.parametrize("indice", range(len(PROJECOES)))
+@pytest.mark.parametrize("cenario", CENARIOS)
+def test_valorizacao_igual_ao_typescript(resultado, indice, cenario):
+    projecao = dict(PROJECOES[indice], activeScenario=cenario)
+    for prazo in PRAZOS:
+        iguais(resultado["projecoes"][indice]["cenarios"][cenario]["assetAppreciationYearly"][str(prazo)],
+               generate_asset_appreciation_yearly_data(projecao, prazo))
+
+
+@pytest.mark.parametrize("indice", range(len(PROJECOES)))
+@pytest.mark.parametrize("cenario", CENARIOS)
+def test_totais_de_pagamento_iguais_ao_typescript(resultado, indice, cenario):
+    totais = resultado["projecoes"][indice]["cenarios"][cenario]["paymentTotals"]
+    esperados = calculate_payment_totals(PROJECOES[indice], cenario)
+    assert totais.keys() == esperados.keys()
+    assert totais["mesDaVenda"] == esperados["mesDaVenda"]
+    for chave, valor in esperados.items():
+        assert totais[chave] == pytest.approx(valor, rel=1e-12), chave
+
+
+def test_meses_da_venda_no_estilo_do_javascript(resultado):
+    meses = [[resultado["projecoes"][i]["cenarios"][c]["paymentTotals"]["mesDaVenda"] for c in CENARIOS]
+             for i in range(len(PROJECOES))]
+    # parseInt("18.7") = 18; Math.round(32.5) = 33 (o round do Python daria 32)
+    assert meses == [[0, 0, 0], [18, 33, 18], [37, 120, 24]]
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes da compilação das regras de pagamento
+--------------------------------------------
+As máscaras por mês de compilar_pagamentos (tipos, indicadores, contagens e
+meses regulares) para regras sobrepostas, carências, regras após as chaves
+e o reforço no mês das chaves dos campos clássicos.
+"""
+
+import pytest
+
+from financiamento_planta_corrigido import FinanciamentoPlantaInput
+from regras_pagamento import (
+    compilar_pagamentos,
+    estrutura_pagamentos,
+    padrao_do_plano,
+    parcela_regular,
+    valores_base_mensais,
+    valores_regras,
+)
+
+
+PRAZO_ENTREGA, PRAZO_PAGAMENTO = 24, 60
+
+
+def plano(**campos):
+    return FinanciamentoPlantaInput(**dict({
+        "valorImovel": 500000, "valorEntrada": 50000, "prazoEntrega": PRAZO_ENTREGA,
+        "prazoPagamento": PRAZO_PAGAMENTO, "correcaoMensalAteChaves": 0.5, "correcaoMensalAposChaves": 0.8,
+    }, **campos))
+
+
+def meses_com(indicador):
+    return [mes for mes, unidades in enumerate(indicador, 1) if unidades]
+
+
+def test_regras_sobrepostas_somam_no_mesmo_mes():
+    entrada = plano(regrasPagamento=[
+        {"tipo": "Reforço", "valor": 5000, "mesInicial": 6, "periodicidade": 6},
+        {"tipo": "Reforço", "valor": 12000, "mesInicial": 12, "periodicidade": 12, "mesFinal": 36},
+        {"tipo": "Chaves", "valor": 30000, "mesInicial": 0, "referencia": "chaves"},
+    ])
+    padrao = padrao_do_plano(entrada)
+
+    semestral, anual, chaves = padrao.indicadores
+    assert meses_com(semestral) == list(range(6, 61, 6))
+    assert meses_com(anual) == [12, 24, 36]
+    assert meses_com(chaves) == [24]
+    assert padrao.contagens == (10, 3, 1)
+
+    # Chaves > Reforço no tipo; no mesmo mês os valores das regras somam
+    assert padrao.tipos[24 - 1] == 'Chaves'
+    assert [padrao.tipos[mes - 1] for mes in (6, 12, 36, 60)] == ['Reforço'] * 4
+    especiais = set(meses_com(semestral)) | set(meses_com(anual)) | {24}
+    assert [mes for mes, regular in enumerate(padrao.regulares, 1) if not regular] == sorted(especiais)
+    assert padrao.n_regulares == PRAZO_PAGAMENTO - len(especiais)
+
+    valores = valores_regras(entrada)
+    valores_base = valores_base_mensais(padrao, valores, 1000.0)
+    assert valores_base[12 - 1] == 5000 + 12000
+    assert valores_base[24 - 1] == 5000 + 12000 + 30000
+    assert valores_base[1 - 1] == 1000.0
+
+
+def test_carencia_tira_a_parcela_regular_mas_mantem_os_especiais():
+    entrada = plano(regrasPagamento=[
+        {"tipo": "Carência", "mesInicial": 1, "mesFinal": 6},
+        {"tipo": "Reforço", "valor": 8000, "mesInicial": 3, "periodicidade": 12},
+    ])
+    padrao = padrao_do_plano(entrada)
+
+    assert padrao.indicadores[0] == (0.0,) * PRAZO_PAGAMENTO
+    assert padrao.contagens == (0, 5)
+    assert not any(padrao.regulares[:6])
+    assert all(regular for mes, regular in enumerate(padrao.regulares, 1) if mes > 6 and (mes - 3) % 12)
+    assert padrao.tipos[:6] == ('Parcela', 'Parcela', 'Reforço', 'Parcela', 'Parcela', 'Parcela')
+
+    valores_base = valores_base_mensais(padrao, valores_regras(entrada), 2500.0)
+    assert valores_base[:6] == [0.0, 0.0, 8000.0, 0.0, 0.0, 0.0]
+
+
+def test_regras_apos_as_chaves_contam_a_partir_da_entrega():
+    regras = (
+        ('Reforço', 6, 30, 6, 'chaves'),
+        ('Chaves', 0, None, None, 'chaves'),
+        ('Chaves', 1, 3, None, 'chaves'),
+        # Começa depois do fim do prazo: nenhum mês
+        ('Reforço', 40, None, 12, 'chaves'),
+    )
+    padrao = compilar_pagamentos(PRAZO_ENTREGA, PRAZO_PAGAMENTO, ('regras', regras))
+
+    reforco, chaves_unica, chaves_mensal, reforco_fora = padrao.indicadores
+    assert meses_com(reforco) == [30, 36, 42, 48, 54]
+    assert meses_com(chaves_unica) == [24]
+    assert meses_com(chaves_mensal) == [25, 26, 27]
+    assert meses_com(reforco_fora) == []
+    assert padrao.contagens == (5, 1, 3, 0)
+    assert [padrao.tipos[mes - 1] for mes in (24, 25, 27, 28, 30)] == ['Chaves', 'Chaves', 'Chaves', 'Parcela', 'Reforço']
+
+
+@pytest.mark.parametrize("periodicidade,reforcos", [("semestral", [6, 12, 18, 24]), ("anual", [12, 24])])
+def test_reforco_no_mes_das_chaves_e_abatido_sem_ser_pago(periodicidade, reforcos):
+    entrada = plano(incluirReforco=True, periodicidadeReforco=periodicidade, valorReforco=10000, valorChaves=40000)
+    assert estrutura_pagamentos(entrada) == ('legado', periodicidade, True)
+    padrao = padrao_do_plano(entrada)
+
+    reforco, chaves = padrao.indicadores
+    # As chaves prevalecem no mês 24; os reforços param nas chaves
+    assert meses_com(reforco) == reforcos[:-1]
+    assert meses_com(chaves) == [PRAZO_ENTREGA]
+    assert padrao.tipos[PRAZO_ENTREGA - 1] == 'Chaves'
+    # ...mas o reforço do mês das chaves continua abatido do valor a distribuir
+    assert padrao.contagens == (len(reforcos), 1)
+
+    saldo = 450000.0
+    valores = valores_regras(entrada)
+    parcela = parcela_regular(padrao, valores, saldo)
+    assert parcela == pytest.approx((saldo - 10000 * len(reforcos) - 40000) / padrao.n_regulares)
+    valores_base = valores_base_mensais(padrao, valores, parcela)
+    assert valores_base[PRAZO_ENTREGA - 1] == 40000
+    assert sum(valores_base) == pytest.approx(saldo - 10000)
+
+
+def test_mesma_estrutura_compilada_uma_vez():
+    a = plano(incluirReforco=True, periodicidadeReforco="anual", valorReforco=10000, valorChaves=40000)
+    b = plano(incluirReforco=True, periodicidadeReforco="anual", valorReforco=25000, valorChaves=90000)
+    assert padrao_do_plano(a) is padrao_do_plano(b)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes do resultado compacto
+----------------------------
+Ida e volta do cronograma pela forma compacta, com e sem fase bancária:
+as colunas amortizacao, juros e taxaJuros saem só nas linhas da fase
+bancária, pelo dicionário, pelas colunas, pelas linhas e pelos modelos.
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from cache_base_normalizada import calcular_cronograma_completo, calcular_financiamento_planta_rapido
+from resultado_compacto import COLUNAS_BANCARIAS, ResultadoCompacto
+
+
+PLANO = {
+    "valorImovel": 600000, "valorEntrada": 60000, "prazoEntrega": 24, "prazoPagamento": 100,
+    "correcaoMensalAteChaves": 0.5, "correcaoMensalAposChaves": 0.8, "valorChaves": 50000,
+}
+
+BANCARIO = {"sistema": "SAC", "taxaJurosMensal": 0.9, "prazoMeses": 150}
+
+
+@pytest.mark.parametrize("sistema", ["SAC", "Price"])
+def test_colunas_bancarias_na_ida_e_volta(sistema):
+    plano = dict(PLANO, financiamentoBancario=dict(BANCARIO, sistema=sistema))
+    original = calcular_financiamento_planta_rapido(plano)
+    compacto = calcular_cronograma_completo(plano)
+
+    assert compacto.valores_bancarios.shape == (len(COLUNAS_BANCARIAS), len(original["parcelas"]))
+    assert compacto.para_dict() == original
+    assert ResultadoCompacto.de_dict(compacto.para_dict(), compacto.data_base).para_dict() == original
+
+    fase = np.array([p["tipoPagamento"] == 'Financiamento' for p in original["parcelas"]])
+    for nome in COLUNAS_BANCARIAS:
+        coluna = compacto.coluna(nome)
+        assert np.isnan(coluna[~fase]).all()
+        assert coluna[fase].tolist() == [p[nome] for p in original["parcelas"] if p["tipoPagamento"] == 'Financiamento']
+    assert set(compacto.coluna('taxaJuros')[fase].tolist()) == {0.9}
+
+    for indice, esperada in enumerate(original["parcelas"]):
+        linha = compacto[indice]
+        assert linha.para_dict() == esperada == compacto.para_dict_linha(indice)
+        modelo = compacto.parcela(indice)
+        for nome in COLUNAS_BANCARIAS:
+            assert getattr(linha, nome) == esperada.get(nome) == getattr(modelo, nome)
+    assert compacto.para_modelo().model_dump(exclude_none=True)["parcelas"] == \
+        [{k: v for k, v in p.items() if v is not None} for p in original["parcelas"]]
+
+
+def test_sem_fase_bancaria_nao_aloca_as_colunas():
+    original = calcular_financiamento_planta_rapido(PLANO)
+    compacto = ResultadoCompacto.de_dict(original)
+
+    assert compacto.valores_bancarios is None
+    assert compacto.para_dict() == original
+    assert not any(nome in p for p in compacto.para_dict()["parcelas"] for nome in COLUNAS_BANCARIAS)
+    for nome in COLUNAS_BANCARIAS:
+        assert all(math.isnan(valor) for valor in compacto.coluna(nome))
+        assert getattr(compacto[-1], nome) is None
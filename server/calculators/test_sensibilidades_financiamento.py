@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes das sensibilidades analíticas
+------------------------------------
+As derivadas em modo direto contra diferenças finitas centrais do cálculo
+completo, com e sem a fase de financiamento bancário.
+"""
+
+import pytest
+
+from cache_base_normalizada import calcular_financiamento_planta_rapido
+from sensibilidades_financiamento import PARAMETROS, calcular_sensibilidades
+
+
+# Passo das diferenças finitas por parâmetro
+PASSOS = {"correcaoMensalAteChaves": 1e-5, "correcaoMensalAposChaves": 1e-5, "valorEntrada": 1.0}
+
+AUTOMATICO = {
+    "valorImovel": 500000, "valorEntrada": 50000, "prazoEntrega": 36, "prazoPagamento": 120,
+    "correcaoMensalAteChaves": 0.5, "correcaoMensalAposChaves": 0.8,
+    "incluirReforco": True, "periodicidadeReforco": "semestral", "valorReforco": 10000, "valorChaves": 30000,
+}
+
+PERSONALIZADO = {
+    "valorImovel": 500000, "valorEntrada": 50000, "prazoEntrega": 36, "prazoPagamento": 120,
+    "correcaoMensalAteChaves": 0.5, "correcaoMensalAposChaves": 0.8, "tipoParcelamento": "personalizado",
+    "parcelasPersonalizadas": [{"mes": m, "valor": 3000, "tipo": "Reforço" if m % 12 == 1 else "Parcela"}
+                               for m in range(1, 100, 2)],
+}
+
+REGRAS = {
+    "valorImovel": 500000, "valorEntrada": 50000, "prazoEntrega": 36, "prazoPagamento": 120,
+    "correcaoMensalAteChaves": 0.5, "correcaoMensalAposChaves": 0.8,
+    "regrasPagamento": [
+        {"tipo": "Reforço", "valor": 9000, "mesInicial": 6, "periodicidade": 6},
+        {"tipo": "Chaves", "valor": 25000, "mesInicial": 0, "referencia": "chaves"},
+        {"tipo": "Carência", "mesInicial": 1, "mesFinal": 4},
+    ],
+}
+
+
+def com_banco(plano, sistema):
+    return dict(plano, financiamentoBancario={"sistema": sistema, "prazoMeses": 120, "taxaJurosMensal": 0.9})
+
+
+CASOS = {
+    "automatico": AUTOMATICO,
+    "automatico_percentual": dict(AUTOMATICO, percentualEntrada=15),
+    "automatico_longo": dict(AUTOMATICO, prazoPagamento=420),
+    "personalizado": PERSONALIZADO,
+    "regras": REGRAS,
+    "automatico_sac": com_banco(AUTOMATICO, "SAC"),
+    "automatico_price": com_banco(AUTOMATICO, "Price"),
+    "personalizado_sac": com_banco(PERSONALIZADO, "SAC"),
+    "personalizado_price": com_banco(PERSONALIZADO, "Price"),
+}
+
+
+def totais(plano):
+    resultado = calcular_financiamento_planta_rapido(plano)
+    return {
+        "valorTotal": resultado["resumo"]["valorTotal"],
+        "totalCorrecao": resultado["resumo"]["totalCorrecao"],
+        "saldoDevedorFinal": resultado["parcelas"][-1]["saldoDevedor"],
+    }
+
+
+@pytest.mark.parametrize("parametro", PARAMETROS)
+@pytest.mark.parametrize("nome", sorted(CASOS))
+def test_sensibilidades_iguais_a_diferencas_finitas(nome, parametro):
+    plano = CASOS[nome]
+    sensibilidades = calcular_sensibilidades(plano)
+    passo = PASSOS[parametro]
+    acima = totais(dict(plano, **{parametro: plano[parametro] + passo}))
+    abaixo = totais(dict(plano, **{parametro: plano[parametro] - passo}))
+    for grandeza, derivada in sensibilidades.items():
+        diferenca_finita = (acima[grandeza] - abaixo[grandeza]) / (2 * passo)
+        assert derivada[parametro] == pytest.approx(diferenca_finita, rel=1e-5, abs=1e-4), grandeza
+
+
+def test_sensibilidades_na_resposta_do_calculo():
+    resultado = calcular_financiamento_planta_rapido(dict(CASOS["automatico_price"], calcularSensibilidades=True))
+    for grandeza, derivadas in calcular_sensibilidades(CASOS["automatico_price"]).items():
+        assert resultado["sensibilidades"][grandeza] == pytest.approx(derivadas)
+
+
+def test_fase_bancaria_quita_o_saldo_final():
+    sensibilidades = calcular_sensibilidades(CASOS["automatico_sac"])
+    assert sensibilidades["saldoDevedorFinal"] == {parametro: 0.0 for parametro in PARAMETROS}
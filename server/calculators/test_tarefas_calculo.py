@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Testes das tarefas assíncronas
+------------------------------
+A carteira calculada em lotes pela tarefa contra a agregação síncrona da
+carteira inteira.
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+from carteira_financiamento import TIPOS_CARTEIRA, agregar_carteira
+from tarefas_calculo import GerenciadorTarefas
+
+
+def plano(prazo_entrega, prazo_pagamento, **extras):
+    return dict({"valorImovel": 400000, "valorEntrada": 40000, "prazoEntrega": prazo_entrega,
+                 "prazoPagamento": prazo_pagamento, "correcaoMensalAteChaves": 0.5,
+                 "correcaoMensalAposChaves": 0.8}, **extras)
+
+
+BANCARIO = {"sistema": "SAC", "prazoMeses": 300, "taxaJurosMensal": 0.9}
+
+CARTEIRAS = {
+    "so_bancaria": [{"mesInicio": 0, "plano": plano(24, 120, financiamentoBancario=BANCARIO)},
+                    {"mesInicio": 0, "plano": plano(36, 120)}],
+    "mista": [
+        {"mesInicio": 0, "plano": plano(12, 60, financiamentoBancario=BANCARIO)},
+        {"mesInicio": 3, "plano": plano(24, 48)},
+        {"mesInicio": 6, "plano": plano(18, 100, financiamentoBancario=dict(BANCARIO, sistema="Price"))},
+        {"mesInicio": 1, "plano": plano(30, 90, tipoParcelamento="personalizado",
+                                        parcelasPersonalizadas=[{"mes": m, "valor": 4000, "tipo": "Parcela"}
+                                                                for m in range(1, 60, 2)])},
+        {"mesInicio": 9, "plano": plano(24, 80, tipoParcelamento="personalizado",
+                                        financiamentoBancario=BANCARIO,
+                                        parcelasPersonalizadas=[{"mes": m, "valor": 5000, "tipo": "Parcela"}
+                                                                for m in range(1, 24)])},
+    ],
+}
+
+
+def aguardar(gerenciador, id_tarefa, limite_s=60):
+    fim = time.monotonic() + limite_s
+    while time.monotonic() < fim:
+        estado = gerenciador.consultar(id_tarefa)
+        if estado["estado"] in ('concluida', 'cancelada', 'falhou'):
+            return estado
+        time.sleep(0.02)
+    raise TimeoutError(id_tarefa)
+
+
+@pytest.mark.parametrize("tamanho_lote", [1, 2])
+@pytest.mark.parametrize("nome", sorted(CARTEIRAS))
+def test_carteira_em_lotes_igual_a_agregacao_sincrona(tmp_path, nome, tamanho_lote):
+    unidades = CARTEIRAS[nome]
+    gerenciador = GerenciadorTarefas(str(tmp_path), workers=1)
+    estado = gerenciador.submeter({"tipo": "carteira", "carteira": {"unidades": unidades},
+                                   "tamanhoLote": tamanho_lote})
+    estado = aguardar(gerenciador, estado["id"])
+    assert estado["estado"] == 'concluida', estado["erro"]
+    assert estado["progresso"]["lotesConcluidos"] == -(-len(unidades) // tamanho_lote)
+
+    esperado = agregar_carteira({"unidades": unidades})
+    with np.load(gerenciador.caminho_resultado(estado["id"])) as resultado:
+        assert list(resultado["meses"]) == esperado["meses"]
+        for codigo, tipo in enumerate(TIPOS_CARTEIRA):
+            np.testing.assert_allclose(resultado["recebimentos"][codigo], esperado["recebimentos"][tipo],
+                                       rtol=1e-9, atol=1e-6)
+        np.testing.assert_allclose(resultado["saldoDevedor"], esperado["saldoDevedor"], rtol=1e-9, atol=1e-6)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste do tempo de importação do handler serverless
+---------------------------------------------------
+Importa serverless_financiamento em um processo novo com `python -X importtime`
+e falha (código de saída 1) quando:
+
+- o tempo cumulativo de importação do módulo passa do orçamento, ou
+- alguma dependência pesada (Flask, pydantic, NumPy) é carregada na importação.
+
+O runtime Python da Vercel já importa http.server antes do handler, então o
+teste faz o mesmo para medir apenas o custo do nosso módulo.
+
+Em seguida, cria um ambiente virtual limpo só com requirements.txt (o que a
+Vercel instala para a função) e calcula um plano pelo handler em modo
+isolado (`python -I`): falha se o motor depender de algo fora do arquivo ou
+se o acelerador com NumPy não for carregado. Requer acesso ao índice do pip;
+--sem-ambiente-limpo pula esta etapa.
+
+Uso: python3 teste_cold_start.py [orcamento_ms] [--sem-ambiente-limpo]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import venv
+from typing import Dict
+
+# Orçamento padrão do import do handler, em milissegundos
+ORCAMENTO_IMPORTACAO_MS = float(os.environ.get('ORCAMENTO_IMPORTACAO_MS', 25))
+
+# Módulos que não podem ser carregados durante a importação
+MODULOS_PROIBIDOS = ('flask', 'pydantic', 'numpy')
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+# Plano de exemplo calculado no ambiente limpo
+PLANO_EXEMPLO = {
+    "valorImovel": 500000, "valorEntrada": 50000, "prazoEntrega": 36, "prazoPagamento": 120,
+    "correcaoMensalAteChaves": 0.5, "correcaoMensalAposChaves": 0.8,
+}
+
+
+def medir_importacao(repeticoes: int = 3) -> Dict[str, float]:
+    """
+    Mede o tempo cumulativo (µs) de cada módulo importado junto com o handler.
+    Usa a menor medição entre as repetições para reduzir ruído.
+    """
+    codigo = (
+        "import sys; sys.path.insert(0, %r); import http.server; "
+        "import serverless_financiamento" % DIRETORIO
+    )
+    melhores: Dict[str, float] = {}
+    for _ in range(repeticoes):
+        processo = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', codigo],
+            capture_output=True, text=True, check=True
+        )
+        tempos: Dict[str, float] = {}
+        for linha in processo.stderr.splitlines():
+            if not linha.startswith('import time:') or '|' not in linha:
+                continue
+            partes = linha[len('import time:'):].split('|')
+            try:
+                cumulativo = float(partes[1])
+            except ValueError:
+                continue  # Linha de cabeçalho
+            tempos[partes[2].strip()] = cumulativo
+        for modulo, tempo in tempos.items():
+            melhores[modulo] = min(tempo, melhores.get(modulo, tempo))
+    return melhores
+
+
+def testar_tempo_importacao(orcamento_ms: float = ORCAMENTO_IMPORTACAO_MS) -> bool:
+    """Verifica o orçamento de cold start do handler serverless"""
+    tempos = medir_importacao()
+    ok = True
+
+    tempo_ms = tempos.get('serverless_financiamento', 0) / 1000
+    print(f"serverless_financiamento: {tempo_ms:.2f} ms (orçamento {orcamento_ms:.2f} ms)")
+    if tempo_ms > orcamento_ms:
+        print("ERRO: tempo de importação acima do orçamento")
+        ok = False
+
+    carregados = [m for m in tempos if m.split('.')[0] in MODULOS_PROIBIDOS]
+    if carregados:
+        print(f"ERRO: dependências pesadas carregadas na importação: {', '.join(sorted(carregados))}")
+        ok = False
+
+    return ok
+
+
+def testar_ambiente_limpo() -> bool:
+    """Instala requirements.txt em um venv novo e calcula um plano pelo handler"""
+    codigo = (
+        "import json, sys; sys.path.insert(0, %r); import serverless_financiamento as s; "
+        "status, _, corpo = s.processar_requisicao(%r.encode()); "
+        "print(json.dumps({'status': status, 'acelerado': 'cache_base_normalizada' in sys.modules, "
+        "'parcelas': len(json.loads(corpo).get('parcelas', []))}))"
+        % (DIRETORIO, json.dumps(PLANO_EXEMPLO))
+    )
+    with tempfile.TemporaryDirectory(prefix='cold-start-') as diretorio:
+        venv.create(diretorio, with_pip=True)
+        python = os.path.join(diretorio, 'Scripts' if os.name == 'nt' else 'bin', 'python')
+        instalacao = subprocess.run(
+            [python, '-m', 'pip', 'install', '--quiet', '--disable-pip-version-check',
+             '-r', os.path.join(DIRETORIO, 'requirements.txt')],
+            capture_output=True, text=True
+        )
+        if instalacao.returncode != 0:
+            print(f"ERRO: falha ao instalar requirements.txt:\n{instalacao.stderr}")
+            return False
+        processo = subprocess.run([python, '-I', '-c', codigo], capture_output=True, text=True)
+
+    if processo.returncode != 0:
+        print(f"ERRO: o handler não importa no ambiente limpo:\n{processo.stderr}")
+        return False
+    saida = json.loads(processo.stdout.strip().splitlines()[-1])
+    print(f"ambiente limpo: status {saida['status']}, {saida['parcelas']} parcelas, "
+          f"acelerador {'carregado' if saida['acelerado'] else 'ausente'}")
+    if saida['status'] != 200 or saida['parcelas'] != PLANO_EXEMPLO['prazoPagamento'] + 1:
+        print("ERRO: o cálculo falhou no ambiente limpo")
+        return False
+    if not saida['acelerado']:
+        print("ERRO: o acelerador com NumPy não foi carregado no ambiente limpo")
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    argumentos = [a for a in sys.argv[1:] if not a.startswith('--')]
+    orcamento = float(argumentos[0]) if argumentos else ORCAMENTO_IMPORTACAO_MS
+    sucesso = testar_tempo_importacao(orcamento)
+    if '--sem-ambiente-limpo' not in sys.argv:
+        sucesso = testar_ambiente_limpo() and sucesso
+    print("Teste concluído!" if sucesso else "Teste falhou!")
+    sys.exit(0 if sucesso else 1)
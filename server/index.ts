@@ -343,6 +343,11 @@ app.get('/test-pdf', async (req, res) => {
     console.error('[Server] Erro ao inicializar scheduler:', error);
     console.log('[Server] Continuando sem scheduler...');
   }
+
+  // Histórico dos índices já gravado no banco -> séries da calibração de taxas (serviço Python), em segundo plano
+  import('./services/seriesIndicesPython')
+    .then(({ sincronizarSeriesIndicesPython }) => sincronizarSeriesIndicesPython())
+    .catch(error => console.error('[Server] Erro ao sincronizar as séries de índices com o serviço Python:', error));
   
   server.listen(port, () => {
     log(`Servidor rodando na porta ${port}`);
@@ -4,6 +4,7 @@ const require = createRequire(import.meta.url);
 const { db } = require('../db');
 import { financialIndexes, selicMeta, selicAcumulada, type IndexType } from '@shared/schema';
 import { eq, and, desc } from 'drizzle-orm';
+import { enviarPontosIndicePython } from '../calculators/pythonCalcAdapter';
 
 // Configuração dos índices do Banco Central
 const BCB_INDICES = {
@@ -128,6 +129,7 @@ export class BCBService {
   async processIndexData(indexType: IndexType): Promise<number> {
     try {
       let processedCount = 0;
+      const pontos: Array<{ month: string; value: number }> = [];
 
       // Para outros índices (IPCA, IGP-M, CDI), processar normalmente
       const codigo = BCB_INDICES[indexType];
@@ -144,9 +146,15 @@ export class BCBService {
         }
 
         await this.saveIndexData(indexType, month, value);
+        pontos.push({ month, value });
         processedCount++;
       }
 
+      // O IPCA também alimenta a calibração das taxas de correção (serviço Python)
+      if (indexType === 'ipca') {
+        await enviarPontosIndicePython('ipca', pontos);
+      }
+
       console.log(`[BCB Service] Processados ${processedCount} registros para ${indexType.toUpperCase()}`);
       return processedCount;
     } catch (error) {
@@ -7,6 +7,7 @@ import { createRequire } from 'module';
 const require = createRequire(import.meta.url);
 const { db } = require('../db');
 import { cubScIndexes, type InsertCubScIndex, type CubScIndex } from '@shared/schema';
+import { enviarPontosIndicePython } from '../calculators/pythonCalcAdapter';
 
 interface CubScData {
   month: string;
@@ -325,6 +326,7 @@ class CubScServiceNew {
     // Pegar apenas os últimos 12 meses
     const last12Months = sortedData.slice(0, 12);
     console.log(`[CUB-SC BC] Processando apenas os últimos 12 meses (${last12Months.length} registros) ordenados do mais recente ao mais antigo`);
+    const gravados: Array<{ month: string; value: number }> = [];
     
     for (const record of last12Months) {
       try {
@@ -353,6 +355,7 @@ class CubScServiceNew {
           };
 
           await db.insert(cubScIndexes).values(insertData);
+          gravados.push({ month: record.month, value: record.monthlyVariation });
           console.log(`[CUB-SC BC] Inserido: ${record.month} = ${record.monthlyVariation}%`);
         } else {
           // Atualizar registro existente
@@ -369,6 +372,7 @@ class CubScServiceNew {
                 eq(cubScIndexes.source, this.SOURCE_NAME)
               )
             );
+          gravados.push({ month: record.month, value: record.monthlyVariation });
           console.log(`[CUB-SC BC] Atualizado: ${record.month} = ${record.monthlyVariation}%`);
         }
       } catch (error) {
@@ -377,6 +381,9 @@ class CubScServiceNew {
     }
     
     console.log('[CUB-SC BC] Salvamento concluído');
+
+    // Mantém a série da calibração de taxas (serviço Python) atualizada: só os meses gravados no banco
+    await enviarPontosIndicePython('cub', gravados);
   }
 
   /**
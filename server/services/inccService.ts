@@ -2,10 +2,11 @@ import puppeteer from 'puppeteer';
 import * as cheerio from 'cheerio';
 import axios from 'axios';
 import { eq, and, desc } from 'drizzle-orm';
-import { financialIndexes, type IndexType } from '@shared/schema';
+import { financialIndexes, inccIndexes, type IndexType } from '@shared/schema';
 import { createRequire } from 'module';
 const require = createRequire(import.meta.url);
 const { db } = require('../db');
+import { enviarPontosIndicePython } from '../calculators/pythonCalcAdapter';
 
 interface InccData {
   month: string;
@@ -245,6 +246,7 @@ class InccService {
    */
   async saveInccData(data: InccData[]): Promise<void> {
     console.log(`[INCC] Salvando ${data.length} registros no banco...`);
+    const inseridos: Array<{ month: string; value: number }> = [];
     
     for (const record of data) {
       try {
@@ -270,6 +272,7 @@ class InccService {
           };
 
           await db.insert(inccIndexes).values(insertData);
+          inseridos.push({ month: record.month, value: record.monthlyVariation });
           console.log(`[INCC] Inserido: ${record.month} = ${record.monthlyVariation}%`);
         } else {
           console.log(`[INCC] Já existe: ${record.month}`);
@@ -278,6 +281,9 @@ class InccService {
         console.error(`[INCC] Erro ao salvar ${record.month}:`, error);
       }
     }
+
+    // Mantém a série da calibração de taxas (serviço Python) igual à do banco: só os meses gravados
+    await enviarPontosIndicePython('incc', inseridos);
   }
 
   /**
@@ -0,0 +1,50 @@
+import { eq, asc } from 'drizzle-orm';
+import { financialIndexes, inccIndexes, cubScIndexes } from '@shared/schema';
+import { createRequire } from 'module';
+const require = createRequire(import.meta.url);
+const { db } = require('../db');
+import { enviarPontosIndicePython, startPythonServer } from '../calculators/pythonCalcAdapter';
+
+// Fonte do CUB-SC gravada pelo coletor agendado (cubScService_new)
+const FONTE_CUB = 'sinduscon-bc';
+
+/**
+ * Envia ao serviço Python todo o histórico de INCC, IPCA e CUB-SC já gravado
+ * no Postgres. Os coletores só enviam os pontos que acabaram de gravar (e o
+ * BCB busca apenas os últimos 12 meses), então sem esta carga as janelas de
+ * 24, 36 e 60 meses da calibração ficariam incompletas por anos.
+ *
+ * Executada na inicialização do servidor. O envio é idempotente: meses com o
+ * mesmo valor não alteram a série no Python, e um arquivo de séries apagado
+ * no serviço Python é recomposto na próxima inicialização.
+ */
+export async function sincronizarSeriesIndicesPython(): Promise<void> {
+  await startPythonServer();
+
+  const series: Array<['incc' | 'ipca' | 'cub', Array<{ month: string; value: string }>]> = [
+    ['incc', await db
+      .select({ month: inccIndexes.month, value: inccIndexes.value })
+      .from(inccIndexes)
+      .where(eq(inccIndexes.indexType, 'incc'))
+      .orderBy(asc(inccIndexes.month))],
+    ['ipca', await db
+      .select({ month: financialIndexes.month, value: financialIndexes.value })
+      .from(financialIndexes)
+      .where(eq(financialIndexes.indexType, 'ipca'))
+      .orderBy(asc(financialIndexes.month))],
+    ['cub', await db
+      .select({ month: cubScIndexes.month, value: cubScIndexes.monthlyVariation })
+      .from(cubScIndexes)
+      .where(eq(cubScIndexes.source, FONTE_CUB))
+      .orderBy(asc(cubScIndexes.month))],
+  ];
+
+  for (const [indice, linhas] of series) {
+    const pontos = linhas
+      .map(linha => ({ month: linha.month, value: Number(linha.value) }))
+      .filter(ponto => Number.isFinite(ponto.value));
+    if (await enviarPontosIndicePython(indice, pontos)) {
+      console.log(`[Séries de índices] ${pontos.length} pontos de ${indice.toUpperCase()} sincronizados com o serviço Python`);
+    }
+  }
+}